@@ -20,13 +20,14 @@ class CustomAdminSite(admin.AdminSite):
     def index(self, request, extra_context=None):
         """Custom admin index with simplified dashboard"""
         from registration.models import CandidateProfile
-        from questions.models import Question, QuestionPaper
+        from questions.models import Question
+        from questions.activation_snapshot import get_snapshot
         
         # Get basic stats for the simplified dashboard
         context = {
             'total_candidates': CandidateProfile.objects.count(),
             'total_questions': Question.objects.filter(is_active=True).count(),
-            'active_papers': QuestionPaper.objects.filter(is_active=True).count(),
+            'active_papers': sum(1 for paper in get_snapshot().papers.values() if paper.is_active),
         }
         
         if extra_context:
@@ -313,6 +313,22 @@ DATA_UPLOAD_MAX_NUMBER_FIELDS = EnvironmentLoader.get_int_env('DATA_UPLOAD_MAX_N
 
 EXAM_UNIFIED_DAT_ENABLED = EnvironmentLoader.get_bool_env('EXAM_UNIFIED_DAT_ENABLED', True)
 CONVERTER_PASSPHRASE = EnvironmentLoader.get_env_var('CONVERTER_PASSPHRASE', 'bharat')
+EXAM_AUTOSAVE_FLUSH_SECONDS = EnvironmentLoader.get_int_env('EXAM_AUTOSAVE_FLUSH_SECONDS', 2)  # autosave write coalescing window
+QUESTION_IMPORT_BATCH_SIZE = EnvironmentLoader.get_int_env('QUESTION_IMPORT_BATCH_SIZE', 500)  # rows per bulk_create on question upload
+QUESTION_UPLOAD_WORKERS = EnvironmentLoader.get_int_env('QUESTION_UPLOAD_WORKERS', 4)  # threads decrypting a batch upload
+DAT_KEY_CACHE_SIZE = EnvironmentLoader.get_int_env('DAT_KEY_CACHE_SIZE', 32)  # derived .dat keys kept in memory (LRU, 0 = derive every time)
+DAT_EXPORT_VERSION = EnvironmentLoader.get_int_env('DAT_EXPORT_VERSION', 1)  # 1 = converter layout, 2 = chunked streaming container
+EXPORT_BATCH_SIZE = EnvironmentLoader.get_int_env('EXPORT_BATCH_SIZE', 1000)  # candidates per set-based query batch in exam-data exports
+EXPORT_JOB_WORKERS = EnvironmentLoader.get_int_env('EXPORT_JOB_WORKERS', 2)  # processes building background admin exports
+EXPORT_JOB_STALE_SECONDS = EnvironmentLoader.get_int_env('EXPORT_JOB_STALE_SECONDS', 600)  # active export job without progress this long is failed
+EXPORT_JOB_KEEP = EnvironmentLoader.get_int_env('EXPORT_JOB_KEEP', 3)  # finished artifacts kept per export
+EXPORT_DELTA_SETTLE_SECONDS = EnvironmentLoader.get_int_env('EXPORT_DELTA_SETTLE_SECONDS', 60)  # delta exports stop this far before now so in-flight submissions land in the next one
+EXPORT_PARTITION_BY = EnvironmentLoader.get_env_var('EXPORT_PARTITION_BY', '')  # "trade"/"shift": "Export All Exam Data" builds one workbook per partition in parallel (zip)
+EXPORT_PARALLEL_WORKERS = EnvironmentLoader.get_int_env('EXPORT_PARALLEL_WORKERS', 0)  # processes building partitioned export parts, 0 = one per core
+EXPORT_PART_CANDIDATES = EnvironmentLoader.get_int_env('EXPORT_PART_CANDIDATES', 2000)  # larger partitions are split into parts of this many candidates
+SLOT_STATS_CACHE_SECONDS = EnvironmentLoader.get_int_env('SLOT_STATS_CACHE_SECONDS', 5)  # bulk slot dashboard figures shared between refreshes, 0 = always recount
+PREGENERATE_ADMIN_MAX_CANDIDATES = EnvironmentLoader.get_int_env('PREGENERATE_ADMIN_MAX_CANDIDATES', 200)  # selection the "Pre-generate Exam Papers" admin action builds inside the request; larger runs use the pregenerate_papers command
+CACHE_GENERATION_CHECK_SECONDS = EnvironmentLoader.get_int_env('CACHE_GENERATION_CHECK_SECONDS', 2)  # how often each process re-reads the activation/question-pool/slot-stats invalidation counters from the DB
 
 # =============================================================================
 # LOGGING CONFIGURATION
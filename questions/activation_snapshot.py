@@ -0,0 +1,148 @@
+# questions/activation_snapshot.py
+"""
+Activation-state snapshot.
+
+GlobalPaperTypeControl, TradePaperActivation, ActivateSets and QuestionPaper
+are tiny but read on nearly every request. They are loaded together into one
+immutable ActivationSnapshot, cached per process and tagged with a generation
+number kept in the database (questions.generations). Saving any of those
+models bumps the generation (see questions/signals.py); the next reader in
+this process rebuilds the snapshot at once, other processes within
+CACHE_GENERATION_CHECK_SECONDS.
+
+Instances held by the snapshot are shared between requests: treat them as
+read-only.
+"""
+import logging
+import threading
+from types import MappingProxyType
+from typing import Optional
+
+from django.db import transaction
+
+from .generations import Generation
+
+logger = logging.getLogger(__name__)
+
+_generation = Generation("activation_snapshot")
+
+_snapshot: Optional["ActivationSnapshot"] = None
+_lock = threading.Lock()
+
+
+class ActivationSnapshot:
+    """Read-only view of every activation table, built in one pass."""
+
+    __slots__ = ("generation", "global_paper_type", "papers", "activations", "active_sets")
+
+    def __init__(self, generation, global_paper_type, papers, activations, active_sets):
+        self.generation = generation
+        self.global_paper_type = global_paper_type
+        # paper_type -> QuestionPaper
+        self.papers = MappingProxyType(papers)
+        # (trade_id, paper_type) -> TradePaperActivation, in model ordering (trade name, paper type)
+        self.activations = MappingProxyType(activations)
+        # trade_id -> (active_primary_set, active_secondary_set)
+        self.active_sets = MappingProxyType(active_sets)
+
+    def paper(self, paper_type, active_only=True):
+        paper = self.papers.get(paper_type)
+        if paper is None or (active_only and not paper.is_active):
+            return None
+        return paper
+
+    def activation(self, trade_id, paper_type, active_only=True):
+        activation = self.activations.get((trade_id, paper_type))
+        if activation is None or (active_only and not activation.is_active):
+            return None
+        return activation
+
+    def is_active(self, trade_id, paper_type) -> bool:
+        return self.activation(trade_id, paper_type) is not None
+
+    def duration(self, trade_id, paper_type):
+        """Per-trade duration override (None when the paper's own duration applies)."""
+        activation = self.activations.get((trade_id, paper_type))
+        return activation.exam_duration if activation is not None else None
+
+    def trade_activation(self, trade_id):
+        """First active activation of a trade, PRIMARY before SECONDARY."""
+        for paper_type in ("PRIMARY", "SECONDARY"):
+            activation = self.activation(trade_id, paper_type)
+            if activation is not None:
+                return activation
+        return None
+
+    def first_active_activation(self):
+        return next((a for a in self.activations.values() if a.is_active), None)
+
+    @property
+    def any_trade_active(self) -> bool:
+        return self.first_active_activation() is not None
+
+    @property
+    def any_paper_active(self) -> bool:
+        return any(paper.is_active for paper in self.papers.values())
+
+    def active_set(self, trade_id, paper_type) -> Optional[str]:
+        """Active question set of a trade, or None when it has no ActivateSets row."""
+        sets = self.active_sets.get(trade_id)
+        if sets is None:
+            return None
+        return sets[1] if paper_type == "SECONDARY" else sets[0]
+
+
+def current_generation() -> int:
+    return _generation.current()
+
+
+def bump_generation() -> None:
+    """Invalidate the snapshot: in this process now, in the others once they re-read the DB counter."""
+    global _snapshot
+    _generation.bump()
+    with _lock:
+        _snapshot = None
+    logger.debug("Activation snapshot invalidated")
+
+
+def invalidate_on_commit() -> None:
+    transaction.on_commit(bump_generation)
+
+
+def _build_snapshot(generation: int) -> ActivationSnapshot:
+    from .models import ActivateSets, GlobalPaperTypeControl, QuestionPaper, TradePaperActivation
+
+    global_paper_type = (
+        GlobalPaperTypeControl.objects.filter(is_active=True)
+        .values_list("paper_type", flat=True)
+        .first()
+    )
+    papers = {}
+    for paper in QuestionPaper.objects.order_by("id"):
+        # Keep the first row per type, like .filter(question_paper=...).first()
+        papers.setdefault(paper.question_paper, paper)
+    activations = {
+        (a.trade_id, a.paper_type): a
+        for a in TradePaperActivation.objects.order_by("trade__name", "paper_type")
+    }
+    active_sets = {
+        trade_id: (primary, secondary)
+        for trade_id, primary, secondary in ActivateSets.objects.values_list(
+            "trade_id", "active_primary_set", "active_secondary_set"
+        )
+    }
+    return ActivationSnapshot(generation, global_paper_type, papers, activations, active_sets)
+
+
+def get_snapshot() -> ActivationSnapshot:
+    """Current snapshot, rebuilt when the generation has moved on."""
+    global _snapshot
+    generation = current_generation()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.generation == generation:
+        return snapshot
+
+    snapshot = _build_snapshot(generation)
+    with _lock:
+        _snapshot = snapshot
+    return snapshot
@@ -16,7 +16,9 @@ from .models import (
     QuestionSetActivation,
     UniversalSetActivation,
 )
-from .forms import QuestionUploadForm
+from .forms import QuestionBatchUploadForm, QuestionUploadForm
+from .upload_pipeline import UploadPipeline, decrypt_in_parallel
+from .activation_snapshot import get_snapshot, invalidate_on_commit as invalidate_activation_snapshot
 
 
 # --------------------------------
@@ -115,13 +117,83 @@ class QuestionUploadAdmin(admin.ModelAdmin):
 
     fields = ("file", "decryption_password")   # 🔥 ONLY REQUIRED FIELDS
     list_display = ("file",)
+    change_list_template = "admin/questions/questionupload/change_list.html"
 
     def save_model(self, request, obj, form, change):
         super().save_model(request, obj, form, change)
-        messages.success(
-            request,
-            "Question paper uploaded and imported successfully.",
-        )
+        pipeline = UploadPipeline.cached(obj)
+        if pipeline is not None and pipeline.result is not None:
+            created, skipped = pipeline.result
+            messages.success(
+                request,
+                f"Question paper uploaded and imported successfully: {created} new, {skipped} duplicates skipped.",
+            )
+        elif not change:
+            messages.warning(
+                request,
+                "Question paper uploaded, but the import did not complete. Check the server log.",
+            )
+
+    def get_urls(self):
+        urls = super().get_urls()
+        custom_urls = [
+            path(
+                "batch-upload/",
+                self.admin_site.admin_view(self.batch_upload_view),
+                name="questions_questionupload_batch_upload",
+            ),
+        ]
+        return custom_urls + urls
+
+    def batch_upload_view(self, request):
+        """Upload several .dat files at once; their KDF/decrypt run concurrently."""
+        from django.core.exceptions import ValidationError
+        from django.http import HttpResponseForbidden, HttpResponseRedirect
+        from django.shortcuts import render
+        from django.urls import reverse
+
+        if not self.has_add_permission(request):
+            return HttpResponseForbidden("Not allowed.")
+
+        form = QuestionBatchUploadForm(request.POST or None, request.FILES or None)
+        if request.method == "POST" and form.is_valid():
+            password = form.cleaned_data["decryption_password"]
+            uploads = [
+                (f, UploadPipeline(f.read(), password, f.name))
+                for f in form.cleaned_data["files"]
+            ]
+            for f, _ in uploads:
+                f.seek(0)
+
+            errors = decrypt_in_parallel([pipeline for _, pipeline in uploads])
+            for f, pipeline in uploads:
+                try:
+                    if pipeline in errors:
+                        raise errors[pipeline]
+                    pipeline.validate()
+                except Exception as e:
+                    detail = "; ".join(e.messages) if isinstance(e, ValidationError) else str(e)
+                    messages.error(request, f"❌ {f.name}: {detail}")
+                    continue
+
+                upload = QuestionUpload(file=f, decryption_password=password)
+                pipeline.attach(upload)
+                upload.save()  # import_on_upload imports from the attached pipeline
+                if pipeline.result is not None:
+                    created, skipped = pipeline.result
+                    messages.success(request, f"✅ {f.name}: {created} new, {skipped} duplicates skipped.")
+                else:
+                    messages.warning(request, f"⚠️ {f.name}: uploaded, but the import did not complete. Check the server log.")
+
+            return HttpResponseRedirect(reverse("admin:questions_questionupload_changelist"))
+
+        context = {
+            **self.admin_site.each_context(request),
+            "title": "Batch QP Upload",
+            "opts": self.model._meta,
+            "form": form,
+        }
+        return render(request, "admin/questions/questionupload/batch_upload.html", context)
 
 
 # --------------------------------
@@ -173,12 +245,7 @@ class ActivateSetsAdmin(admin.ModelAdmin):
             return self._handle_post_request(request)
         
         # Get current global paper type
-        active_paper_type = None
-        try:
-            active_control = GlobalPaperTypeControl.objects.get(is_active=True)
-            active_paper_type = active_control.paper_type
-        except GlobalPaperTypeControl.DoesNotExist:
-            pass
+        active_paper_type = get_snapshot().global_paper_type
         
         # Get universal set activation settings
         universal_settings = {}
@@ -266,6 +333,7 @@ class ActivateSetsAdmin(admin.ModelAdmin):
             
             # Deactivate SECONDARY
             GlobalPaperTypeControl.objects.filter(paper_type='SECONDARY').update(is_active=False)
+            invalidate_activation_snapshot()  # .update() sends no post_save
             
             messages.success(request, "✅ PRIMARY papers activated globally for all trades.")
             
@@ -282,6 +350,7 @@ class ActivateSetsAdmin(admin.ModelAdmin):
             
             # Deactivate PRIMARY
             GlobalPaperTypeControl.objects.filter(paper_type='PRIMARY').update(is_active=False)
+            invalidate_activation_snapshot()  # .update() sends no post_save
             
             messages.success(request, "✅ SECONDARY papers activated globally for all trades.")
             
@@ -583,11 +652,7 @@ class ActivateSetsAdmin(admin.ModelAdmin):
     
     def _get_active_paper_type(self):
         """Get the currently active paper type"""
-        try:
-            active_control = GlobalPaperTypeControl.objects.get(is_active=True)
-            return active_control.paper_type
-        except GlobalPaperTypeControl.DoesNotExist:
-            return None
+        return get_snapshot().global_paper_type
     
     def has_add_permission(self, request):
         # Prevent manual addition - records are auto-created
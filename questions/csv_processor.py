@@ -2,7 +2,7 @@
 import csv
 from io import StringIO
 from django.core.exceptions import ValidationError
-from .models import Question, Trade
+from .models import Question, Trade, question_text_hash
 
 
 class QuestionCSVProcessor:
@@ -61,8 +61,11 @@ class QuestionCSVProcessor:
         """Bulk create questions from validated data"""
         if questions_data:
             Question.objects.bulk_create([
-                Question(**data) for data in questions_data
+                Question(**data, text_hash=question_text_hash(data['text'])) for data in questions_data
             ])
+            # bulk_create sends no post_save, so invalidate cached pools here
+            from .pool_cache import invalidate_on_commit
+            invalidate_on_commit()
             return len(questions_data)
         return 0
     
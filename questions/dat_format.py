@@ -0,0 +1,383 @@
+# questions/dat_format.py
+"""
+.dat container formats (AES-256-GCM, key from PBKDF2-SHA256 / 100k iterations).
+
+v1 - the Question Paper Converter layout (crypto.ts), one GCM message:
+
+    salt(16) | iv(12) | ciphertext + tag
+
+v2 - chunked, so files can be encrypted/decrypted as streams:
+
+    header:   b"EXDAT" | version=2 (1) | chunk_size (4, big-endian) | salt(16) | nonce_prefix(7)
+    segments: AES-GCM(chunk) + tag(16) for every ``chunk_size`` bytes of plaintext
+
+Segment ``i`` uses nonce ``nonce_prefix | i (4, big-endian) | last-flag (1)``
+and the header as associated data, so segments can't be reordered, dropped,
+truncated or moved to another file. Readers auto-detect the layout: anything
+without the v2 magic is read as v1 (a random v1 salt matches the 6 magic
+bytes with probability 2**-48).
+"""
+import hashlib
+import io
+import os
+import struct
+import threading
+from collections import OrderedDict
+from typing import BinaryIO, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+# ============================================================
+# Encryption format (matches your Converter crypto.ts)
+# ============================================================
+SALT_SIZE = 16
+IV_SIZE = 12
+KEY_LENGTH_BYTES = 32  # 256-bit
+PBKDF2_ITERATIONS = 100000
+TAG_SIZE = 16
+
+DAT_VERSION_V1 = 1
+DAT_VERSION_V2 = 2
+
+V2_MAGIC = b"EXDAT"
+V2_NONCE_PREFIX_SIZE = 7
+_V2_HEADER = struct.Struct(f">{len(V2_MAGIC)}sBI{SALT_SIZE}s{V2_NONCE_PREFIX_SIZE}s")
+V2_HEADER_SIZE = _V2_HEADER.size
+V2_DEFAULT_CHUNK_SIZE = 1024 * 1024
+V2_MAX_CHUNK_SIZE = 64 * 1024 * 1024
+
+
+def is_encrypted_dat(file_bytes: bytes) -> bool:
+    """
+    Your converter output format:
+      [salt(16)][iv(12)][ciphertext+tag(variable)]
+    So minimum length must be > 28 bytes.
+    """
+    return isinstance(file_bytes, (bytes, bytearray)) and len(file_bytes) > (SALT_SIZE + IV_SIZE)
+
+
+def _derive_key(passphrase: str, salt: bytes) -> bytes:
+    if not passphrase:
+        raise ValidationError("Decryption password is required.")
+    if not salt or len(salt) != SALT_SIZE:
+        raise ValidationError("Invalid .dat format (salt missing/corrupt).")
+
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=KEY_LENGTH_BYTES,
+        salt=salt,
+        iterations=PBKDF2_ITERATIONS,
+    )
+    return kdf.derive(passphrase.encode("utf-8"))
+
+
+class DerivedKeyCache:
+    """
+    Bounded LRU of PBKDF2 results keyed by (salt, SHA-256 of the passphrase).
+
+    Every upload is validated, saved and imported with the same passphrase,
+    and a re-upload of the same file has the same salt, so the 100k-iteration
+    KDF only runs once per (salt, passphrase). Keys are plain bytes kept in
+    process memory until evicted or cleared; nothing is wiped.
+    """
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = max(0, maxsize)
+        self._keys: "OrderedDict[Tuple[bytes, bytes], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _cache_key(passphrase: str, salt: bytes) -> Tuple[bytes, bytes]:
+        return bytes(salt), hashlib.sha256(passphrase.encode("utf-8")).digest()
+
+    def get_or_derive(self, passphrase: str, salt: bytes) -> bytes:
+        if not passphrase or not salt or len(salt) != SALT_SIZE or not self.maxsize:
+            # _derive_key raises the usual validation errors
+            return _derive_key(passphrase, salt)
+
+        cache_key = self._cache_key(passphrase, salt)
+        with self._lock:
+            cached = self._keys.get(cache_key)
+            if cached is not None:
+                self._keys.move_to_end(cache_key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        # Derive outside the lock: PBKDF2 releases the GIL, other uploads keep going
+        key = _derive_key(passphrase, salt)
+
+        with self._lock:
+            if cache_key not in self._keys:
+                self._keys[cache_key] = key
+                while len(self._keys) > self.maxsize:
+                    self._keys.popitem(last=False)
+        return key
+
+    def evict(self, salt: bytes, passphrase: Optional[str] = None) -> int:
+        """Drop the keys for ``salt`` - only the one for ``passphrase`` if given."""
+        with self._lock:
+            if passphrase is not None:
+                targets = [self._cache_key(passphrase, salt)]
+            else:
+                targets = [k for k in self._keys if k[0] == bytes(salt)]
+            evicted = 0
+            for cache_key in targets:
+                if self._keys.pop(cache_key, None) is not None:
+                    evicted += 1
+            return evicted
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+    def __len__(self):
+        return len(self._keys)
+
+
+dat_key_cache = DerivedKeyCache(getattr(settings, "DAT_KEY_CACHE_SIZE", 32))
+
+
+def derive_dat_key(passphrase: str, salt: bytes) -> bytes:
+    """PBKDF2 key for a .dat salt, through dat_key_cache (for decrypting; encryption salts are never reused)."""
+    return dat_key_cache.get_or_derive(passphrase, salt)
+
+
+# ============================================================
+# v1 (single GCM message)
+# ============================================================
+def split_dat_content(file_bytes: bytes) -> Tuple[bytes, bytes, bytes]:
+    """Split converter output into (salt, iv, ciphertext+tag)."""
+    if not is_encrypted_dat(file_bytes):
+        raise ValidationError("Invalid .dat file format or file is too small.")
+
+    salt = file_bytes[:SALT_SIZE]
+    iv = file_bytes[SALT_SIZE:SALT_SIZE + IV_SIZE]
+    encrypted_content = file_bytes[SALT_SIZE + IV_SIZE:]
+
+    if len(iv) != IV_SIZE:
+        raise ValidationError("Invalid .dat format (iv missing/corrupt).")
+    return salt, iv, encrypted_content
+
+
+def decrypt_with_key(key: bytes, iv: bytes, encrypted_content: bytes) -> bytes:
+    try:
+        aesgcm = AESGCM(key)
+        decrypted = aesgcm.decrypt(iv, encrypted_content, None)
+        return decrypted
+    except Exception as e:
+        # Wrong password OR corrupted file
+        raise ValidationError(f"Unable to decrypt .dat file. Check password. Details: {e}")
+
+
+# ============================================================
+# Header / auto-detection
+# ============================================================
+class DatHeader(NamedTuple):
+    version: int
+    salt: bytes
+    # v1: the GCM iv; v2: the 7-byte nonce prefix
+    iv: bytes
+    chunk_size: int
+    # Bytes before the first ciphertext byte; also the v2 associated data
+    raw: bytes
+
+
+def read_dat_header(prefix: bytes) -> DatHeader:
+    """
+    Header of a .dat from its first bytes (V2_HEADER_SIZE is enough for both
+    layouts). Anything without the v2 magic is treated as v1.
+    """
+    if prefix[:len(V2_MAGIC)] == V2_MAGIC and len(prefix) >= V2_HEADER_SIZE:
+        magic, version, chunk_size, salt, nonce_prefix = _V2_HEADER.unpack_from(prefix)
+        if version == DAT_VERSION_V2:
+            if not 0 < chunk_size <= V2_MAX_CHUNK_SIZE:
+                raise ValidationError("Invalid .dat v2 header (chunk size).")
+            return DatHeader(DAT_VERSION_V2, salt, nonce_prefix, chunk_size, bytes(prefix[:V2_HEADER_SIZE]))
+
+    if len(prefix) < SALT_SIZE + IV_SIZE:
+        raise ValidationError("Invalid .dat file format or file is too small.")
+    return DatHeader(
+        DAT_VERSION_V1,
+        bytes(prefix[:SALT_SIZE]),
+        bytes(prefix[SALT_SIZE:SALT_SIZE + IV_SIZE]),
+        0,
+        bytes(prefix[:SALT_SIZE + IV_SIZE]),
+    )
+
+
+def _v2_nonce(nonce_prefix: bytes, index: int, last: bool) -> bytes:
+    if index > 0xFFFFFFFF:
+        raise ValueError(".dat v2 stream has too many chunks")
+    return nonce_prefix + index.to_bytes(4, "big") + (b"\x01" if last else b"\x00")
+
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes:
+    """Read up to ``size`` bytes, looping over short reads; shorter only at EOF."""
+    parts, remaining = [], size
+    while remaining:
+        part = stream.read(remaining)
+        if not part:
+            break
+        parts.append(part)
+        remaining -= len(part)
+    return b"".join(parts)
+
+
+# ============================================================
+# Decryption (both layouts)
+# ============================================================
+def iter_decrypt_with_key(header: DatHeader, key: bytes, body: BinaryIO) -> Iterator[bytes]:
+    """Plaintext chunks of a .dat whose header was already consumed from ``body``."""
+    if header.version == DAT_VERSION_V1:
+        yield decrypt_with_key(key, header.iv, body.read())
+        return
+
+    aesgcm = AESGCM(key)
+    segment_size = header.chunk_size + TAG_SIZE
+    segment = _read_exact(body, segment_size)
+    index = 0
+    while True:
+        # Look one segment ahead: the final segment is sealed with the last-flag set
+        following = _read_exact(body, segment_size) if len(segment) == segment_size else b""
+        last = not following
+        if len(segment) < TAG_SIZE:
+            raise ValidationError("Invalid .dat v2 file (truncated segment).")
+        try:
+            yield aesgcm.decrypt(_v2_nonce(header.iv, index, last), segment, header.raw)
+        except InvalidTag:
+            raise ValidationError(
+                "Unable to decrypt .dat file. Check password. "
+                f"Details: segment {index} failed authentication (wrong password, corrupt or truncated file)"
+            )
+        if last:
+            return
+        segment, index = following, index + 1
+
+
+def iter_decrypt(stream: BinaryIO, passphrase: str) -> Iterator[bytes]:
+    """Decrypt a .dat read from ``stream`` (v1 or v2), yielding plaintext chunks."""
+    prefix = _read_exact(stream, V2_HEADER_SIZE)
+    header = read_dat_header(prefix)
+    key = derive_dat_key(passphrase, header.salt)
+    if header.version == DAT_VERSION_V1:
+        # v1 is one GCM message: it can only be authenticated as a whole
+        body = io.BytesIO(prefix[len(header.raw):] + stream.read())
+    else:
+        body = stream
+    yield from iter_decrypt_with_key(header, key, body)
+
+
+def decrypt_dat(file_bytes: bytes, passphrase: str) -> bytes:
+    """Decrypt an in-memory .dat, either layout."""
+    header = read_dat_header(file_bytes[:V2_HEADER_SIZE])
+    key = derive_dat_key(passphrase, header.salt)
+    return decrypt_dat_with_key(header, key, file_bytes)
+
+
+def decrypt_dat_with_key(header: DatHeader, key: bytes, file_bytes: bytes) -> bytes:
+    body = memoryview(file_bytes)[len(header.raw):]
+    if header.version == DAT_VERSION_V1:
+        return decrypt_with_key(key, header.iv, bytes(body))
+    return b"".join(iter_decrypt_with_key(header, key, io.BytesIO(body)))
+
+
+# ============================================================
+# Encryption
+# ============================================================
+class DatV2Encryptor:
+    """
+    Incremental v2 encryptor: feed plaintext with update(), then finalize().
+
+    Each call returns the ciphertext ready so far (the header comes first), so
+    output can go straight to a file or a StreamingHttpResponse. One full chunk
+    is always held back so the final segment can carry the last-flag.
+    """
+
+    def __init__(self, passphrase: str, chunk_size: int = V2_DEFAULT_CHUNK_SIZE):
+        if not passphrase:
+            raise ValueError("Missing passphrase for .dat encryption.")
+        if not 0 < chunk_size <= V2_MAX_CHUNK_SIZE:
+            raise ValueError(f"chunk_size must be between 1 and {V2_MAX_CHUNK_SIZE}")
+
+        salt = os.urandom(SALT_SIZE)
+        self.chunk_size = chunk_size
+        self._nonce_prefix = os.urandom(V2_NONCE_PREFIX_SIZE)
+        self.header = _V2_HEADER.pack(V2_MAGIC, DAT_VERSION_V2, chunk_size, salt, self._nonce_prefix)
+        # Fresh salt: the key can never be reused, so it stays out of dat_key_cache
+        self._aesgcm = AESGCM(_derive_key(passphrase, salt))
+        self._buffer = bytearray()
+        self._index = 0
+        self._header_sent = False
+        self._finalized = False
+
+    def _seal(self, chunk: bytes, last: bool) -> bytes:
+        segment = self._aesgcm.encrypt(_v2_nonce(self._nonce_prefix, self._index, last), chunk, self.header)
+        self._index += 1
+        return segment
+
+    def _take_header(self) -> bytes:
+        if self._header_sent:
+            return b""
+        self._header_sent = True
+        return self.header
+
+    def update(self, data: bytes) -> bytes:
+        if self._finalized:
+            raise ValueError("Encryptor already finalized")
+        self._buffer += data
+        out = [self._take_header()]
+        # Strictly more than one chunk buffered: the chunk being sealed is not the last
+        while len(self._buffer) > self.chunk_size:
+            out.append(self._seal(bytes(self._buffer[:self.chunk_size]), last=False))
+            del self._buffer[:self.chunk_size]
+        return b"".join(out)
+
+    def finalize(self) -> bytes:
+        if self._finalized:
+            raise ValueError("Encryptor already finalized")
+        self._finalized = True
+        tail = self._take_header() + self._seal(bytes(self._buffer), last=True)
+        self._buffer = bytearray()
+        return tail
+
+
+def iter_encrypt(chunks: Iterable[bytes], passphrase: str, chunk_size: int = V2_DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Encrypt an iterable of plaintext pieces into a v2 .dat, yielding ciphertext pieces."""
+    encryptor = DatV2Encryptor(passphrase, chunk_size)
+    for chunk in chunks:
+        out = encryptor.update(chunk)
+        if out:
+            yield out
+    yield encryptor.finalize()
+
+
+def iter_file_chunks(stream: BinaryIO, chunk_size: int = V2_DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def encrypt_dat(data: bytes, passphrase: str, version: int = DAT_VERSION_V2) -> bytes:
+    """Encrypt in-memory bytes as a v1 (converter) or v2 .dat."""
+    if version == DAT_VERSION_V1:
+        if not passphrase:
+            raise ValueError("Missing passphrase for .dat encryption.")
+        salt = os.urandom(SALT_SIZE)
+        iv = os.urandom(IV_SIZE)
+        # Fresh salt: derived directly, not through dat_key_cache (decrypt only)
+        ciphertext = AESGCM(_derive_key(passphrase, salt)).encrypt(iv, data, None)  # AAD=None
+        # Layout: salt (16) || iv (12) || ciphertext (includes auth tag)
+        return salt + iv + ciphertext
+    if version == DAT_VERSION_V2:
+        return b"".join(iter_encrypt(iter_file_chunks(io.BytesIO(data)), passphrase))
+    raise ValueError(f"Unknown .dat version: {version}")
@@ -0,0 +1,46 @@
+# questions/exam_state.py
+"""
+Memoized exam-state resolution.
+
+The activation and paper for a (trade, exam type) pair are resolved once and
+shared by every CandidateProfile exam method in the request (see
+CandidateProfile.exam_state). Across requests they come from the activation
+snapshot (questions.activation_snapshot), so resolving costs no queries.
+"""
+from typing import Optional
+
+from .activation_snapshot import get_snapshot
+
+
+class ExamState:
+    """Activation, paper and duration for one trade's next exam type."""
+
+    __slots__ = ("trade_id", "exam_type", "activation", "paper")
+
+    def __init__(self, trade_id, exam_type, activation=None, paper=None):
+        self.trade_id = trade_id
+        self.exam_type = exam_type
+        self.activation = activation
+        self.paper = paper
+
+    @property
+    def key(self):
+        return (self.trade_id, self.exam_type)
+
+    @property
+    def duration(self):
+        """Trade-level duration override, else the paper's duration."""
+        if self.activation is not None and self.activation.exam_duration:
+            return self.activation.exam_duration
+        return self.paper.exam_duration if self.paper is not None else None
+
+
+def resolve_exam_state(trade_id: Optional[int], exam_type: str) -> ExamState:
+    """Active TradePaperActivation and QuestionPaper for ``exam_type``, from the activation snapshot."""
+    if trade_id is None:
+        return ExamState(None, exam_type)
+
+    snapshot = get_snapshot()
+    activation = snapshot.activation(trade_id, exam_type)
+    paper = snapshot.paper(exam_type) if activation else None
+    return ExamState(trade_id, exam_type, activation, paper)
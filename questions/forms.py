@@ -2,8 +2,8 @@
 from django import forms
 from django.core.exceptions import ValidationError
 
-from .models import QuestionUpload
-from .services import decrypt_or_load_excel_bytes, load_questions_from_excel_data, import_questions_from_dicts, load_questions_from_csv_data, detect_file_format
+from .models import QuestionUpload, validate_dat_file
+from .upload_pipeline import UploadPipeline
 
 
 class QuestionUploadForm(forms.ModelForm):
@@ -14,6 +14,9 @@ class QuestionUploadForm(forms.ModelForm):
     - Your converter format (AES-GCM)
     - Legacy office-encrypted dat (msoffcrypto)
     - Plain XLSX renamed to .dat
+
+    The file is decrypted and validated once in clean(); the pipeline travels
+    on the saved instance to the import_on_upload signal, which imports it.
     """
 
     class Meta:
@@ -25,6 +28,10 @@ class QuestionUploadForm(forms.ModelForm):
             "decryption_password": "Passphrase used by converter to encrypt/decrypt the .dat file.",
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pipeline = None
+
     def clean(self):
         cleaned_data = super().clean()
         uploaded_file = cleaned_data.get("file")
@@ -40,65 +47,62 @@ class QuestionUploadForm(forms.ModelForm):
 
         uploaded_file.seek(0)
 
+        pipeline = UploadPipeline(dat_bytes, password, uploaded_file.name)
         try:
-            excel_bytes = decrypt_or_load_excel_bytes(dat_bytes, password)
-            
-            # Detect file format
-            file_format = detect_file_format(excel_bytes)
-            
-            if file_format == 'csv':
-                # Handle CSV format
-                questions_list, errors = load_questions_from_csv_data(excel_bytes)
-                if errors:
-                    raise ValidationError(f"CSV validation errors: {'; '.join(errors)}")
-            else:
-                # Handle Excel format (legacy)
-                question_dicts = load_questions_from_excel_data(excel_bytes)
-                if not question_dicts:
-                    raise ValidationError("No valid questions found in the uploaded Excel.")
-                    
-        except ValidationError as e:
-            raise ValidationError(str(e))
+            pipeline.validate()
+        except ValidationError:
+            raise
+        except Exception as e:
+            raise ValidationError(f"Unable to decrypt/load file: {e}")
 
+        self._pipeline = pipeline
         return cleaned_data
 
     def save(self, commit=True):
-        upload = super().save(commit=commit)
+        # Hand the parsed rows to import_on_upload (fires when the upload is saved)
+        if self._pipeline is not None:
+            self._pipeline.attach(self.instance)
+        return super().save(commit=commit)
 
-        uploaded_file = upload.file
-        password = upload.decryption_password
 
-        try:
-            dat_bytes = uploaded_file.read()
-            uploaded_file.seek(0)
-
-            excel_bytes = decrypt_or_load_excel_bytes(dat_bytes, password)
-            
-            # Detect file format
-            file_format = detect_file_format(excel_bytes)
-            
-            if file_format == 'csv':
-                # Handle CSV format with new processor
-                questions_list, errors = load_questions_from_csv_data(excel_bytes)
-                if errors:
-                    raise ValidationError(f"CSV processing errors: {'; '.join(errors)}")
-                
-                # For CSV, questions are already created by the processor
-                upload._import_created = questions_list[0].get("created", 0) if questions_list else 0
-                upload._import_skipped = 0
-            else:
-                # Handle Excel format (legacy)
-                question_dicts = load_questions_from_excel_data(excel_bytes)
-
-                created, skipped = import_questions_from_dicts(
-                    question_dicts=question_dicts,
-                    forced_trade=None,  # unified upload
-                )
-
-                upload._import_created = created
-                upload._import_skipped = skipped
+class MultipleDatFileInput(forms.ClearableFileInput):
+    allow_multiple_selected = True
 
-        except ValidationError:
-            raise
 
-        return upload
+class MultipleDatFileField(forms.FileField):
+    """FileField accepting several files from one <input multiple>."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("widget", MultipleDatFileInput())
+        super().__init__(*args, **kwargs)
+
+    def clean(self, data, initial=None):
+        single_clean = super().clean
+        if isinstance(data, (list, tuple)):
+            return [single_clean(f, initial) for f in data]
+        return [single_clean(data, initial)]
+
+
+class QuestionBatchUploadForm(forms.Form):
+    """
+    Upload several .dat files (e.g. one per trade) in one go.
+
+    The files share one passphrase; they are decrypted concurrently by the
+    admin batch view (questions.upload_pipeline.decrypt_in_parallel).
+    """
+
+    files = MultipleDatFileField(
+        label="Files",
+        help_text="Select all encrypted .dat files to upload.",
+    )
+    decryption_password = forms.CharField(
+        max_length=255,
+        initial=QuestionUpload._meta.get_field("decryption_password").default,
+        help_text="Passphrase used by converter to encrypt/decrypt the .dat files.",
+    )
+
+    def clean_files(self):
+        files = self.cleaned_data["files"]
+        for f in files:
+            validate_dat_file(f)
+        return files
@@ -0,0 +1,78 @@
+# questions/generations.py
+"""
+Cross-process invalidation counters.
+
+The activation snapshot, the question pools and the slot dashboard figures
+are cached per process and tagged with a generation number. The numbers are
+kept in the CacheGeneration table, not in Django's cache: no CACHES backend
+is configured, so the cache is a per-process LocMemCache that other gunicorn
+workers, export workers and management commands never see.
+
+Each process re-reads a counter at most every CACHE_GENERATION_CHECK_SECONDS,
+which bounds how long another process's change can go unnoticed. If the
+table can't be read (e.g. before migrate) the number falls back to a time
+bucket of the same length, so cached data still expires.
+"""
+import logging
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+
+def _check_seconds() -> float:
+    return getattr(settings, "CACHE_GENERATION_CHECK_SECONDS", 2)
+
+
+class Generation:
+    """One named counter, read through a short per-process memo."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._value: Optional[int] = None
+        self._checked = 0.0
+
+    def current(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            if self._value is not None and now - self._checked < _check_seconds():
+                return self._value
+        value = self._read()
+        with self._lock:
+            self._value, self._checked = value, now
+        return value
+
+    def bump(self) -> int:
+        """Move the counter on; every process notices within CACHE_GENERATION_CHECK_SECONDS."""
+        from .models import CacheGeneration
+
+        try:
+            if not CacheGeneration.objects.filter(name=self.name).update(value=F("value") + 1):
+                try:
+                    with transaction.atomic():
+                        CacheGeneration.objects.create(name=self.name, value=2)
+                except IntegrityError:
+                    # Created by another process meanwhile
+                    CacheGeneration.objects.filter(name=self.name).update(value=F("value") + 1)
+        except DatabaseError as e:
+            logger.warning("Could not bump cache generation %s: %s", self.name, e)
+        value = self._read()
+        with self._lock:
+            self._value, self._checked = value, time.monotonic()
+        return value
+
+    def _read(self) -> int:
+        from .models import CacheGeneration
+
+        try:
+            value = CacheGeneration.objects.filter(name=self.name).values_list("value", flat=True).first()
+        except DatabaseError:
+            # No counter table yet: expire on a timer instead
+            return -int(time.time() // max(_check_seconds(), 1))
+        return 1 if value is None else value
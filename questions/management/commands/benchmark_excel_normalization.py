@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+"""
+Management command to benchmark question-sheet normalization.
+
+Builds a synthetic question sheet (default 20,000 rows) and times the
+columnar normalize_question_frame against the previous df.iterrows() loop,
+after checking both produce the same row dicts.
+
+Usage:
+    python manage.py benchmark_excel_normalization
+    python manage.py benchmark_excel_normalization --rows 50000 --repeat 5
+    python manage.py benchmark_excel_normalization --with-excel
+"""
+
+import io
+import random
+import statistics
+import time
+from typing import Dict, List
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+from questions.services import (
+    _norm,
+    _safe_json_or_text,
+    map_excel_columns,
+    normalize_question_frame,
+)
+
+TRADES = ["OCC", "DMV", "TTC", "ELECTRICIAN", "ALL", " dmv ", "Occ"]
+PAPER_TYPES = ["PRIMARY", "SECONDARY", "P", "S", "", "primary"]
+SETS = ["A", "B", "c", " D", "Set", "1", ""]
+BOOLS = ["TRUE", "false", "Yes", "0", "y", ""]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark columnar Excel question normalization against the row-wise loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help='Rows in the synthetic sheet (default: 20000)')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per implementation (default: 3)')
+        parser.add_argument('--seed', type=int, default=42, help='RNG seed for the synthetic sheet (default: 42)')
+        parser.add_argument(
+            '--with-excel',
+            action='store_true',
+            help='Also round-trip the sheet through an .xlsx file (slow: openpyxl read dominates)',
+        )
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], max(1, options['repeat'])
+        if rows < 1:
+            raise CommandError('--rows must be positive')
+
+        self.stdout.write(self.style.SUCCESS('⏱️ EXCEL NORMALIZATION BENCHMARK'))
+        self.stdout.write('=' * 60)
+
+        df = self._build_sheet(rows, options['seed'])
+        if options['with_excel']:
+            buffer = io.BytesIO()
+            df.to_excel(buffer, index=False)
+            started = time.perf_counter()
+            df = pd.read_excel(io.BytesIO(buffer.getvalue()), engine='openpyxl')
+            df.columns = [str(c).strip() for c in df.columns]
+            self.stdout.write(f'read_excel (openpyxl): {time.perf_counter() - started:.2f}s')
+
+        columnar = normalize_question_frame(df)
+        rowwise = _rowwise_normalize(df)
+        if columnar != rowwise:
+            mismatch = next(i for i, (a, b) in enumerate(zip(columnar, rowwise)) if a != b) if len(columnar) == len(rowwise) else None
+            raise CommandError(
+                f'Outputs differ (columnar={len(columnar)} rows, row-wise={len(rowwise)} rows, '
+                f'first mismatch at {mismatch})'
+            )
+        self.stdout.write(f'Rows: {rows} | Outputs identical: ✅ ({len(columnar)} questions)')
+
+        self.stdout.write(f"{'Implementation':<16} {'best s':>10} {'median s':>10}")
+        timings = {}
+        for name, func in (('row-wise loop', _rowwise_normalize), ('columnar', normalize_question_frame)):
+            runs = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                func(df)
+                runs.append(time.perf_counter() - started)
+            timings[name] = min(runs)
+            self.stdout.write(f'{name:<16} {min(runs):>10.3f} {statistics.median(runs):>10.3f}')
+
+        speedup = timings['row-wise loop'] / timings['columnar'] if timings['columnar'] else float('inf')
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS(f'✅ Columnar normalization is {speedup:.1f}x faster'))
+
+    @staticmethod
+    def _build_sheet(rows, seed):
+        """Fully populated sheet (blank cells are normalized differently by the old loop)."""
+        rng = random.Random(seed)
+        data = {
+            'Question': [],
+            'Part': [],
+            'Marks': [],
+            'Option A': [],
+            'Option B': [],
+            'Option C': [],
+            'Option D': [],
+            'Correct Answer': [],
+            'Trade': [],
+            'Paper Type': [],
+            'Question Set': [],
+            'Is Common': [],
+            'Is Active': [],
+        }
+        for i in range(rows):
+            secondary = rng.random() < 0.05
+            data['Question'].append(f'  Question {i} Set {chr(65 + i % 26)}{" SECONDARY" if secondary else ""}  ')
+            data['Part'].append(rng.choice(['A', 'b', ' C ', 'D', 'e', 'F', 'G', 'part a']))
+            data['Marks'].append(rng.choice(['1', '2.5', ' 3 ', 'x', '4']))
+            has_options = rng.random() < 0.8
+            for letter in 'ABCD':
+                data[f'Option {letter}'].append(f'opt {letter.lower()} {i}' if has_options else ' ')
+            data['Correct Answer'].append(rng.choice(['A', '["A", "C"]', '{"answer": "B"}', 'True', ' b ']))
+            data['Trade'].append(rng.choice(TRADES))
+            data['Paper Type'].append(rng.choice(PAPER_TYPES) or 'x')
+            data['Question Set'].append(rng.choice(SETS) or 'A')
+            data['Is Common'].append(rng.choice(BOOLS) or 'no')
+            data['Is Active'].append(rng.choice(BOOLS) or 'yes')
+        return pd.DataFrame(data)
+
+
+def _rowwise_normalize(df: pd.DataFrame) -> List[Dict]:
+    """The previous per-row loop of load_questions_from_excel_data, kept as the baseline."""
+    col_map = map_excel_columns(df.columns)
+
+    rows: List[Dict] = []
+    for _, r in df.iterrows():
+        text = str(r.get(col_map["text"], "")).strip()
+        if not text:
+            continue
+
+        part = str(r.get(col_map.get("part", ""), "A")).strip() if col_map.get("part") else "A"
+        part = _norm(part)[:1] if part else "A"
+        if part not in {"A", "B", "C", "D", "E", "F"}:
+            part = "A"
+
+        marks_val = r.get(col_map.get("marks", ""), 1) if col_map.get("marks") else 1
+        try:
+            marks = float(marks_val) if str(marks_val).strip() != "" else 1.0
+        except Exception:
+            marks = 1.0
+
+        trade_val = str(r.get(col_map.get("trade", ""), "")).strip() if col_map.get("trade") else ""
+        paper_type_val = str(r.get(col_map.get("paper_type", ""), "")).strip() if col_map.get("paper_type") else ""
+        
+        # Extract question_set
+        question_set_val = str(r.get(col_map.get("question_set", ""), "A")).strip() if col_map.get("question_set") else "A"
+        question_set = _norm(question_set_val)[:1] if question_set_val else "A"
+        if question_set not in {"A", "B", "C", "D", "E", "F", "G", "H", "I", "J", "K", "L", "M", "N", "O", "P", "Q", "R", "S", "T", "U", "V", "W", "X", "Y", "Z"}:
+            # If question_set is not found in column, try to extract from question text
+            import re
+            set_match = re.search(r'Set ([A-Z])', text)
+            if set_match:
+                question_set = set_match.group(1)
+            else:
+                question_set = "A"
+        
+        # Extract is_common
+        is_common_val = r.get(col_map.get("is_common", ""), False) if col_map.get("is_common") else False
+        if isinstance(is_common_val, str):
+            is_common = is_common_val.lower() in ('true', '1', 'yes', 'y')
+        else:
+            is_common = bool(is_common_val)
+        
+        # Extract is_active
+        is_active_val = r.get(col_map.get("is_active", ""), True) if col_map.get("is_active") else True
+        if isinstance(is_active_val, str):
+            is_active = is_active_val.lower() in ('true', '1', 'yes', 'y')
+        else:
+            is_active = bool(is_active_val)
+
+        # Enhanced logic with text-based SECONDARY detection:
+        # 1. If paper_type column exists: use it
+        # 2. If question text contains "SECONDARY": classify as SECONDARY
+        # 3. Else infer: If trade == ALL => SECONDARY else PRIMARY
+        trade_norm = _norm(trade_val)
+        paper_type_norm = _norm(paper_type_val)
+
+        if paper_type_norm in ("PRIMARY", "P"):
+            paper_type = "PRIMARY"
+        elif paper_type_norm in ("SECONDARY", "S"):
+            paper_type = "SECONDARY"
+        elif "SECONDARY" in text.upper():
+            # Text-based SECONDARY detection - this is the critical fix
+            paper_type = "SECONDARY"
+            is_common = True  # Force is_common=True for text-detected secondary questions
+            trade_norm = ""   # Force NULL trade for secondary questions
+        else:
+            paper_type = "SECONDARY" if trade_norm == "ALL" else "PRIMARY"
+
+        # Handle both new separate option fields and legacy options JSON
+        options = None
+        option_a = None
+        option_b = None
+        option_c = None
+        option_d = None
+        
+        # Check for new separate option fields first
+        if col_map.get("option_a"):
+            option_a = str(r.get(col_map["option_a"], "")).strip() or None
+        if col_map.get("option_b"):
+            option_b = str(r.get(col_map["option_b"], "")).strip() or None
+        if col_map.get("option_c"):
+            option_c = str(r.get(col_map["option_c"], "")).strip() or None
+        if col_map.get("option_d"):
+            option_d = str(r.get(col_map["option_d"], "")).strip() or None
+        
+        # If no separate option fields, fall back to legacy options JSON
+        if not any([option_a, option_b, option_c, option_d]):
+            options_raw = r.get(col_map.get("options", ""), None) if col_map.get("options") else None
+            options = _safe_json_or_text(options_raw)
+
+        # Handle correct answer
+        correct_raw = r.get(col_map.get("correct_answer", ""), None) if col_map.get("correct_answer") else None
+        correct_answer = _safe_json_or_text(correct_raw)
+
+        rows.append({
+            "text": text,
+            "part": part,
+            "marks": marks,
+            "options": options,
+            "option_a": option_a,
+            "option_b": option_b,
+            "option_c": option_c,
+            "option_d": option_d,
+            "correct_answer": correct_answer,
+            "trade": trade_norm,         # OCC / DMV / ALL etc.
+            "paper_type": paper_type,    # PRIMARY / SECONDARY
+            "question_set": question_set, # A, B, C, D, E, etc.
+            "is_common": is_common,      # True/False
+            "is_active": is_active,      # True/False
+        })
+
+    return rows
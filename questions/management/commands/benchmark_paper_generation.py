@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""
+Management command to benchmark per-candidate paper generation latency
+under concurrent exam starts (e.g. a whole shift logging in at 9:00).
+"""
+
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from questions.models import QuestionPaper, ExamSession
+from registration.models import CandidateProfile
+
+
+class Command(BaseCommand):
+    help = 'Benchmark QuestionPaper.generate_for_candidate at 1, 40 and 400 concurrent starts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--starts',
+            type=str,
+            default='1,40,400',
+            help='Comma-separated list of concurrent start counts (default: 1,40,400)'
+        )
+        parser.add_argument(
+            '--trade',
+            type=str,
+            help='Only use candidates of this trade code (optional)'
+        )
+        parser.add_argument(
+            '--paper-type',
+            type=str,
+            default='PRIMARY',
+            choices=['PRIMARY', 'SECONDARY'],
+            help='Question paper to generate (default: PRIMARY)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Base RNG seed so runs draw the same papers (optional)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            starts = [int(x) for x in options['starts'].split(',') if x.strip()]
+        except ValueError:
+            raise CommandError("--starts must be a comma-separated list of integers")
+
+        paper = QuestionPaper.objects.filter(question_paper=options['paper_type']).first()
+        if not paper:
+            raise CommandError(f"No {options['paper_type']} QuestionPaper found")
+
+        candidates = CandidateProfile.objects.filter(trade__isnull=False).select_related('user', 'trade')
+        if options.get('trade'):
+            candidates = candidates.filter(trade__code__iexact=options['trade'])
+        candidates = list(candidates[:max(starts)])
+        if not candidates:
+            raise CommandError("No candidates with a trade found")
+
+        self.stdout.write(self.style.SUCCESS("⏱️ PAPER GENERATION BENCHMARK"))
+        self.stdout.write("=" * 60)
+        self.stdout.write(f"Paper: {paper.question_paper} | Candidates available: {len(candidates)}")
+        self.stdout.write(f"{'Starts':>8} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10} {'wall s':>10}")
+
+        for n in starts:
+            # Re-use candidates when there are fewer than n (sessions are deleted afterwards)
+            batch = list(islice(cycle(candidates), n))
+            base_seed = options.get('seed')
+            jobs = [
+                (paper, c, None if base_seed is None else base_seed + i)
+                for i, c in enumerate(batch)
+            ]
+
+            wall_start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=n) as pool:
+                results = list(pool.map(self._generate_one, jobs))
+            wall = time.perf_counter() - wall_start
+
+            session_ids = [sid for sid, _ in results if sid]
+            latencies = sorted(ms for sid, ms in results if sid)
+            errors = len(results) - len(session_ids)
+
+            # Clean up the benchmark sessions (ExamQuestions cascade)
+            ExamSession.objects.filter(id__in=session_ids).delete()
+
+            if not latencies:
+                self.stdout.write(self.style.ERROR(f"{n:>8} all {errors} generations failed"))
+                continue
+
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            self.stdout.write(
+                f"{n:>8} {statistics.median(latencies):>10.1f} {p95:>10.1f} "
+                f"{latencies[-1]:>10.1f} {wall:>10.2f}"
+                + (f"  ({errors} failed)" if errors else "")
+            )
+
+        self.stdout.write(self.style.SUCCESS("✓ Benchmark complete (benchmark sessions removed)"))
+
+    @staticmethod
+    def _generate_one(job):
+        paper, candidate, seed = job
+        try:
+            start = time.perf_counter()
+            session = paper.generate_for_candidate(
+                user=candidate.user,
+                trade=candidate.trade,
+                seed=seed,
+            )
+            return session.id, (time.perf_counter() - start) * 1000
+        except Exception:
+            return None, 0.0
+        finally:
+            # Each worker thread owns its own DB connection
+            connection.close()
@@ -9,6 +9,7 @@ from django.contrib.auth import get_user_model
 from questions.models import Question, QuestionPaper, ExamSession, ExamQuestion, TradePaperActivation, QuestionUpload
 from results.models import CandidateAnswer
 from registration.models import CandidateProfile
+from registration import slot_stats
 from centers.models import Center
 import os
 import logging
@@ -205,6 +206,7 @@ class Command(BaseCommand):
                         is_primary_completed=False,
                         is_secondary_completed=False,
                     )
+                    slot_stats.invalidate_on_commit()  # .update() sends no post_save
 
 
                     self.stdout.write(self.style.SUCCESS(f"✅ Reset {candidates_with_slots} exam slots"))
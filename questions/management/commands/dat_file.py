@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+Management command to inspect, encrypt and decrypt .dat files.
+
+Works disk to disk: v2 files are encrypted and decrypted one chunk at a
+time, so a large workbook is never held in memory. Legacy v1 files
+(salt || iv || ciphertext) are detected automatically when decrypting.
+
+Usage:
+    python manage.py dat_file info export.dat
+    python manage.py dat_file encrypt questions.xlsx questions.dat --password secret
+    python manage.py dat_file encrypt questions.xlsx questions.dat --format-version 1
+    python manage.py dat_file decrypt questions.dat questions.xlsx --password secret
+"""
+
+import os
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from questions.dat_format import (
+    DAT_VERSION_V1,
+    DAT_VERSION_V2,
+    V2_DEFAULT_CHUNK_SIZE,
+    V2_HEADER_SIZE,
+    V2_MAX_CHUNK_SIZE,
+    encrypt_dat,
+    iter_decrypt,
+    iter_encrypt,
+    iter_file_chunks,
+    read_dat_header,
+)
+
+
+class Command(BaseCommand):
+    help = 'Inspect, encrypt or decrypt .dat files (v1 converter layout or chunked v2)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['info', 'encrypt', 'decrypt'])
+        parser.add_argument('source', help='Input file')
+        parser.add_argument('destination', nargs='?', help='Output file (encrypt/decrypt)')
+        parser.add_argument(
+            '--password',
+            help='Passphrase (default: CONVERTER_PASSPHRASE setting)',
+        )
+        parser.add_argument(
+            '--format-version',
+            type=int,
+            choices=[DAT_VERSION_V1, DAT_VERSION_V2],
+            default=DAT_VERSION_V2,
+            dest='dat_version',
+            help='Container version to write when encrypting (default: 2)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=V2_DEFAULT_CHUNK_SIZE,
+            help=f'v2 plaintext bytes per segment (default: {V2_DEFAULT_CHUNK_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        source = options['source']
+        if not os.path.isfile(source):
+            raise CommandError(f'File not found: {source}')
+
+        if options['action'] == 'info':
+            self._info(source)
+            return
+
+        destination = options['destination']
+        if not destination:
+            raise CommandError(f'{options["action"]} needs a destination file')
+
+        password = options['password'] or getattr(settings, 'CONVERTER_PASSPHRASE', '')
+        if not password:
+            raise CommandError('No password given and CONVERTER_PASSPHRASE is not set')
+
+        try:
+            if options['action'] == 'encrypt':
+                written = self._encrypt(source, destination, password, options['dat_version'], options['chunk_size'])
+            else:
+                written = self._decrypt(source, destination, password)
+        except ValidationError as e:
+            if os.path.exists(destination):
+                os.remove(destination)
+            raise CommandError('; '.join(e.messages))
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Wrote {destination} ({written:,} bytes)'))
+
+    def _info(self, source):
+        size = os.path.getsize(source)
+        with open(source, 'rb') as f:
+            try:
+                header = read_dat_header(f.read(V2_HEADER_SIZE))
+            except ValidationError as e:
+                raise CommandError('; '.join(e.messages))
+
+        self.stdout.write('=' * 50)
+        self.stdout.write(f'📄 {source}')
+        self.stdout.write('=' * 50)
+        self.stdout.write(f'Version:    {header.version}')
+        self.stdout.write(f'File size:  {size:,} bytes')
+        self.stdout.write(f'Salt:       {header.salt.hex()}')
+        if header.version == DAT_VERSION_V2:
+            self.stdout.write(f'Chunk size: {header.chunk_size:,} bytes')
+            self.stdout.write(f'Nonce base: {header.iv.hex()}')
+        else:
+            self.stdout.write(f'IV:         {header.iv.hex()}')
+
+    def _encrypt(self, source, destination, password, version, chunk_size):
+        if version == DAT_VERSION_V1:
+            # v1 is a single GCM message: the whole file goes through memory
+            with open(source, 'rb') as f:
+                data = encrypt_dat(f.read(), password, version=DAT_VERSION_V1)
+            with open(destination, 'wb') as out:
+                out.write(data)
+            return len(data)
+
+        if not 0 < chunk_size <= V2_MAX_CHUNK_SIZE:
+            raise CommandError(f'--chunk-size must be between 1 and {V2_MAX_CHUNK_SIZE}')
+
+        written = 0
+        with open(source, 'rb') as f, open(destination, 'wb') as out:
+            for segment in iter_encrypt(iter_file_chunks(f, chunk_size), password, chunk_size):
+                out.write(segment)
+                written += len(segment)
+        return written
+
+    def _decrypt(self, source, destination, password):
+        written = 0
+        with open(source, 'rb') as f, open(destination, 'wb') as out:
+            for chunk in iter_decrypt(f, password):
+                out.write(chunk)
+                written += len(chunk)
+        return written
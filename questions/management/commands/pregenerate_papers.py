@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Management command to pre-generate exam papers ahead of a shift
+
+Builds the ExamSession/ExamQuestion rows for every candidate holding an exam
+slot for the globally active paper type, so candidates logging in at the
+start of the shift only load their paper instead of generating it.
+
+Safe to re-run: unstarted papers from the active question set are kept,
+papers from a superseded set are rebuilt and opened papers are untouched.
+
+Usage:
+    python manage.py pregenerate_papers
+    python manage.py pregenerate_papers --trade "TTC"
+    python manage.py pregenerate_papers --workers 8 --chunk-size 50
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from questions.paper_pool import eligible_candidate_ids, pregenerate_papers
+from reference.models import Trade
+
+
+class Command(BaseCommand):
+    help = 'Pre-generate exam papers for all candidates with an exam slot'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--trade',
+            type=str,
+            help='Only pre-generate papers for this trade name',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Worker processes (default: CPU count)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100,
+            help='Candidates per worker task (default: 100)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('⚡ Exam Paper Pre-generation'))
+        self.stdout.write('=' * 50)
+
+        trade = None
+        if options.get('trade'):
+            try:
+                trade = Trade.objects.get(name__iexact=options['trade'])
+            except Trade.DoesNotExist:
+                raise CommandError(f'Trade "{options["trade"]}" not found')
+
+        candidate_ids = eligible_candidate_ids(trade)
+        if not candidate_ids:
+            self.stdout.write('ℹ️ No candidates with an exam slot found')
+            return
+
+        self.stdout.write(f'Candidates with exam slot: {len(candidate_ids)}')
+
+        start = time.perf_counter()
+        summary = pregenerate_papers(
+            candidate_ids,
+            workers=options.get('workers'),
+            chunk_size=options['chunk_size'],
+        )
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(f'  Generated:          {summary["generated"]}')
+        self.stdout.write(f'  Regenerated:        {summary["regenerated"]}')
+        self.stdout.write(f'  Already up to date: {summary["fresh"]}')
+        self.stdout.write(f'  Already started:    {summary["started"]}')
+        self.stdout.write(f'  Not eligible:       {summary["ineligible"]}')
+        if summary['failed']:
+            self.stdout.write(self.style.ERROR(f'  Failed:             {summary["failed"]}'))
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Pre-generation finished in {elapsed:.1f}s')
+        )
@@ -9,7 +9,7 @@ from questions.models import Question, QuestionPaper, ExamSession, TradePaperAct
 from results.models import CandidateAnswer
 from registration.models import CandidateProfile
 from reference.models import Trade
-from django.db.models import Count, Q
+from django.db.models import Count, F, Q
 import os
 from django.conf import settings
 
@@ -173,9 +173,13 @@ class Command(BaseCommand):
                 self.stdout.write(f"  - {paper_type}: {stat['count']}")
             
             # Recent sessions
-            recent_sessions = ExamSession.objects.order_by('-started_at')[:5]
+            recent_sessions = ExamSession.objects.order_by(F('started_at').desc(nulls_last=True))[:5]
             self.stdout.write("\nRecent Sessions:")
             for session in recent_sessions:
+                if session.started_at is None:
+                    # Pre-generated paper the candidate has not opened yet
+                    self.stdout.write(f"  - {session.user.username}: 📝 Not Started")
+                    continue
                 status = "✅ Completed" if session.completed_at else "🔄 In Progress"
                 self.stdout.write(f"  - {session.user.username}: {status} ({session.started_at.strftime('%Y-%m-%d %H:%M')})")
 
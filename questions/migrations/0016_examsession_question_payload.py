@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:27
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0015_examsession_exam_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examsession',
+            name='question_payload',
+            field=models.JSONField(blank=True, editable=False, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True),
+        ),
+    ]
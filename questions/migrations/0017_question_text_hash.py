@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:34
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_text_hash(apps, schema_editor):
+    """Hash the stripped, case-folded text of existing questions (same as questions.models.question_text_hash)"""
+    Question = apps.get_model('questions', 'Question')
+
+    batch = []
+    for question in Question.objects.only('id', 'text').iterator(chunk_size=1000):
+        question.text_hash = hashlib.sha256((question.text or '').strip().casefold().encode('utf-8')).hexdigest()
+        batch.append(question)
+        if len(batch) >= 1000:
+            Question.objects.bulk_update(batch, ['text_hash'])
+            batch = []
+    if batch:
+        Question.objects.bulk_update(batch, ['text_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0016_examsession_question_payload'),
+        ('reference', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='text_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_text_hash, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['text_hash', 'paper_type', 'question_set', 'part'], name='questions_q_text_ha_9eb4b8_idx'),
+        ),
+    ]
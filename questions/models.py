@@ -1,10 +1,12 @@
 # questions/models.py
 from django.db import models, transaction
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from reference.models import Trade
 from datetime import timedelta
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+import hashlib
 import re
 
 User = get_user_model()
@@ -42,6 +44,15 @@ HARD_CODED_TRADE_CONFIG = {
 HARD_CODED_COMMON_DISTRIBUTION = {"A": 15, "B": 0, "C": 5, "D": 10, "E": 3, "F": 10}
 
 
+def question_text_hash(text: str) -> str:
+    """
+    SHA-256 hex of a question's text; duplicate checks compare this, not the TextField.
+    Stripped and case-folded first, like the case-insensitive text= lookup it replaced
+    (MySQL's default collation).
+    """
+    return hashlib.sha256((text or "").strip().casefold().encode("utf-8")).hexdigest()
+
+
 def _normalize_trade_name(name: str) -> str:
     if not name:
         return ""
@@ -65,6 +76,8 @@ class Question(models.Model):
         SECONDARY = "SECONDARY", "Secondary"
 
     text = models.TextField()
+    # question_text_hash(text), kept in sync by save(); set it explicitly when using bulk_create
+    text_hash = models.CharField(max_length=64, blank=True, default="", editable=False)
     part = models.CharField(max_length=1, choices=Part.choices, default="A")
     marks = models.DecimalField(max_digits=5, decimal_places=2, default=1)
     options = models.JSONField(blank=True, null=True)  # Will be deprecated
@@ -102,11 +115,19 @@ class Question(models.Model):
         indexes = [
             models.Index(fields=['trade', 'paper_type', 'question_set', 'is_active']),
             models.Index(fields=['question_set', 'part']),
+            models.Index(fields=['text_hash', 'paper_type', 'question_set', 'part']),
         ]
 
     def __str__(self):
         return f"[{self.get_part_display()}] {self.text[:60]}..."
 
+    def save(self, *args, **kwargs):
+        self.text_hash = question_text_hash(self.text)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "text" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "text_hash"}
+        super().save(*args, **kwargs)
+
 
 class QuestionSetActivation(models.Model):
     """Model to track which question sets are active for each trade and paper type"""
@@ -290,7 +311,7 @@ class QuestionPaper(models.Model):
                 return cfg["part_distribution"].copy(), int(cfg["total_questions"])
         return None
 
-    def generate_for_candidate(self, user, trade=None, shuffle_within_parts=True):
+    def generate_for_candidate(self, user, trade=None, shuffle_within_parts=True, seed=None, start=True):
         """
         ✅ FIXED: Question Set Assignment with Persistence
         - Uses ActivateSets model for reliable question set assignment
@@ -298,19 +319,31 @@ class QuestionPaper(models.Model):
         - SECONDARY => paper_type=SECONDARY AND is_common=True AND active question_set
         - Question set assignment persists through slot changes and resets
         - HARD FAIL if cannot build required questions
+
+        The question-id pool is loaded once and sampled in Python (see
+        questions.paper_engine); all ExamQuestion rows go in one bulk_create.
+        Draws are always in random order, so ``shuffle_within_parts`` is kept
+        only for backward compatibility. Pass ``seed`` to replay a draw.
+        ``start=False`` leaves started_at empty for papers built ahead of the
+        shift (see questions.paper_pool); exam_interface stamps it on first open.
         """
+        import logging
         import random
+        from .paper_engine import draw_paper, load_question_pool, new_seed
+        from .pool_cache import rendered_questions
+        from .activation_snapshot import get_snapshot
+
+        logger = logging.getLogger(__name__)
+
+        snapshot = get_snapshot()
 
         # Determine paper type based on global activation (not individual trade)
-        try:
-            # Check what paper type is globally active
-            global_control = GlobalPaperTypeControl.objects.get(is_active=True)
-            paper_type = global_control.paper_type
-            is_secondary = (paper_type == "SECONDARY")
-        except GlobalPaperTypeControl.DoesNotExist:
+        if snapshot.global_paper_type:
+            paper_type = snapshot.global_paper_type
+        else:
             # Fallback: use the paper type from this QuestionPaper instance
-            is_secondary = (self.question_paper == "SECONDARY")
             paper_type = self.question_paper
+        is_secondary = (paper_type == "SECONDARY")
 
         if is_secondary:
             dist = HARD_CODED_COMMON_DISTRIBUTION.copy()
@@ -318,95 +351,51 @@ class QuestionPaper(models.Model):
             cfg = self._get_hardcoded_for_trade(trade)
             dist = cfg[0] if cfg else HARD_CODED_COMMON_DISTRIBUTION.copy()
 
+        if seed is None:
+            seed = new_seed()
+
         with transaction.atomic():
             session = ExamSession.objects.create(
                 paper=self,
                 user=user,
                 trade=None if is_secondary else trade,
                 exam_type=paper_type, 
-                started_at=timezone.now(),
+                started_at=timezone.now() if start else None,
                 duration=self.exam_duration,
             )
 
-            order = 1
-            total_selected = 0
-
             # ✅ CRITICAL FIX: Get active question set from ActivateSets model
             # This ensures the selected question set persists through slot changes
             active_question_set = 'A'  # Default fallback
             if trade:
-                try:
-                    # Use ActivateSets model for reliable question set retrieval
-                    activate_sets = ActivateSets.objects.get(trade=trade)
+                # Use ActivateSets (via the activation snapshot) for reliable question set retrieval
+                snapshot_set = snapshot.active_set(trade.pk, "SECONDARY" if is_secondary else "PRIMARY")
+                if snapshot_set:
+                    active_question_set = snapshot_set
+                else:
+                    # Create default ActivateSets record if it doesn't exist
+                    # (get_or_create: the snapshot may lag an uncommitted row)
+                    activate_sets, _ = ActivateSets.objects.get_or_create(
+                        trade=trade,
+                        defaults={'active_primary_set': 'A', 'active_secondary_set': 'A'}
+                    )
                     if is_secondary:
                         active_question_set = activate_sets.active_secondary_set
                     else:
                         active_question_set = activate_sets.active_primary_set
-                except ActivateSets.DoesNotExist:
-                    # Create default ActivateSets record if it doesn't exist
-                    activate_sets = ActivateSets.objects.create(
-                        trade=trade,
-                        active_primary_set='A',
-                        active_secondary_set='A'
-                    )
-                    active_question_set = 'A'
 
             # Log the question set being used for debugging
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.info(f"Generating exam for {user.username}, Trade: {trade}, Paper: {paper_type}, Question Set: {active_question_set}")
-
-            for part, count in dist.items():
-                count = int(count)
-                if count <= 0:
-                    continue
-
-                qs = Question.objects.filter(is_active=True, part=part)
-
-                if is_secondary:
-                    # For SECONDARY questions, filter by trade code in question text
-                    # to ensure only trade-specific questions are selected
-                    qs = qs.filter(
-                        paper_type="SECONDARY", 
-                        is_common=True,
-                        question_set=active_question_set,
-                        
-                    )
-                else:
-                    # ✅ CRITICAL: Filter by trade, paper type, AND active question set
-                    qs = qs.filter(
-                        paper_type="PRIMARY", 
-                        trade=trade,
-                        question_set=active_question_set
-                    )
+            logger.info(f"Generating exam for {user.username}, Trade: {trade}, Paper: {paper_type}, Question Set: {active_question_set}, Seed: {seed}")
 
-                selected = list(qs.order_by("?")[:count])
-
-                # if len(selected) < count:
-                #     # Enhanced error message with debugging info
-                #     available_sets = Question.objects.filter(
-                #         is_active=True, 
-                #         part=part,
-                #         paper_type=paper_type,
-                #         trade=trade if not is_secondary else None
-                #     ).values_list('question_set', flat=True).distinct()
-                    
-                #     raise ValidationError(
-                #         f"❌ CRITICAL: Not enough questions for {trade} {paper_type} part {part} "
-                #         f"from question set {active_question_set}. "
-                #         f"Required {count}, found {len(selected)}. "
-                #         f"Available sets for this trade: {list(available_sets)}. "
-                #         f"Check question set activation in admin."
-                #     )
-
-                if shuffle_within_parts:
-                    random.shuffle(selected)
-
-                for q in selected:
-                    ExamQuestion.objects.create(session=session, question=q, order=order)
-                    order += 1
-                    total_selected += 1
+            pool = load_question_pool(
+                paper_type="SECONDARY" if is_secondary else "PRIMARY",
+                question_set=active_question_set,
+                trade=trade,
+                parts=[part for part, count in dist.items() if int(count) > 0],
+            )
+            selected_ids = draw_paper(pool, dist, random.Random(seed))
 
+            total_selected = len(selected_ids)
             if total_selected == 0:
                 raise ValidationError(
                     f"❌ CRITICAL: No questions selected for {trade} {paper_type} "
@@ -414,8 +403,15 @@ class QuestionPaper(models.Model):
                     f"Check trade tagging, paper_type, and question set activation."
                 )
 
+            ExamQuestion.objects.bulk_create([
+                ExamQuestion(session=session, question_id=qid, order=order)
+                for order, qid in enumerate(selected_ids, start=1)
+            ])
+
             session.total_questions = total_selected
-            session.save(update_fields=["total_questions"])
+            # Pools were just loaded, so the snapshot is built without extra queries
+            session.question_payload = rendered_questions(selected_ids)
+            session.save(update_fields=["total_questions", "question_payload"])
             
             # Log successful generation
             logger.info(f"✅ Successfully generated {total_selected} questions for {user.username} from question set {active_question_set}")
@@ -458,6 +454,11 @@ class ExamSession(models.Model):
         max_length=20,
         choices=[("PRIMARY", "Primary"), ("SECONDARY", "Secondary")]
     )
+    # Frozen copy of the rendered paper (ordered question dicts), written once at
+    # generation so reloads read this row only and edits to Question rows
+    # can't change a paper mid-exam. NULL for sessions created before snapshots.
+    question_payload = models.JSONField(null=True, blank=True, editable=False, encoder=DjangoJSONEncoder)
+
     class Meta:
         ordering = ["-started_at"]
 
@@ -628,62 +629,50 @@ class ActivateSets(models.Model):
             # If question sets changed, clear incomplete sessions for this trade
             if sets_changed:
                 from registration.models import CandidateProfile
-                candidates = CandidateProfile.objects.filter(trade=self.trade)
-                total_cleared = 0
-                
-                for candidate in candidates:
-                    # Import here to avoid circular imports
-                    incomplete_sessions = ExamSession.objects.filter(
-                        user=candidate.user,
-                        completed_at__isnull=True
-                    )
-                    cleared_count = incomplete_sessions.count()
-                    if cleared_count > 0:
-                        incomplete_sessions.delete()
-                        total_cleared += cleared_count
+                from registration.slots import delete_incomplete_sessions
+
+                # One set-based delete for the whole trade (sessions joined through CandidateProfile.trade)
+                cleared = delete_incomplete_sessions(
+                    CandidateProfile.objects.filter(trade=self.trade).values("user_id")
+                )
+                total_cleared = sum(cleared.values())
                 
                 if total_cleared > 0:
                     print(f"✅ Cleared {total_cleared} incomplete sessions for {self.trade.name} due to question set change")
             
-            # Sync PRIMARY set activation
-            if self.active_primary_set:
-                # Deactivate all PRIMARY sets for this trade
-                QuestionSetActivation.objects.filter(
-                    trade=self.trade,
-                    paper_type='PRIMARY'
-                ).update(is_active=False)
-                
-                # Activate the selected PRIMARY set
-                activation, created = QuestionSetActivation.objects.get_or_create(
-                    trade=self.trade,
-                    paper_type='PRIMARY',
-                    question_set=self.active_primary_set,
-                    defaults={'is_active': True, 'activated_by': self.updated_by}
+            # Sync QuestionSetActivation: selected set active per paper type, every other set of the trade inactive
+            selected = {
+                paper_type: question_set
+                for paper_type, question_set in (
+                    ('PRIMARY', self.active_primary_set),
+                    ('SECONDARY', self.active_secondary_set),
                 )
-                if not created:
-                    activation.is_active = True
-                    activation.activated_by = self.updated_by
-                    activation.save()
-            
-            # Sync SECONDARY set activation
-            if self.active_secondary_set:
-                # Deactivate all SECONDARY sets for this trade
+                if question_set
+            }
+            if selected:
+                QuestionSetActivation.objects.bulk_create(
+                    [
+                        QuestionSetActivation(trade=self.trade, paper_type=paper_type, question_set=question_set)
+                        for paper_type, question_set in selected.items()
+                    ],
+                    ignore_conflicts=True,
+                )
+                selected_rows = models.Q()
+                for paper_type, question_set in selected.items():
+                    selected_rows |= models.Q(paper_type=paper_type, question_set=question_set)
+
+                # .update() sends no post_save: the question pools and activation snapshot
+                # are invalidated by ActivateSets' own post_save once this transaction commits
                 QuestionSetActivation.objects.filter(
                     trade=self.trade,
-                    paper_type='SECONDARY'
-                ).update(is_active=False)
-                
-                # Activate the selected SECONDARY set
-                activation, created = QuestionSetActivation.objects.get_or_create(
-                    trade=self.trade,
-                    paper_type='SECONDARY',
-                    question_set=self.active_secondary_set,
-                    defaults={'is_active': True, 'activated_by': self.updated_by}
+                    paper_type__in=selected,
+                    is_active=True,
+                ).exclude(selected_rows).update(is_active=False)
+                QuestionSetActivation.objects.filter(selected_rows, trade=self.trade).update(
+                    is_active=True,
+                    activated_by=self.updated_by,
+                    activated_at=timezone.now(),
                 )
-                if not created:
-                    activation.is_active = True
-                    activation.activated_by = self.updated_by
-                    activation.save()
     
     @classmethod
     def get_or_create_for_trade(cls, trade, user=None):
@@ -787,3 +776,15 @@ class ExamQuestion(models.Model):
 
     def __str__(self):
         return f"{self.session} - Q{self.order} ({self.question.pk})"
+
+
+class CacheGeneration(models.Model):
+    """
+    Invalidation counter shared by every process (questions.generations):
+    the activation snapshot and the question pools are rebuilt when theirs moves on.
+    """
+    name = models.CharField(max_length=64, primary_key=True)
+    value = models.BigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
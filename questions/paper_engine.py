@@ -0,0 +1,58 @@
+# questions/paper_engine.py
+"""
+Set-based paper generation engine.
+
+The eligible question ids for one (trade, paper_type, question_set) pool are
+loaded once (and cached, see questions.pool_cache), every part is sampled in
+Python with a seeded RNG and the caller writes all ExamQuestion rows with one
+bulk_create.
+
+A uniform ``rng.sample`` over the id pool draws exactly like the old
+``order_by("?")[:count]`` per part: every subset of ``count`` questions is
+equally likely and the drawn questions come back in random order.
+"""
+import random
+import secrets
+from typing import Dict, Iterable, List, Optional, Sequence
+
+
+def new_seed() -> int:
+    """Fresh 64-bit seed for one paper draw (logged so a paper can be replayed)."""
+    return secrets.randbits(64)
+
+
+def load_question_pool(paper_type: str, question_set: str, trade=None, parts: Optional[Iterable[str]] = None) -> Dict[str, Sequence[int]]:
+    """
+    Return ``{part: question ids}`` for one active question pool.
+
+    - PRIMARY   => paper_type=PRIMARY AND trade matches AND question_set
+    - SECONDARY => paper_type=SECONDARY AND is_common=True AND question_set
+
+    Served from the in-process pool cache (questions.pool_cache), so repeated
+    generations for the same active set don't touch the Question table.
+    """
+    from .pool_cache import get_pool
+
+    part_ids = get_pool(paper_type, question_set, trade).part_ids
+    if parts is None:
+        return dict(part_ids)
+    return {part: part_ids[part] for part in parts if part in part_ids}
+
+
+def draw_paper(pool: Dict[str, Sequence[int]], distribution: Dict[str, int], rng: random.Random) -> List[int]:
+    """
+    Draw question ids part by part following ``distribution``.
+
+    Parts are emitted in distribution order; a part with fewer questions than
+    required contributes everything it has (same as the old slice behaviour).
+    """
+    selected: List[int] = []
+    for part, count in distribution.items():
+        count = int(count)
+        if count <= 0:
+            continue
+        ids = pool.get(part, [])
+        if not ids:
+            continue
+        selected.extend(rng.sample(ids, min(count, len(ids))))
+    return selected
@@ -0,0 +1,150 @@
+# questions/paper_pool.py
+"""
+Pre-generated paper pool.
+
+Builds ExamSession/ExamQuestion sets ahead of the shift for every candidate
+holding an exam slot for the globally active paper type, so the first
+exam_interface GET is a lookup instead of a paper generation.
+
+Re-running is safe: unstarted papers drawn from the currently active
+question set are kept, unstarted papers from an older set (ActivateSets
+changed) are rebuilt, and papers a candidate has already opened are never
+touched.
+"""
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_KEYS = ("generated", "regenerated", "fresh", "started", "ineligible", "failed")
+
+
+def _init_worker():
+    """Process-pool initializer: spawned workers start without Django configured."""
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def eligible_candidate_ids(trade=None) -> List[int]:
+    """Candidates holding an exam slot (exam type is checked per candidate while generating)."""
+    from registration.models import CandidateProfile
+
+    qs = CandidateProfile.objects.filter(has_exam_slot=True, trade__isnull=False)
+    if trade is not None:
+        qs = qs.filter(trade=trade)
+    return list(qs.order_by("id").values_list("id", flat=True))
+
+
+def _pregenerate_chunk(candidate_ids: List[int]) -> Dict[str, int]:
+    """Generate papers for one chunk of candidates (runs inside a worker process)."""
+    from registration.models import CandidateProfile
+    from .activation_snapshot import get_snapshot
+    from .models import ExamQuestion, ExamSession
+
+    summary = dict.fromkeys(SUMMARY_KEYS, 0)
+
+    snapshot = get_snapshot()
+    paper_type = snapshot.global_paper_type
+    paper = snapshot.paper(paper_type) if paper_type else None
+    if paper is None:
+        summary["ineligible"] = len(candidate_ids)
+        return summary
+
+    candidates = list(
+        CandidateProfile.objects.filter(id__in=candidate_ids, has_exam_slot=True)
+        .select_related("user", "trade")
+    )
+    summary["ineligible"] += len(candidate_ids) - len(candidates)
+
+    # Existing incomplete papers and the question set(s) each was drawn from
+    existing: Dict[int, List] = {}
+    for session in ExamSession.objects.filter(
+        user_id__in=[c.user_id for c in candidates],
+        paper=paper,
+        exam_type=paper_type,
+        completed_at__isnull=True,
+    ):
+        existing.setdefault(session.user_id, []).append(session)
+
+    session_sets: Dict[int, set] = {}
+    for session_id, question_set in (
+        ExamQuestion.objects.filter(session__in=[s for sessions in existing.values() for s in sessions])
+        .values_list("session_id", "question__question_set")
+        .distinct()
+    ):
+        session_sets.setdefault(session_id, set()).add(question_set)
+
+    for candidate in candidates:
+        activation = snapshot.activation(candidate.trade_id, paper_type)
+        completed = candidate.is_primary_completed if paper_type == "PRIMARY" else candidate.is_secondary_completed
+        if activation is None or completed or candidate.get_next_exam_type() != paper_type:
+            summary["ineligible"] += 1
+            continue
+
+        sessions = existing.get(candidate.user_id, [])
+        if any(s.started_at is not None for s in sessions):
+            # Candidate already opened the paper - leave it alone
+            summary["started"] += 1
+            continue
+
+        expected_set = snapshot.active_set(candidate.trade_id, paper_type) or "A"
+        if any(session_sets.get(s.id) == {expected_set} for s in sessions):
+            summary["fresh"] += 1
+            continue
+
+        try:
+            if sessions:
+                ExamSession.objects.filter(id__in=[s.id for s in sessions]).delete()
+
+            session = paper.generate_for_candidate(
+                user=candidate.user,
+                trade=candidate.trade,
+                start=False,
+            )
+            if activation.exam_duration:
+                session.duration = activation.exam_duration
+                session.save(update_fields=["duration"])
+
+            summary["regenerated" if sessions else "generated"] += 1
+        except Exception as e:
+            logger.error("Paper pre-generation failed for %s: %s", candidate.army_no, e)
+            summary["failed"] += 1
+
+    return summary
+
+
+def pregenerate_papers(candidate_ids: Optional[Iterable[int]] = None, workers: Optional[int] = None, chunk_size: int = 100) -> Dict[str, int]:
+    """
+    Pre-generate papers for ``candidate_ids`` (default: every candidate with a slot)
+    across a process pool. Returns summary counts keyed by SUMMARY_KEYS plus ``candidates``.
+    """
+    candidate_ids = list(candidate_ids) if candidate_ids is not None else eligible_candidate_ids()
+    chunk_size = max(1, chunk_size)
+    chunks = [candidate_ids[i:i + chunk_size] for i in range(0, len(candidate_ids), chunk_size)]
+
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+    if workers <= 1:
+        results = [_pregenerate_chunk(chunk) for chunk in chunks]
+    else:
+        # spawn: forked children would share the parent's DB socket
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        ) as executor:
+            results = list(executor.map(_pregenerate_chunk, chunks))
+
+    summary = dict.fromkeys(SUMMARY_KEYS, 0)
+    for result in results:
+        for key, value in result.items():
+            summary[key] += value
+    summary["candidates"] = len(candidate_ids)
+
+    logger.info("Paper pre-generation finished: %s", summary)
+    return summary
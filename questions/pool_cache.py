@@ -0,0 +1,131 @@
+# questions/pool_cache.py
+"""
+In-process question-pool cache.
+
+One QuestionPool per active (paper_type, question_set, trade) holds compact
+per-part arrays of question ids plus the rendered fields the exam page needs.
+Pools are tagged with a version number kept in the database
+(questions.generations); any change to questions or activations bumps the
+version (see questions/signals.py). This process rebuilds its pools on the
+next read, other processes within CACHE_GENERATION_CHECK_SECONDS.
+"""
+import logging
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+from django.db import transaction
+
+from .generations import Generation
+
+logger = logging.getLogger(__name__)
+
+_version = Generation("question_pools")
+
+# Fields rendered by registration/exam_interface.html
+RENDERED_FIELDS = ("id", "text", "part", "marks", "option_a", "option_b", "option_c", "option_d", "options")
+
+_pools: Dict[tuple, "QuestionPool"] = {}
+_lock = threading.Lock()
+
+
+class QuestionPool:
+    """Immutable snapshot of one active question set."""
+
+    __slots__ = ("version", "part_ids", "rendered")
+
+    def __init__(self, version: int, part_ids: Dict[str, array], rendered: Dict[int, dict]):
+        self.version = version
+        self.part_ids = part_ids
+        self.rendered = rendered
+
+    def ids(self, part: str) -> array:
+        return self.part_ids.get(part, array("q"))
+
+    def count(self, part: Optional[str] = None) -> int:
+        if part is not None:
+            return len(self.ids(part))
+        return sum(len(ids) for ids in self.part_ids.values())
+
+
+def current_version() -> int:
+    return _version.current()
+
+
+def bump_version() -> None:
+    """Invalidate every cached pool: in this process now, in the others once they re-read the DB counter."""
+    _version.bump()
+    with _lock:
+        _pools.clear()
+    logger.debug("Question pool cache invalidated")
+
+
+def invalidate_on_commit() -> None:
+    """
+    Bump the version once the surrounding transaction commits, so no reader can
+    rebuild a pool from uncommitted data under the new version.
+    """
+    transaction.on_commit(bump_version)
+
+
+def _build_pool(paper_type: str, question_set: str, trade_id: Optional[int], version: int) -> QuestionPool:
+    from .models import Question
+
+    qs = Question.objects.filter(is_active=True, question_set=question_set)
+    if paper_type == "SECONDARY":
+        qs = qs.filter(paper_type="SECONDARY", is_common=True)
+    else:
+        qs = qs.filter(paper_type="PRIMARY", trade_id=trade_id)
+
+    part_lists: Dict[str, List[int]] = {}
+    rendered: Dict[int, dict] = {}
+    # order_by("id") keeps arrays stable so seeded draws are reproducible
+    for row in qs.order_by("id").values(*RENDERED_FIELDS):
+        part_lists.setdefault(row["part"], []).append(row["id"])
+        rendered[row["id"]] = row
+
+    part_ids = {part: array("q", ids) for part, ids in part_lists.items()}
+    return QuestionPool(version, part_ids, rendered)
+
+
+def get_pool(paper_type: str, question_set: str, trade=None) -> QuestionPool:
+    """Return the cached pool for an active set, building it on first use."""
+    trade_id = None if paper_type == "SECONDARY" else getattr(trade, "pk", trade)
+    key = (paper_type, question_set, trade_id)
+    version = current_version()
+
+    pool = _pools.get(key)
+    if pool is not None and pool.version == version:
+        return pool
+
+    pool = _build_pool(paper_type, question_set, trade_id, version)
+    with _lock:
+        _pools[key] = pool
+    return pool
+
+
+def rendered_questions(question_ids: Iterable[int]) -> List[dict]:
+    """
+    Rendered question dicts for ``question_ids`` in the given order.
+    Served from any live pool; ids not cached in this process (e.g. a question
+    deactivated mid-exam) are read from the DB in one query.
+    """
+    from .models import Question
+
+    question_ids = list(question_ids)
+    version = current_version()
+    live = [pool.rendered for pool in list(_pools.values()) if pool.version == version]
+
+    found: Dict[int, dict] = {}
+    for qid in question_ids:
+        for rendered in live:
+            row = rendered.get(qid)
+            if row is not None:
+                found[qid] = row
+                break
+
+    missing = [qid for qid in question_ids if qid not in found]
+    if missing:
+        for row in Question.objects.filter(id__in=missing).values(*RENDERED_FIELDS):
+            found[row["id"]] = row
+    return [found[qid] for qid in question_ids if qid in found]
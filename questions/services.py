@@ -3,29 +3,39 @@ import json
 import logging
 import re
 import csv
-from typing import Dict, List, Optional, Tuple
+import string
+from itertools import islice, product
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
+import numpy as np
+import openpyxl
 import pandas as pd
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Q
 from django.core.exceptions import ValidationError
 
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-
 from reference.models import Trade
-from .models import Question
+from .models import Question, question_text_hash
 from .csv_processor import QuestionCSVProcessor
+from .dat_format import (  # noqa: F401 - re-exported, these used to live here
+    IV_SIZE,
+    KEY_LENGTH_BYTES,
+    PBKDF2_ITERATIONS,
+    SALT_SIZE,
+    DerivedKeyCache,
+    _derive_key,
+    dat_key_cache,
+    decrypt_dat,
+    decrypt_with_key,
+    derive_dat_key,
+    is_encrypted_dat,
+    split_dat_content,
+)
+from .pool_cache import invalidate_on_commit
 
 logger = logging.getLogger(__name__)
 
-# ============================================================
-# Encryption format (matches your Converter crypto.ts)
-# ============================================================
-SALT_SIZE = 16
-IV_SIZE = 12
-KEY_LENGTH_BYTES = 32  # 256-bit
-PBKDF2_ITERATIONS = 100000
 
 def decrypt_or_load_excel_bytes(file_bytes: bytes, password: str) -> bytes:
     """
@@ -40,53 +50,13 @@ def decrypt_or_load_excel_bytes(file_bytes: bytes, password: str) -> bytes:
     except Exception as e:
         raise ValueError(f"Unable to decrypt/load file: {e}")
 
-def is_encrypted_dat(file_bytes: bytes) -> bool:
-    """
-    Your converter output format:
-      [salt(16)][iv(12)][ciphertext+tag(variable)]
-    So minimum length must be > 28 bytes.
-    """
-    return isinstance(file_bytes, (bytes, bytearray)) and len(file_bytes) > (SALT_SIZE + IV_SIZE)
-
-
-def _derive_key(passphrase: str, salt: bytes) -> bytes:
-    if not passphrase:
-        raise ValidationError("Decryption password is required.")
-    if not salt or len(salt) != SALT_SIZE:
-        raise ValidationError("Invalid .dat format (salt missing/corrupt).")
-
-    kdf = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=KEY_LENGTH_BYTES,
-        salt=salt,
-        iterations=PBKDF2_ITERATIONS,
-    )
-    return kdf.derive(passphrase.encode("utf-8"))
-
 
 def decrypt_dat_content(file_bytes: bytes, passphrase: str) -> bytes:
     """
     Decrypt .dat produced by the Question Paper Converter (AES-GCM, PBKDF2 SHA-256).
+    Accepts both the converter (v1) and the chunked v2 layout (questions.dat_format).
     """
-    if not is_encrypted_dat(file_bytes):
-        raise ValidationError("Invalid .dat file format or file is too small.")
-
-    salt = file_bytes[:SALT_SIZE]
-    iv = file_bytes[SALT_SIZE:SALT_SIZE + IV_SIZE]
-    encrypted_content = file_bytes[SALT_SIZE + IV_SIZE:]
-
-    if len(iv) != IV_SIZE:
-        raise ValidationError("Invalid .dat format (iv missing/corrupt).")
-
-    key = _derive_key(passphrase, salt)
-
-    try:
-        aesgcm = AESGCM(key)
-        decrypted = aesgcm.decrypt(iv, encrypted_content, None)
-        return decrypted
-    except Exception as e:
-        # Wrong password OR corrupted file
-        raise ValidationError(f"Unable to decrypt .dat file. Check password. Details: {e}")
+    return decrypt_dat(file_bytes, passphrase)
 
 
 def decrypt_or_load_excel_bytes(file_bytes: bytes, passphrase: str) -> bytes:
@@ -114,175 +84,279 @@ def _norm(s: str) -> str:
     return re.sub(r"\s+", " ", str(s or "").strip()).upper()
 
 
-def load_questions_from_excel_data(excel_bytes: bytes) -> List[Dict]:
+# ------------------------------------------------------------
+# Header aliases (normalized with _norm) -> row key
+# ------------------------------------------------------------
+EXCEL_COLUMN_ALIASES = {
+    **dict.fromkeys(("QUESTION", "QUESTIONS", "Q", "QNS", "QUESTION TEXT"), "text"),
+    **dict.fromkeys(("PART", "SECTION"), "part"),
+    **dict.fromkeys(("MARKS", "MARK", "SCORE"), "marks"),
+    **dict.fromkeys(("OPTION", "OPTIONS", "OPT"), "options"),
+    **dict.fromkeys(("OPTION_A", "OPTION A"), "option_a"),
+    **dict.fromkeys(("OPTION_B", "OPTION B"), "option_b"),
+    **dict.fromkeys(("OPTION_C", "OPTION C"), "option_c"),
+    **dict.fromkeys(("OPTION_D", "OPTION D"), "option_d"),
+    **dict.fromkeys(("CORRECT", "CORRECT ANSWER", "ANSWER", "ANS", "CORRECT_ANSWER"), "correct_answer"),
+    **dict.fromkeys(("TRADE", "TRADE NAME"), "trade"),
+    **dict.fromkeys(("PAPER TYPE", "PAPER", "TYPE", "PAPER_TYPE"), "paper_type"),
+    **dict.fromkeys(("QUESTION SET", "QUESTION_SET", "SET", "QS"), "question_set"),
+    **dict.fromkeys(("IS COMMON", "IS_COMMON", "COMMON"), "is_common"),
+    **dict.fromkeys(("IS ACTIVE", "IS_ACTIVE", "ACTIVE"), "is_active"),
+}
+
+# Rows normalized per DataFrame when streaming a sheet
+EXCEL_STREAM_CHUNK_ROWS = 2000
+
+PART_CODES = frozenset("ABCDEF")
+QUESTION_SET_CODES = frozenset(string.ascii_uppercase)
+TRUTHY_STRINGS = ("true", "1", "yes", "y")
+
+# Keys (and order) of each row dict returned by load_questions_from_excel_data
+QUESTION_ROW_KEYS = (
+    "text", "part", "marks", "options", "option_a", "option_b", "option_c", "option_d",
+    "correct_answer", "trade", "paper_type", "question_set", "is_common", "is_active",
+)
+
+
+def map_excel_columns(columns) -> Dict[str, str]:
+    """Row key -> sheet column, resolved once per sheet from EXCEL_COLUMN_ALIASES."""
+    col_map = {}
+    for c in columns:
+        key = EXCEL_COLUMN_ALIASES.get(_norm(c))
+        if key:
+            col_map[key] = c
+    return col_map
+
+
+def _text_column(df: pd.DataFrame, column: Optional[str]) -> pd.Series:
+    """Stripped string values of ``column``; blank cells (and a missing column) become ''."""
+    if column is None:
+        return pd.Series("", index=df.index, dtype=object)
+    series = df[column].astype(object)
+    return series.where(series.notna(), "").astype(str).str.strip()
+
+
+def _norm_column(series: pd.Series) -> pd.Series:
+    """Vectorized _norm: collapse whitespace, strip, upper-case."""
+    return series.str.replace(r"\s+", " ", regex=True).str.strip().str.upper()
+
+
+def _bool_column(df: pd.DataFrame, column: Optional[str], default: bool) -> pd.Series:
+    """Strings are true for TRUTHY_STRINGS, other values by truthiness; blanks get ``default``."""
+    if column is None:
+        return pd.Series(default, index=df.index, dtype=bool)
+
+    series = df[column]
+    blank = series.isna()
+    if pd.api.types.is_numeric_dtype(series):
+        values = series.fillna(0).astype(bool)
+    else:
+        series = series.astype(object)
+        is_str = series.map(type).eq(str)
+        from_str = series.where(is_str, "").astype(str).str.lower().isin(TRUTHY_STRINGS)
+        values = from_str.where(is_str, series.where(~is_str & ~blank, False).astype(bool))
+    return values.mask(blank, default).astype(bool)
+
+
+def _marks_column(df: pd.DataFrame, column: Optional[str]) -> pd.Series:
+    """Marks as floats; blank or unparsable cells count as 1."""
+    if column is None:
+        return pd.Series(1.0, index=df.index, dtype=float)
+
+    series = df[column]
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float).fillna(1.0)
+
+    text = _text_column(df, column)
+    marks = pd.to_numeric(text, errors="coerce")
+    # Leave the odd value pandas can't parse to float() (e.g. '1_000')
+    retry = marks.isna() & text.ne("")
+    if retry.any():
+        marks[retry] = text[retry].map(_float_or_default)
+    return marks.fillna(1.0).astype(float)
+
+
+def _float_or_default(value: str, default: float = 1.0) -> float:
+    try:
+        number = float(value)
+    except Exception:
+        return default
+    return number if number == number else default
+
+
+def _json_or_text_column(df: pd.DataFrame, column: Optional[str]) -> List:
+    """_safe_json_or_text for a whole column; only JSON-looking cells are parsed."""
+    if column is None:
+        return [None] * len(df)
+
+    text = _text_column(df, column)
+    looks_json = (text.str.startswith("{") & text.str.endswith("}")) | (
+        text.str.startswith("[") & text.str.endswith("]")
+    )
+    values = [v or None for v in text.tolist()]
+    for i in np.flatnonzero(looks_json.to_numpy()):
+        values[i] = _safe_json_or_text(values[i])
+    return values
+
+
+def normalize_question_frame(df: pd.DataFrame) -> List[Dict]:
     """
-    Reads Excel bytes and returns list of dicts for each question row.
+    Columnar normalization of a question sheet.
 
-    IMPORTANT:
-    - Uses openpyxl engine explicitly to avoid pandas 'engine cannot be determined'.
-    - Enhanced with comprehensive error handling and validation
+    Every field is normalized with pandas/NumPy column operations; row dicts
+    (keys QUESTION_ROW_KEYS) are only built at the end. Blank cells take the
+    same default as a missing column.
     """
-    if not excel_bytes:
-        raise ValidationError("Excel file content is empty.")
-    
-    try:
-        df = pd.read_excel(io.BytesIO(excel_bytes), engine="openpyxl")
-    except Exception as e:
-        raise ValidationError(f"File content is not a readable Excel file. Details: {e}")
+    col_map = map_excel_columns(df.columns)
+    if "text" not in col_map:
+        raise ValidationError("Excel must contain a Question column (e.g., 'Question').")
 
+    text = _text_column(df, col_map["text"])
+    keep = text.ne("")
+    df, text = df.loc[keep], text.loc[keep]
     if df.empty:
-        raise ValidationError("Excel file contains no data rows.")
+        return []
+
+    part = _norm_column(_text_column(df, col_map.get("part"))).str[:1]
+    part = part.where(part.isin(PART_CODES), "A")
+
+    marks = _marks_column(df, col_map.get("marks"))
+
+    trade = _norm_column(_text_column(df, col_map.get("trade")))
+    paper_type_raw = _norm_column(_text_column(df, col_map.get("paper_type")))
+
+    if col_map.get("question_set"):
+        set_raw = _text_column(df, col_map["question_set"])
+        question_set = _norm_column(set_raw).str[:1].mask(set_raw.eq(""), "A")
+        invalid_set = ~question_set.isin(QUESTION_SET_CODES)
+        if invalid_set.any():
+            # Not a set letter in the column: try "Set X" in the question text
+            from_text = text[invalid_set].str.extract(r"Set ([A-Z])", expand=False).fillna("A")
+            question_set = question_set.astype(object)
+            question_set[invalid_set] = from_text
+    else:
+        question_set = pd.Series("A", index=df.index, dtype=object)
+
+    is_common = _bool_column(df, col_map.get("is_common"), False)
+    is_active = _bool_column(df, col_map.get("is_active"), True)
+
+    # Enhanced logic with text-based SECONDARY detection:
+    # 1. If paper_type column exists: use it
+    # 2. If question text contains "SECONDARY": classify as SECONDARY
+    # 3. Else infer: If trade == ALL => SECONDARY else PRIMARY
+    explicit_primary = paper_type_raw.isin(("PRIMARY", "P")).to_numpy()
+    explicit_secondary = paper_type_raw.isin(("SECONDARY", "S")).to_numpy()
+    text_secondary = (
+        ~explicit_primary
+        & ~explicit_secondary
+        & text.str.upper().str.contains("SECONDARY", regex=False).to_numpy()
+    )
+    paper_type = np.select(
+        [explicit_primary, explicit_secondary | text_secondary],
+        ["PRIMARY", "SECONDARY"],
+        default=np.where(trade.eq("ALL").to_numpy(), "SECONDARY", "PRIMARY"),
+    )
+    if text_secondary.any():
+        # Text-detected secondary questions are common and have no trade
+        is_common = is_common | text_secondary
+        trade = trade.mask(text_secondary, "")
+        logger.info("Text-based SECONDARY detection: %s question(s) classified as SECONDARY", int(text_secondary.sum()))
+
+    # Separate option fields; the legacy options JSON column only for rows without them
+    option_columns = [
+        [v or None for v in _text_column(df, col_map.get(key)).tolist()]
+        for key in ("option_a", "option_b", "option_c", "option_d")
+    ]
+    has_options = [any(values) for values in zip(*option_columns)]
+    legacy_options = _json_or_text_column(df, col_map.get("options"))
+    options = [None if has else legacy for has, legacy in zip(has_options, legacy_options)]
+
+    correct_answer = _json_or_text_column(df, col_map.get("correct_answer"))
+
+    columns = (
+        text.tolist(),
+        part.tolist(),
+        marks.tolist(),
+        options,
+        *option_columns,
+        correct_answer,
+        trade.tolist(),                  # OCC / DMV / ALL etc.
+        paper_type.tolist(),             # PRIMARY / SECONDARY
+        question_set.tolist(),           # A, B, C, D, E, etc.
+        is_common.tolist(),              # True/False
+        is_active.tolist(),              # True/False
+    )
+    return [dict(zip(QUESTION_ROW_KEYS, values)) for values in zip(*columns)]
 
-    # Normalize columns
-    df.columns = [str(c).strip() for c in df.columns]
 
-    # Attempt to map common possible column names
-    # You can adjust these mappings if your sheet uses different headings.
-    col_map = {}
-    for c in df.columns:
-        uc = _norm(c)
-        if uc in ("QUESTION", "QUESTIONS", "Q", "QNS", "QUESTION TEXT"):
-            col_map["text"] = c
-        elif uc in ("PART", "SECTION"):
-            col_map["part"] = c
-        elif uc in ("MARKS", "MARK", "SCORE"):
-            col_map["marks"] = c
-        elif uc in ("OPTION", "OPTIONS", "OPT"):
-            col_map["options"] = c
-        elif uc in ("OPTION_A", "OPTION A"):
-            col_map["option_a"] = c
-        elif uc in ("OPTION_B", "OPTION B"):
-            col_map["option_b"] = c
-        elif uc in ("OPTION_C", "OPTION C"):
-            col_map["option_c"] = c
-        elif uc in ("OPTION_D", "OPTION D"):
-            col_map["option_d"] = c
-        elif uc in ("CORRECT", "CORRECT ANSWER", "ANSWER", "ANS", "CORRECT_ANSWER"):
-            col_map["correct_answer"] = c
-        elif uc in ("TRADE", "TRADE NAME"):
-            col_map["trade"] = c
-        elif uc in ("PAPER TYPE", "PAPER", "TYPE", "PAPER_TYPE"):
-            col_map["paper_type"] = c
-        elif uc in ("QUESTION SET", "QUESTION_SET", "SET", "QS"):
-            col_map["question_set"] = c
-        elif uc in ("IS COMMON", "IS_COMMON", "COMMON"):
-            col_map["is_common"] = c
-        elif uc in ("IS ACTIVE", "IS_ACTIVE", "ACTIVE"):
-            col_map["is_active"] = c
+def _sheet_headers(header_row) -> List[str]:
+    """Header names as pandas would give them: stripped, 'Unnamed: n' for blanks, '.n' for repeats."""
+    headers, counts = [], {}
+    for i, value in enumerate(header_row):
+        name = str(value).strip() if value is not None else f"Unnamed: {i}"
+        if name in counts:
+            counts[name] += 1
+            name = f"{name}.{counts[name]}"
+        else:
+            counts[name] = 0
+        headers.append(name)
+    return headers
 
-    if "text" not in col_map:
-        raise ValidationError("Excel must contain a Question column (e.g., 'Question').")
 
-    rows: List[Dict] = []
-    for _, r in df.iterrows():
-        text = str(r.get(col_map["text"], "")).strip()
-        if not text:
-            continue
+def iter_questions_from_excel_data(excel_bytes: bytes, chunk_rows: int = EXCEL_STREAM_CHUNK_ROWS) -> Iterator[Dict]:
+    """
+    Stream normalized question rows from the first sheet of an .xlsx.
 
-        part = str(r.get(col_map.get("part", ""), "A")).strip() if col_map.get("part") else "A"
-        part = _norm(part)[:1] if part else "A"
-        if part not in {"A", "B", "C", "D", "E", "F"}:
-            part = "A"
+    The workbook is read with openpyxl read_only / iter_rows(values_only=True)
+    and normalized ``chunk_rows`` rows at a time (normalize_question_frame),
+    so memory stays flat however large the bank is. Errors surface as
+    ValidationError on the first next().
+    """
+    if not excel_bytes:
+        raise ValidationError("Excel file content is empty.")
 
-        marks_val = r.get(col_map.get("marks", ""), 1) if col_map.get("marks") else 1
-        try:
-            marks = float(marks_val) if str(marks_val).strip() != "" else 1.0
-        except Exception:
-            marks = 1.0
+    try:
+        workbook = openpyxl.load_workbook(io.BytesIO(excel_bytes), read_only=True, data_only=True)
+    except Exception as e:
+        raise ValidationError(f"File content is not a readable Excel file. Details: {e}")
 
-        trade_val = str(r.get(col_map.get("trade", ""), "")).strip() if col_map.get("trade") else ""
-        paper_type_val = str(r.get(col_map.get("paper_type", ""), "")).strip() if col_map.get("paper_type") else ""
-        
-        # Extract question_set
-        question_set_val = str(r.get(col_map.get("question_set", ""), "A")).strip() if col_map.get("question_set") else "A"
-        question_set = _norm(question_set_val)[:1] if question_set_val else "A"
-        if question_set not in {"A", "B", "C", "D", "E", "F", "G", "H", "I", "J", "K", "L", "M", "N", "O", "P", "Q", "R", "S", "T", "U", "V", "W", "X", "Y", "Z"}:
-            # If question_set is not found in column, try to extract from question text
-            import re
-            set_match = re.search(r'Set ([A-Z])', text)
-            if set_match:
-                question_set = set_match.group(1)
-            else:
-                question_set = "A"
-        
-        # Extract is_common
-        is_common_val = r.get(col_map.get("is_common", ""), False) if col_map.get("is_common") else False
-        if isinstance(is_common_val, str):
-            is_common = is_common_val.lower() in ('true', '1', 'yes', 'y')
-        else:
-            is_common = bool(is_common_val)
-        
-        # Extract is_active
-        is_active_val = r.get(col_map.get("is_active", ""), True) if col_map.get("is_active") else True
-        if isinstance(is_active_val, str):
-            is_active = is_active_val.lower() in ('true', '1', 'yes', 'y')
-        else:
-            is_active = bool(is_active_val)
-
-        # Enhanced logic with text-based SECONDARY detection:
-        # 1. If paper_type column exists: use it
-        # 2. If question text contains "SECONDARY": classify as SECONDARY
-        # 3. Else infer: If trade == ALL => SECONDARY else PRIMARY
-        trade_norm = _norm(trade_val)
-        paper_type_norm = _norm(paper_type_val)
-
-        if paper_type_norm in ("PRIMARY", "P"):
-            paper_type = "PRIMARY"
-        elif paper_type_norm in ("SECONDARY", "S"):
-            paper_type = "SECONDARY"
-        elif "SECONDARY" in text.upper():
-            # Text-based SECONDARY detection - this is the critical fix
-            paper_type = "SECONDARY"
-            is_common = True  # Force is_common=True for text-detected secondary questions
-            trade_norm = ""   # Force NULL trade for secondary questions
-            logger.info(f"Text-based SECONDARY detection: '{text[:50]}...' classified as SECONDARY")
-        else:
-            paper_type = "SECONDARY" if trade_norm == "ALL" else "PRIMARY"
-
-        # Handle both new separate option fields and legacy options JSON
-        options = None
-        option_a = None
-        option_b = None
-        option_c = None
-        option_d = None
-        
-        # Check for new separate option fields first
-        if col_map.get("option_a"):
-            option_a = str(r.get(col_map["option_a"], "")).strip() or None
-        if col_map.get("option_b"):
-            option_b = str(r.get(col_map["option_b"], "")).strip() or None
-        if col_map.get("option_c"):
-            option_c = str(r.get(col_map["option_c"], "")).strip() or None
-        if col_map.get("option_d"):
-            option_d = str(r.get(col_map["option_d"], "")).strip() or None
-        
-        # If no separate option fields, fall back to legacy options JSON
-        if not any([option_a, option_b, option_c, option_d]):
-            options_raw = r.get(col_map.get("options", ""), None) if col_map.get("options") else None
-            options = _safe_json_or_text(options_raw)
-
-        # Handle correct answer
-        correct_raw = r.get(col_map.get("correct_answer", ""), None) if col_map.get("correct_answer") else None
-        correct_answer = _safe_json_or_text(correct_raw)
-
-        rows.append({
-            "text": text,
-            "part": part,
-            "marks": marks,
-            "options": options,
-            "option_a": option_a,
-            "option_b": option_b,
-            "option_c": option_c,
-            "option_d": option_d,
-            "correct_answer": correct_answer,
-            "trade": trade_norm,         # OCC / DMV / ALL etc.
-            "paper_type": paper_type,    # PRIMARY / SECONDARY
-            "question_set": question_set, # A, B, C, D, E, etc.
-            "is_common": is_common,      # True/False
-            "is_active": is_active,      # True/False
-        })
-
-    return rows
+    try:
+        sheet = workbook.worksheets[0]
+        # Dimensions written by some tools are wrong; read every row present
+        sheet.reset_dimensions()
+        rows = sheet.iter_rows(values_only=True)
+
+        header_row = next(rows, None)
+        if header_row is None:
+            raise ValidationError("Excel file contains no data rows.")
+        headers = _sheet_headers(header_row)
+        if "text" not in map_excel_columns(headers):
+            raise ValidationError("Excel must contain a Question column (e.g., 'Question').")
+
+        width = len(headers)
+        seen_rows = False
+        for chunk in _chunked(rows, chunk_rows):
+            seen_rows = True
+            records = [row[:width] + (None,) * (width - len(row)) for row in chunk]
+            yield from normalize_question_frame(pd.DataFrame.from_records(records, columns=headers))
+
+        if not seen_rows:
+            raise ValidationError("Excel file contains no data rows.")
+    finally:
+        workbook.close()
+
+
+def load_questions_from_excel_data(excel_bytes: bytes) -> List[Dict]:
+    """
+    Reads Excel bytes and returns list of dicts for each question row.
+
+    IMPORTANT:
+    - Streams the sheet with openpyxl read_only (iter_questions_from_excel_data);
+      prefer the iterator when the rows can be consumed as they come.
+    - Enhanced with comprehensive error handling and validation
+    - Rows are normalized column-wise (normalize_question_frame)
+    """
+    return list(iter_questions_from_excel_data(excel_bytes))
 
 
 def load_questions_from_csv_data(csv_bytes: bytes) -> Tuple[List[Dict], List[str]]:
@@ -348,36 +422,75 @@ def _safe_json_or_text(val):
 # Import into DB
 # ============================================================
 def import_questions_from_dicts(
-    question_dicts: List[Dict],
+    question_dicts: Iterable[Dict],
     forced_trade: Optional[Trade] = None,
 ) -> Tuple[int, int]:
     """
     Creates Question rows.
     - forced_trade: legacy behavior (if QuestionUpload.trade was selected)
       If provided -> all questions get tagged with this trade (and treated as PRIMARY unless trade=ALL).
+    - question_dicts may be a generator (e.g. iter_questions_from_excel_data);
+      it is consumed in QUESTION_IMPORT_BATCH_SIZE chunks.
     """
-    created_count = 0
-    skipped_count = 0
-
-    if not question_dicts:
-        return 0, 0
-
-    # Build lookup for trades by name (normalized)
-    trades = Trade.objects.all()
-    trade_lookup = {}
-    for t in trades:
-        trade_lookup[_norm(getattr(t, "name", ""))] = t
-        # optional: also map code/slug if exist
-        if hasattr(t, "code") and t.code:
-            trade_lookup[_norm(t.code)] = t
-        if hasattr(t, "slug") and t.slug:
-            trade_lookup[_norm(t.slug)] = t
-
     with transaction.atomic():
+        return QuestionImporter(forced_trade).import_rows(question_dicts)
+
+
+def _chunked(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class QuestionImporter:
+    """
+    Chunked bulk import of question row dicts.
+
+    Duplicates are matched on (text_hash, part, question_set, paper_type,
+    trade). The stored keys of each (trade, paper type, set) scope are loaded
+    the first time a chunk touches it; duplicates within the file are caught
+    because every accepted key is remembered across chunks.
+    """
+
+    def __init__(self, forced_trade: Optional[Trade] = None):
+        self.forced_trade = forced_trade
+        self.created = 0
+        self.skipped = 0
+        self.seen = set()
+        self.loaded_scopes = set()
+        self.batch_size = getattr(settings, "QUESTION_IMPORT_BATCH_SIZE", 500)
+
+        # Build lookup for trades by name (normalized)
+        trades = Trade.objects.all()
+        self.trade_lookup = {}
+        for t in trades:
+            self.trade_lookup[_norm(getattr(t, "name", ""))] = t
+            # optional: also map code/slug if exist
+            if hasattr(t, "code") and t.code:
+                self.trade_lookup[_norm(t.code)] = t
+            if hasattr(t, "slug") and t.slug:
+                self.trade_lookup[_norm(t.slug)] = t
+
+    def import_rows(self, question_dicts: Iterable[Dict]) -> Tuple[int, int]:
+        """Prepare and insert every row; returns (created, skipped) so far."""
+        for chunk in _chunked(question_dicts, self.batch_size):
+            self.insert(self.prepare(chunk))
+        return self.created, self.skipped
+
+    def prepare(self, question_dicts: Iterable[Dict]) -> List[Question]:
+        """
+        Classify rows and drop duplicates (already in the DB or seen earlier in
+        the file). Returns unsaved Question instances; skips are counted.
+        """
+        candidates: List[Tuple[Tuple, Question]] = []
+
         for q in question_dicts:
             text = (q.get("text") or "").strip()
             if not text:
-                skipped_count += 1
+                self.skipped += 1
                 continue
 
             part = (q.get("part") or "A").strip().upper()[:1]
@@ -387,25 +500,25 @@ def import_questions_from_dicts(
             marks = q.get("marks", 1)
             options = q.get("options")
             correct_answer = q.get("correct_answer")
-            
+        
             # Handle new separate option fields
             option_a = q.get("option_a")
             option_b = q.get("option_b")
             option_c = q.get("option_c")
             option_d = q.get("option_d")
-            
+        
             # Extract question_set, is_common, and is_active from the data
             question_set = (q.get("question_set") or "A").strip().upper()[:1]
             if question_set not in {"A", "B", "C", "D", "E", "F", "G", "H", "I", "J", "K", "L", "M", "N", "O", "P", "Q", "R", "S", "T", "U", "V", "W", "X", "Y", "Z"}:
                 question_set = "A"
-            
+        
             is_common_from_data = q.get("is_common", False)
             is_active_from_data = q.get("is_active", True)
 
             # Enhanced classification logic with text-based SECONDARY detection
             trade_norm = _norm(q.get("trade", ""))
             paper_type = _norm(q.get("paper_type", ""))
-            
+        
             # Apply enhanced classification logic (same as in load_questions_from_excel_data)
             if paper_type in ("PRIMARY", "P"):
                 paper_type = "PRIMARY"
@@ -422,8 +535,8 @@ def import_questions_from_dicts(
             trade_obj = None
             is_common = False
 
-            if forced_trade:
-                trade_obj = forced_trade
+            if self.forced_trade:
+                trade_obj = self.forced_trade
                 # In forced legacy mode we can still mark ALL as common if the row explicitly says ALL
                 if trade_norm == "ALL" or paper_type == "SECONDARY" or is_common_from_data:
                     is_common = True
@@ -437,28 +550,14 @@ def import_questions_from_dicts(
                         paper_type = "SECONDARY"
                         logger.info(f"Data integrity check: SECONDARY question '{text[:30]}...' - trade=NULL, is_common=True, paper_type=SECONDARY")
                 else:
-                    trade_obj = trade_lookup.get(trade_norm)
+                    trade_obj = self.trade_lookup.get(trade_norm)
 
-            # Allow same question text in different question sets
-            # Only check for duplicates within the same question_set, trade, and part combination
-            exists_qs = Question.objects.filter(
-                text=text, 
-                part=part, 
-                question_set=question_set,
-                paper_type=paper_type
-            )
-            if trade_obj:
-                exists_qs = exists_qs.filter(trade=trade_obj)
-            else:
-                exists_qs = exists_qs.filter(trade__isnull=True)
-
-            if exists_qs.exists():
-                # Question already exists in this specific set/trade/part combination
-                skipped_count += 1
-                continue
+            text_hash = question_text_hash(text)
+            dedupe_key = (text_hash, part, question_set, paper_type, trade_obj.pk if trade_obj else None)
 
-            Question.objects.create(
+            candidates.append((dedupe_key, Question(
                 text=text,
+                text_hash=text_hash,
                 part=part,
                 marks=marks,
                 options=options,
@@ -472,7 +571,54 @@ def import_questions_from_dicts(
                 question_set=question_set,
                 is_common=is_common,
                 is_active=is_active_from_data,
-            )
-            created_count += 1
+            )))
+
+        # Allow same question text in different question sets
+        # Only check for duplicates within the same question_set, trade, and part combination
+        self._load_existing_keys({key for key, _ in candidates})
 
-    return created_count, skipped_count
+        new_questions: List[Question] = []
+        for dedupe_key, question in candidates:
+            if dedupe_key in self.seen:
+                # Question already exists in this specific set/trade/part combination (or earlier in the file)
+                self.skipped += 1
+                continue
+            self.seen.add(dedupe_key)
+            new_questions.append(question)
+
+        return new_questions
+
+    def insert(self, new_questions: List[Question]) -> int:
+        """bulk_create prepared questions in QUESTION_IMPORT_BATCH_SIZE batches."""
+        if not new_questions:
+            return 0
+
+        Question.objects.bulk_create(new_questions, batch_size=self.batch_size)
+        # bulk_create sends no post_save, so invalidate cached pools here
+        invalidate_on_commit()
+        self.created += len(new_questions)
+        return len(new_questions)
+
+    def _load_existing_keys(self, keys):
+        """Add the stored dedupe keys of scopes not loaded yet to ``seen`` (one query)."""
+        scopes = {(key[4], key[3], key[2]) for key in keys} - self.loaded_scopes
+        if not scopes:
+            return
+
+        trade_ids = {scope[0] for scope in scopes}
+        paper_types = {scope[1] for scope in scopes}
+        question_sets = {scope[2] for scope in scopes}
+
+        trade_filter = Q(trade_id__in=[t for t in trade_ids if t is not None])
+        if None in trade_ids:
+            trade_filter |= Q(trade__isnull=True)
+
+        self.seen.update(
+            Question.objects.filter(
+                trade_filter,
+                paper_type__in=paper_types,
+                question_set__in=question_sets,
+            ).values_list("text_hash", "part", "question_set", "paper_type", "trade_id")
+        )
+        # The query covered every combination of the three filters
+        self.loaded_scopes.update(product(trade_ids, paper_types, question_sets))
@@ -0,0 +1,295 @@
+# questions/upload_pipeline.py
+"""
+Single-pass QuestionUpload pipeline.
+
+One admin upload used to be decrypted and parsed by QuestionUploadForm.clean,
+again by QuestionUploadForm.save and a third time by the import_on_upload
+signal. UploadPipeline does each stage once - kdf, decrypt, parse, dedupe,
+insert - and is cached on the QuestionUpload instance, so the signal imports
+from the bytes the form already decrypted and validated. Excel rows are
+streamed from the sheet into the importer batch by batch.
+
+Stage timings (milliseconds) are logged once per upload. Batch uploads
+decrypt their files concurrently (decrypt_in_parallel).
+"""
+import io
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .csv_processor import QuestionCSVProcessor
+from .pool_cache import invalidate_on_commit
+from .dat_format import V2_HEADER_SIZE, decrypt_dat_with_key, derive_dat_key, read_dat_header
+from .services import (
+    QuestionImporter,
+    _chunked,
+    detect_file_format,
+    iter_questions_from_excel_data,
+)
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("kdf", "decrypt", "parse", "dedupe", "insert")
+
+# Attribute holding the pipeline on a QuestionUpload instance
+INSTANCE_ATTR = "_upload_pipeline"
+
+
+class UploadPipeline:
+    """Decrypt, parse and import one uploaded .dat file exactly once."""
+
+    def __init__(self, file_bytes: bytes, password: str, name: str = ""):
+        self.file_bytes = file_bytes
+        self.password = password
+        self.name = name
+        self.file_format: Optional[str] = None
+        self.timings: Dict[str, float] = dict.fromkeys(STAGES, 0.0)
+        self.row_count = 0
+        self._validated = False
+        self._plain: Optional[bytes] = None
+        self._csv_processor: Optional[QuestionCSVProcessor] = None
+        self._csv_rows: Optional[List[Dict]] = None
+        self._set_combinations = set()
+        self._result: Optional[Tuple[int, int]] = None
+
+    # ------------------------------------------------------------
+    # Instance cache
+    # ------------------------------------------------------------
+    @classmethod
+    def for_upload(cls, upload, file_bytes: Optional[bytes] = None) -> "UploadPipeline":
+        """Pipeline cached on ``upload``; reads the stored file only if none is cached yet."""
+        pipeline = cls.cached(upload)
+        if pipeline is not None and pipeline.password == upload.decryption_password:
+            return pipeline
+
+        if file_bytes is None:
+            with upload.file.open("rb") as f:
+                file_bytes = f.read()
+
+        pipeline = cls(file_bytes, upload.decryption_password, upload.file.name)
+        pipeline.attach(upload)
+        return pipeline
+
+    @staticmethod
+    def cached(upload) -> Optional["UploadPipeline"]:
+        return getattr(upload, INSTANCE_ATTR, None)
+
+    def attach(self, upload):
+        """Cache this pipeline on ``upload`` for the import_on_upload signal."""
+        setattr(upload, INSTANCE_ATTR, self)
+
+    @property
+    def result(self) -> Optional[Tuple[int, int]]:
+        """(created, skipped) once imported, else None."""
+        return self._result
+
+    @contextmanager
+    def _stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += (time.perf_counter() - started) * 1000
+
+    # ------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------
+    def _plain_bytes(self) -> bytes:
+        """Excel/CSV bytes: decrypted .dat, or the file itself if it is already a workbook."""
+        if self._plain is not None:
+            return self._plain
+
+        data = self.file_bytes
+        if isinstance(data, (bytes, bytearray)) and data[:2] == b"PK":
+            self._plain = bytes(data)
+            return self._plain
+
+        # v1 (converter) or chunked v2 container
+        header = read_dat_header(data[:V2_HEADER_SIZE])
+        with self._stage("kdf"):
+            key = derive_dat_key(self.password, header.salt)
+        with self._stage("decrypt"):
+            decrypted = decrypt_dat_with_key(header, key, data)
+
+        # Excel xlsx is zip => 'PK'
+        if decrypted[:2] != b"PK":
+            raise ValidationError("Decrypted file content is not a readable Excel file.")
+        self._plain = decrypted
+        return decrypted
+
+    def validate(self):
+        """
+        Decrypt, then check the file holds importable questions.
+
+        CSV files are parsed in full (the processor validates every row). Excel
+        sheets are only opened and their first chunk normalized: the rows are
+        streamed once, at import time.
+        """
+        if self._validated:
+            return
+
+        plain = self._plain_bytes()
+        with self._stage("parse"):
+            self.file_format = detect_file_format(plain)
+            if self.file_format == "csv":
+                processor = QuestionCSVProcessor(io.BytesIO(plain))
+                success, rows = processor.validate_and_process()
+                if not success:
+                    raise ValidationError(f"CSV validation errors: {'; '.join(processor.errors)}")
+                self._csv_processor, self._csv_rows = processor, rows
+                self.row_count = len(rows)
+            else:
+                rows = iter_questions_from_excel_data(plain)
+                try:
+                    if next(rows, None) is None:
+                        raise ValidationError("No valid questions found in the uploaded Excel.")
+                finally:
+                    rows.close()
+        self._validated = True
+
+    def _timed_rows(self, rows: Iterator[Dict]) -> Iterator[Dict]:
+        """Pass rows through, timing the parse stage and noting set activations."""
+        while True:
+            started = time.perf_counter()
+            try:
+                row = next(rows)
+            except StopIteration:
+                return
+            finally:
+                self.timings["parse"] += (time.perf_counter() - started) * 1000
+            self.row_count += 1
+            self._set_combinations.add((row.get("trade", ""), row.get("paper_type", "PRIMARY"), row.get("question_set", "A")))
+            yield row
+
+    def import_questions(self) -> Tuple[int, int]:
+        """Import the file's questions; returns (created, skipped). Later calls return the first result."""
+        if self._result is not None:
+            return self._result
+
+        self.validate()
+        with transaction.atomic():
+            if self._csv_processor is not None:
+                with self._stage("insert"):
+                    created = self._csv_processor.bulk_create_questions(self._csv_rows)
+                skipped = 0
+            else:
+                importer = QuestionImporter(forced_trade=None)
+                self.row_count = 0
+                rows = self._timed_rows(iter_questions_from_excel_data(self._plain_bytes()))
+                # Rows flow from the sheet straight into the importer, one batch at a time
+                for chunk in _chunked(rows, importer.batch_size):
+                    with self._stage("dedupe"):
+                        new_questions = importer.prepare(chunk)
+                    with self._stage("insert"):
+                        importer.insert(new_questions)
+                created, skipped = importer.created, importer.skipped
+
+                with self._stage("insert"):
+                    _create_question_set_activations([
+                        {"trade": trade, "paper_type": paper_type, "question_set": question_set}
+                        for trade, paper_type, question_set in self._set_combinations
+                    ])
+
+            # New questions landed: drop cached question pools
+            invalidate_on_commit()
+
+        self._result = (created, skipped)
+        self.log_timings()
+        return self._result
+
+    def log_timings(self):
+        total = sum(self.timings.values())
+        created, skipped = self._result or (0, 0)
+        logger.info(
+            "Upload %s | rows=%s created=%s skipped=%s | %s | total=%.0fms",
+            self.name,
+            self.row_count,
+            created,
+            skipped,
+            " ".join(f"{stage}={self.timings[stage]:.0f}ms" for stage in STAGES),
+            total,
+        )
+
+
+def decrypt_in_parallel(pipelines: List[UploadPipeline], workers: Optional[int] = None) -> Dict[UploadPipeline, Exception]:
+    """
+    Run the kdf/decrypt stages of several pipelines in a thread pool.
+
+    PBKDF2 and AES-GCM in ``cryptography`` release the GIL, so a batch of
+    per-trade files no longer pays its KDFs one after another. Returns the
+    pipelines that failed, mapped to their error.
+    """
+    if workers is None:
+        workers = getattr(settings, "QUESTION_UPLOAD_WORKERS", 4)
+    workers = max(1, min(workers, len(pipelines)))
+
+    errors: Dict[UploadPipeline, Exception] = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(pipeline._plain_bytes): pipeline for pipeline in pipelines}
+        for future, pipeline in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                errors[pipeline] = e
+    return errors
+
+
+def _create_question_set_activations(questions_data):
+    """
+    Automatically create QuestionSetActivation entries based on uploaded questions.
+    This enables automatic trade-wise QP mapping with sets.
+    """
+    from .models import QuestionSetActivation
+    from reference.models import Trade
+
+    try:
+        # Extract unique combinations of trade, paper_type, and question_set from uploaded data
+        unique_combinations = set()
+
+        for q_data in questions_data:
+            trade_name = q_data.get('trade', '').strip()
+            paper_type = q_data.get('paper_type', 'PRIMARY').strip().upper()
+            question_set = q_data.get('question_set', 'A').strip().upper()
+
+            if trade_name and paper_type in ['PRIMARY', 'SECONDARY']:
+                unique_combinations.add((trade_name, paper_type, question_set))
+
+        # Create QuestionSetActivation entries
+        created_activations = 0
+        for trade_name, paper_type, question_set in unique_combinations:
+            try:
+                # Find the trade object
+                trade = Trade.objects.filter(name__iexact=trade_name).first()
+                if not trade:
+                    logger.warning(f"Trade not found: {trade_name}")
+                    continue
+
+                # Create or get the activation entry
+                activation, created = QuestionSetActivation.objects.get_or_create(
+                    trade=trade,
+                    paper_type=paper_type,
+                    question_set=question_set,
+                    defaults={
+                        'is_active': False,  # Don't auto-activate, let admin control
+                        'activated_by': None
+                    }
+                )
+
+                if created:
+                    created_activations += 1
+                    logger.info(f"Created QuestionSetActivation: {trade.name} - {paper_type} - Set {question_set}")
+
+            except Exception as e:
+                logger.error(f"Failed to create activation for {trade_name}-{paper_type}-{question_set}: {e}")
+
+        if created_activations > 0:
+            logger.info(f"Auto-created {created_activations} QuestionSetActivation entries for trade-wise mapping")
+
+    except Exception as e:
+        logger.error(f"Failed to create question set activations: {e}")
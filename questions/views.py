@@ -6,11 +6,8 @@ from django.utils import timezone
 from django.conf import settings
 import logging
 
-from questions.models import (
-    QuestionPaper,
-    ExamSession,
-    TradePaperActivation,
-)
+from questions.models import ExamSession
+from questions.activation_snapshot import get_snapshot
 from reference.models import Trade
 from results.models import CandidateAnswer
 
@@ -52,42 +49,21 @@ def exam_interface(request):
             - Else SECONDARY
         """
 
+        snapshot = get_snapshot()
+
         # ---------- LEGACY MODE ----------
         if not getattr(settings, "EXAM_UNIFIED_DAT_ENABLED", False):
-            paper = QuestionPaper.objects.filter(
-                question_paper="PRIMARY",
-                is_active=True,
-            ).first()
-
-            if not paper:
-                paper = QuestionPaper.objects.filter(
-                    question_paper="SECONDARY",
-                    is_active=True,
-                ).first()
-
-            return paper
+            return snapshot.paper("PRIMARY") or snapshot.paper("SECONDARY")
 
         # ---------- UNIFIED MODE ----------
         if not trade:
             return None
 
-        primary_active = TradePaperActivation.objects.filter(
-            trade=trade,
-            paper_type="PRIMARY",
-            is_active=True,
-        ).first()
+        if snapshot.is_active(trade.pk, "PRIMARY"):
+            return snapshot.paper("PRIMARY", active_only=False)
 
-        if primary_active:
-            return QuestionPaper.objects.filter(question_paper="PRIMARY").first()
-
-        secondary_active = TradePaperActivation.objects.filter(
-            trade=trade,
-            paper_type="SECONDARY",
-            is_active=True,
-        ).first()
-
-        if secondary_active:
-            return QuestionPaper.objects.filter(question_paper="SECONDARY").first()
+        if snapshot.is_active(trade.pk, "SECONDARY"):
+            return snapshot.paper("SECONDARY", active_only=False)
 
         return None
 
@@ -129,13 +105,10 @@ def exam_interface(request):
     duration_seconds = None
 
     if getattr(settings, "EXAM_UNIFIED_DAT_ENABLED", False) and trade_obj:
-        activation = TradePaperActivation.objects.filter(
-            trade=trade_obj,
-            paper_type=paper.question_paper,
-        ).first()
+        exam_duration = get_snapshot().duration(trade_obj.pk, paper.question_paper)
 
-        if activation and activation.exam_duration:
-            duration_seconds = int(activation.exam_duration.total_seconds())
+        if exam_duration:
+            duration_seconds = int(exam_duration.total_seconds())
 
     if duration_seconds is None:
         if session.duration:
@@ -1,31 +1,47 @@
 # registration/admin.py
 import csv
 import json
+from collections import defaultdict
 from datetime import timedelta
+from typing import Dict, List, NamedTuple, Tuple
 from urllib import request
-import zipfile
-import os as _os  # for urandom
 
 from django import forms
 from django.conf import settings
 from django.contrib import admin, messages
 from django.contrib.auth.models import Group
 from django.core.exceptions import ValidationError
-from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden
-from django.shortcuts import redirect
+from django.http import FileResponse, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, path
-from django.utils import timezone
 from django.utils.html import format_html
-import openpyxl
-from openpyxl.utils import get_column_letter
 from django.contrib.admin import actions
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-
-from .models import CandidateProfile    
-from results.models import CandidateAnswer
-from questions.models import QuestionPaper
+from django.contrib.admin.views.main import ChangeList
+from django.db.models import Count, Q
+
+from .exports import (
+    CANDIDATE_HEADERS,
+    EVALUATION_HEADERS,
+    EXPORT_HEADERS,
+    MARKS_HEADERS,
+    XLSX_CONTENT_TYPE,
+    ExportSheet,
+    candidate_rows,
+    center_export_filename,
+    evaluation_rows,
+    iter_dat_export,
+    iter_exam_export_rows,
+    iter_zip,
+    marks_rows,
+    photo_entries,
+    write_xlsx,
+)
+from .export_jobs import start_export
+from .models import CandidateProfile, ExportJob, ExportWatermark
+from .slot_stats import slot_stats
+from .slots import assign_slots, clear_incomplete_exam_sessions, reset_slots
+from questions.activation_snapshot import get_snapshot as get_activation_snapshot
+from questions.dat_format import DAT_VERSION_V1, DAT_VERSION_V2, encrypt_dat
 
 
 # -------------------------
@@ -118,79 +134,8 @@ class CandidateProfileAdminForm(forms.ModelForm):
 # Excel exporter (candidates)
 # -------------------------
 def export_candidates_excel(modeladmin, request, queryset):
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Candidates"
-
-    columns = [
-        "Army No",
-        "Rank",
-        "Name",
-        "Photo",
-        "Trade",
-        "DOB",
-        "Father Name",
-        "Date of Enrolment",
-        "Aadhar Number",
-        "Mobile Number (Linked to Aadhaar Card)",
-        "APAAR ID",
-        "Training Center",
-        "District",
-        "State",
-        "Primary Qualification",
-        "Primary Duration",
-        "Primary Credits",
-        "Secondary Qualification",
-        "Secondary Duration",
-        "Secondary Credits",
-        "NSQF Level",
-        "Exam Center",
-        "Shift",
-        "Created At",
-    ]
-
-    for col_num, column_title in enumerate(columns, 1):
-        ws.cell(row=1, column=col_num).value = column_title
-
-    for row_num, candidate in enumerate(queryset, 2):
-        data = [
-            candidate.army_no,
-            candidate.rank,
-            candidate.name,
-            candidate.photograph.url if candidate.photograph else "",
-            getattr(candidate.trade, "name", str(candidate.trade)) if candidate.trade else "",
-            candidate.dob,
-            candidate.father_name,
-            candidate.doe.strftime("%Y-%m-%d") if candidate.doe else "",
-            candidate.aadhar_number,
-            candidate.mobile_no,
-            candidate.apaar_id,
-            candidate.training_center,
-            candidate.district,
-            candidate.state,
-            candidate.primary_qualification,
-            candidate.primary_duration,
-            candidate.primary_credits,
-            candidate.secondary_qualification,
-            candidate.secondary_duration,
-            candidate.secondary_credits,
-            candidate.nsqf_level,
-            candidate.exam_center,
-            str(candidate.shift) if candidate.shift else "",
-            candidate.created_at.strftime("%Y-%m-%d %H:%M") if candidate.created_at else "",
-        ]
-        for col_num, cell_value in enumerate(data, 1):
-            ws.cell(row=row_num, column=col_num, value=cell_value)
-
-    for i in range(1, len(columns) + 1):
-        ws.column_dimensions[get_column_letter(i)].width = 20
-
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = 'attachment; filename="candidates.xlsx"'
-    wb.save(response)
-    return response
+    xlsx_file = write_xlsx([ExportSheet("Candidates", CANDIDATE_HEADERS, candidate_rows(queryset), column_width=20)])
+    return _xlsx_response(xlsx_file, "candidates.xlsx")
 
 
 export_candidates_excel.short_description = "Export selected candidates to Excel"
@@ -199,190 +144,20 @@ export_candidates_excel.short_description = "Export selected candidates to Excel
 # -------------------------
 # Helper: Build a multi-sheet workbook for .dat payload
 # -------------------------
-def _build_export_workbook(queryset):
-    from openpyxl import Workbook
-    from io import BytesIO
-
-    # local imports to avoid circular import at module level
-    from questions.models import QuestionPaper
-    from results.models import CandidateAnswer
-    from questions.models import ExamSession
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Results"
-
-    headers = [
-        "S.No",
-        "Name",
-        "Center",
-        "Photo",
-        "Fathers_Name",
-        "dob",
-        "Rank",
-        "Trade",
-        "Army_No",
-        "Adhaar_No",
-        "Mobile Number (Linked to Aadhaar Card)",
-        "APAAR_ID",
-        "Primary Qualification",
-        "Primary Duration",
-        "Primary Credits",
-        "Secondary Qualification",
-        "Secondary Duration",
-        "Secondary Credits",
-        "NSQF Level",
-        "Training_Center",
-        "District",
-        "State",
-        "Viva_1",
-        "Viva_2",
-        "Practical_1",
-        "Practical_2",
-        "Army_No",
-        "Exam_Type",
-        "Part",
-        "Question",
-        "Answer",
-        "Correct_Answer",
-        "Max_Marks",
-    ]
+def _export_workbook_file(queryset):
+    # Sessions, questions and answers are loaded per batch of candidates (registration.exports)
+    return write_xlsx([ExportSheet("Results", EXPORT_HEADERS, iter_exam_export_rows(queryset))])
 
-    ws.append(headers)
-    serial = 1
-
-    for candidate in queryset:
-                # ❌ Skip permanently consumed slots
-        # For each candidate, find their exam sessions (these contain the assigned questions)
-        sessions = (
-            ExamSession.objects
-            .filter(user=candidate.user)
-            .select_related("paper")
-            .prefetch_related("examquestion_set__question")
-            .order_by("-started_at")
-        )
 
-        # If candidate has no sessions, optionally fallback to candidate_answers to include any orphan answers
-        if not sessions.exists():
-            # Optional: include papers where candidate actually has answers (helps if sessions were deleted)
-            # We'll iterate papers that have CandidateAnswer rows for this candidate.
-            papers_with_answers = QuestionPaper.objects.filter(candidate_answers__candidate=candidate).distinct()
-            for paper in papers_with_answers:
-                questions = paper.questions.all().order_by("id")
-                for q in questions:
-                    ans = CandidateAnswer.objects.filter(
-                        candidate=candidate,
-                        paper=paper,
-                        question=q,
-                        exam_type=paper.question_paper,  # PRIMARY / SECONDARY
-                    ).first()
-                    row = [
-    serial,
-    candidate.name,
-    candidate.exam_center,
-    candidate.photograph.url if candidate.photograph else "",
-    candidate.father_name,
-    candidate.dob,
-    candidate.rank,
-    candidate.trade.name if candidate.trade else "",
-    candidate.army_no,
-    candidate.aadhar_number,
-    candidate.mobile_no,
-    candidate.apaar_id,
-    candidate.primary_qualification,
-    candidate.primary_duration,
-    candidate.primary_credits,
-    candidate.secondary_qualification,
-    candidate.secondary_duration,
-    candidate.secondary_credits,
-    candidate.nsqf_level,
-    candidate.training_center,
-    candidate.district,
-    candidate.state,
-    candidate.primary_viva_marks,
-    candidate.secondary_viva_marks,
-    candidate.primary_practical_marks,
-    candidate.secondary_practical_marks,
-    candidate.army_no,
-    paper.question_paper,
-
-    q.part,
-    q.text,
-    ans.answer if ans and ans.answer is not None else "N/A",
-    getattr(q, "correct_answer", None),
-    q.marks if hasattr(q, "marks") else None,
-]
-
-                    ws.append(row)
-                    serial += 1
-            continue
+def _build_export_workbook(queryset):
+    with _export_workbook_file(queryset) as xlsx_file:
+        return xlsx_file.read()
 
-        # Otherwise iterate sessions and the ExamQuestions (assigned questions)
-        for session in sessions:
-            paper = session.paper  # may be None if paper row deleted; handle gracefully
-            exam_questions = session.questions  # property returns ordered ExamQuestion queryset
-
-            for eq in exam_questions:
-                q = eq.question
-                # Try to fetch CandidateAnswer by candidate + paper + question.
-                # If paper is None (deleted paper), search for any CandidateAnswer matching candidate+question.
-                if paper is not None:
-                    ans = CandidateAnswer.objects.filter(
-                        candidate=candidate,
-                        paper=paper,
-                        question=q,
-                        exam_type=session.exam_type,   # 🔥 REQUIRED
-                    ).first()
-                else:
-                    ans = CandidateAnswer.objects.filter(
-                        candidate=candidate,
-                        question=q,
-                        exam_type=session.exam_type,   # 🔥 REQUIRED
-                    ).first()
-
-                row = [
-                    serial,
-                    candidate.name,
-                    candidate.exam_center,
-                    candidate.photograph.url if candidate.photograph else "",
-                    candidate.father_name,
-                    candidate.dob,
-                    candidate.rank,
-                    candidate.trade.name if candidate.trade else "",
-                    candidate.army_no,
-                    candidate.aadhar_number,
-                    candidate.mobile_no,
-                    candidate.apaar_id,
-                    candidate.primary_qualification,
-                    candidate.primary_duration,
-                    candidate.primary_credits,
-                    candidate.secondary_qualification,
-                    candidate.secondary_duration,
-                    candidate.secondary_credits,
-                    candidate.nsqf_level,
-                    candidate.training_center,
-                    candidate.district,
-                    candidate.state,
-                    candidate.primary_viva_marks,
-                    candidate.secondary_viva_marks,
-                    candidate.primary_practical_marks,
-                    candidate.secondary_practical_marks,
-                    candidate.army_no,
-                    paper.question_paper,
-
-                    q.part,
-                    q.text,
-                    ans.answer if ans and ans.answer is not None else "N/A",
-                    getattr(q, "correct_answer", None),
-                    q.marks if hasattr(q, "marks") else None,
-                ]
-                ws.append(row)
-                serial += 1
 
-    stream = BytesIO()
-    wb.save(stream)
-    stream.seek(0)
-    return stream.getvalue()
+def _xlsx_response(xlsx_file, filename: str):
+    """Stream an .xlsx written by write_xlsx; the file is closed once sent."""
+    return FileResponse(xlsx_file, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
+
 
 # -------------------------
 # Crypto helper: encrypt bytes → .dat (salt + iv + ciphertext)
@@ -391,52 +166,32 @@ def _encrypt_bytes_to_dat(data: bytes, passphrase: str) -> bytes:
     if not passphrase:
         raise ValueError("Missing CONVERTER_PASSPHRASE in settings.")
 
-    salt = _os.urandom(16)
-    kdf = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=32,
-        salt=salt,
-        iterations=100000,
-    )
-    key = kdf.derive(passphrase.encode("utf-8"))
+    # Layout: salt (16) || iv (12) || ciphertext (includes auth tag)
+    return encrypt_dat(data, passphrase, version=DAT_VERSION_V1)
 
-    iv = _os.urandom(12)
-    aesgcm = AESGCM(key)
-    ciphertext = aesgcm.encrypt(iv, data, None)  # AAD=None
 
-    # Layout: salt (16) || iv (12) || ciphertext (includes auth tag)
-    return salt + iv + ciphertext
+def _dat_download_response(xlsx_file, passphrase: str, filename: str):
+    """.dat download of an export workbook file; v2 exports are streamed as they are encrypted."""
+    if getattr(settings, "DAT_EXPORT_VERSION", DAT_VERSION_V1) == DAT_VERSION_V2:
+        response = StreamingHttpResponse(iter_dat_export(xlsx_file, passphrase), content_type="application/octet-stream")
+    else:
+        response = HttpResponse(b"".join(iter_dat_export(xlsx_file, passphrase)), content_type="application/octet-stream")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
 
 
 # -------------------------
 # DAT exporter (encrypted .xlsx inside, converter-compatible)
 # -------------------------
 def export_candidates_dat(modeladmin, request, queryset):
-    xlsx_bytes = _build_export_workbook(queryset)
-
     passphrase = getattr(settings, "CONVERTER_PASSPHRASE", None)
     if not passphrase:
         return HttpResponseBadRequest(
             "Server missing CONVERTER_PASSPHRASE; set it in settings or env."
         )
 
-    dat_bytes = _encrypt_bytes_to_dat(xlsx_bytes, passphrase)
-
-    from centers.models import Center
-
-    center = Center.objects.first()
-
-    if center:
-        safe_exam_center = "".join(c if c.isalnum() else "_" for c in center.exam_Center)
-        safe_comd = "".join(c if c.isalnum() else "_" for c in center.comd)
-        filename = f"{safe_comd}_{safe_exam_center}.dat"
-    else:
-        ts = timezone.now().strftime("%Y%m%d%H%M%S")
-        filename = f"candidates_export_{ts}.dat"
-
-    response = HttpResponse(dat_bytes, content_type="application/octet-stream")
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-    return response
+    filename = center_export_filename("", "candidates_export")
+    return _dat_download_response(_export_workbook_file(queryset), passphrase, filename)
 
 
 # Changed label: this will be displayed as the action/button text
@@ -447,23 +202,13 @@ export_candidates_dat.short_description = "Export All Exam Data"
 # Export candidate images as ZIP
 # -------------------------
 def export_candidate_images(modeladmin, request, queryset):
-    from io import BytesIO
+    return _zip_response(iter_zip(photo_entries(queryset)), "candidate_images.zip")
 
-    buffer = BytesIO()
-    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        for candidate in queryset:
-            if candidate.photograph:
-                try:
-                    file_path = candidate.photograph.path
-                    ext = file_path[file_path.rfind(".") :] if "." in file_path else ""
-                    filename = f"{candidate.army_no}_{candidate.name}{ext}"
-                    zip_file.write(file_path, arcname=filename)
-                except Exception:
-                    continue
-
-    buffer.seek(0)
-    response = HttpResponse(buffer, content_type="application/zip")
-    response["Content-Disposition"] = 'attachment; filename="candidate_images.zip"'
+
+def _zip_response(chunks, filename: str):
+    """Stream a ZIP as it is built: the first bytes go out before the last photo is read."""
+    response = StreamingHttpResponse(chunks, content_type="application/zip")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
     return response
 
 
@@ -472,24 +217,7 @@ export_candidate_images.short_description = "Export All Photos"
 
 
 def export_all_candidate_images(modeladmin, request):
-    from io import BytesIO
-
-    buffer = BytesIO()
-    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        for candidate in CandidateProfile.objects.all():
-            if candidate.photograph:
-                try:
-                    file_path = candidate.photograph.path
-                    ext = file_path[file_path.rfind(".") :] if "." in file_path else ""
-                    filename = f"{candidate.army_no}_{candidate.name}{ext}"
-                    zip_file.write(file_path, arcname=filename)
-                except Exception:
-                    continue
-
-    buffer.seek(0)
-    response = HttpResponse(buffer, content_type="application/zip")
-    response["Content-Disposition"] = 'attachment; filename="all_candidate_images.zip"'
-    return response
+    return _zip_response(iter_zip(photo_entries(CandidateProfile.objects.all())), "all_candidate_images.zip")
 
 
 # -------------------------
@@ -500,55 +228,8 @@ def export_marks_excel(modeladmin, request, queryset):
     Export a simple Excel sheet with marks columns for the selected candidates.
     Columns: Army No, Name, Trade, Primary Viva, Primary Practical, Secondary Viva, Secondary Practical, Training Center, Exam Center, Created At
     """
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Marks"
-
-    columns = [
-        "Army No",
-        "Name",
-        "Trade",
-        "Mobile Number (Linked to Aadhaar Card)",
-        "APAAR ID",
-        "Primary Viva Marks",
-        "Primary Practical Marks",
-        "Secondary Viva Marks",
-        "Secondary Practical Marks",
-        "Training Center",
-        "Exam Center",
-        "Created At",
-    ]
-
-    for col_num, column_title in enumerate(columns, 1):
-        ws.cell(row=1, column=col_num).value = column_title
-
-    for row_num, candidate in enumerate(queryset, 2):
-        row = [
-            candidate.army_no,
-            candidate.name,
-            candidate.trade.name if getattr(candidate, "trade", None) else str(candidate.trade) if candidate.trade else "",
-            candidate.mobile_no,
-            candidate.apaar_id,
-            candidate.primary_viva_marks,
-            candidate.primary_practical_marks,
-            candidate.secondary_viva_marks,
-            candidate.secondary_practical_marks,
-            candidate.training_center,
-            candidate.exam_center,
-            candidate.created_at.strftime("%Y-%m-%d %H:%M") if candidate.created_at else "",
-        ]
-        for col_num, cell_value in enumerate(row, 1):
-            ws.cell(row=row_num, column=col_num, value=cell_value)
-
-    for i in range(1, len(columns) + 1):
-        ws.column_dimensions[get_column_letter(i)].width = 20
-
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = 'attachment; filename="candidate_marks.xlsx"'
-    wb.save(response)
-    return response
+    xlsx_file = write_xlsx([ExportSheet("Marks", MARKS_HEADERS, marks_rows(queryset), column_width=20)])
+    return _xlsx_response(xlsx_file, "candidate_marks.xlsx")
 
 
 export_marks_excel.short_description = "Export Viva-Prac Marks"
@@ -561,66 +242,6 @@ def export_evaluation_results_dat(modeladmin, request, queryset):
     """
     Export evaluation results (practical and viva marks) in .dat format for PO users
     """
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Evaluation Results"
-
-    headers = [
-        "Army No",
-        "Name", 
-        "Rank",
-        "Trade",
-        "Mobile Number (Linked to Aadhaar Card)",
-        "APAAR ID",
-        "Exam Center",
-        "Training Center",
-        "Primary Practical Marks",
-        "Primary Viva Marks",
-        "Secondary Practical Marks", 
-        "Secondary Viva Marks",
-        "Total Primary Marks",
-        "Total Secondary Marks",
-        "Created At"
-    ]
-
-    for col_num, column_title in enumerate(headers, 1):
-        ws.cell(row=1, column=col_num).value = column_title
-
-    for row_num, candidate in enumerate(queryset, 2):
-        # Calculate totals
-        primary_total = (candidate.primary_practical_marks or 0) + (candidate.primary_viva_marks or 0)
-        secondary_total = (candidate.secondary_practical_marks or 0) + (candidate.secondary_viva_marks or 0)
-        
-        data = [
-            candidate.army_no,
-            candidate.name,
-            candidate.rank,
-            candidate.trade.name if candidate.trade else "",
-            candidate.mobile_no,
-            candidate.apaar_id,
-            candidate.exam_center,
-            candidate.training_center,
-            candidate.primary_practical_marks,
-            candidate.primary_viva_marks,
-            candidate.secondary_practical_marks,
-            candidate.secondary_viva_marks,
-            primary_total,
-            secondary_total,
-            candidate.created_at.strftime("%Y-%m-%d %H:%M") if candidate.created_at else "",
-        ]
-        for col_num, cell_value in enumerate(data, 1):
-            ws.cell(row=row_num, column=col_num, value=cell_value)
-
-    for i in range(1, len(headers) + 1):
-        ws.column_dimensions[get_column_letter(i)].width = 15
-
-    # Convert to bytes
-    from io import BytesIO
-    stream = BytesIO()
-    wb.save(stream)
-    stream.seek(0)
-    xlsx_bytes = stream.getvalue()
-
     # Encrypt to .dat format
     passphrase = getattr(settings, "CONVERTER_PASSPHRASE", None)
     if not passphrase:
@@ -628,22 +249,12 @@ def export_evaluation_results_dat(modeladmin, request, queryset):
             "Server missing CONVERTER_PASSPHRASE; set it in settings or env."
         )
 
-    dat_bytes = _encrypt_bytes_to_dat(xlsx_bytes, passphrase)
-
-    from centers.models import Center
-    center = Center.objects.first()
+    filename = center_export_filename("_evaluation_results", "evaluation_results")
 
-    if center:
-        safe_exam_center = "".join(c if c.isalnum() else "_" for c in center.exam_Center)
-        safe_comd = "".join(c if c.isalnum() else "_" for c in center.comd)
-        filename = f"{safe_comd}_{safe_exam_center}_evaluation_results.dat"
-    else:
-        ts = timezone.now().strftime("%Y%m%d%H%M%S")
-        filename = f"evaluation_results_{ts}.dat"
-
-    response = HttpResponse(dat_bytes, content_type="application/octet-stream")
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-    return response
+    xlsx_file = write_xlsx([
+        ExportSheet("Evaluation Results", EVALUATION_HEADERS, evaluation_rows(queryset), column_width=15)
+    ])
+    return _dat_download_response(xlsx_file, passphrase, filename)
 
 
 export_evaluation_results_dat.short_description = "Export Evaluation Results (.dat)"
@@ -653,29 +264,9 @@ export_evaluation_results_dat.short_description = "Export Evaluation Results (.d
 # Slot Management Actions
 # -------------------------
 def assign_exam_slots(modeladmin, request, queryset):
-    from questions.models import ExamSession
-
-    count = 0
-    sessions_cleared = 0
-
-    for candidate in queryset:
-        # 🔥 DO NOT CHECK slot_consumed_at
-
-        # Clear incomplete sessions
-        incomplete_sessions = ExamSession.objects.filter(
-            user=candidate.user,
-            completed_at__isnull=True
-        )
-        cleared = incomplete_sessions.count()
-        if cleared:
-            incomplete_sessions.delete()
-            sessions_cleared += cleared
-
-        try:
-            candidate.assign_exam_slot(assigned_by_user=request.user)
-            count += 1
-        except ValidationError:
-            continue
+    # 🔥 DO NOT CHECK slot_consumed_at
+    sessions_cleared = sum(clear_incomplete_exam_sessions(queryset).values())
+    count = sum(assign_slots(queryset, assigned_by=request.user).values())
 
     if count == 1:
         msg = "1 exam slot was assigned."
@@ -692,14 +283,11 @@ def assign_exam_slots(modeladmin, request, queryset):
 def create_exam_slots_for_all_candidates(modeladmin, request, queryset):
     """Create exam slots for ALL candidates (regardless of selection)"""
     from django.contrib import messages
-    from questions.models import TradePaperActivation
 
     all_candidates = CandidateProfile.objects.all()
     candidates = all_candidates
 
-    activation = TradePaperActivation.objects.filter(
-        is_active=True
-    ).first()
+    activation = get_activation_snapshot().first_active_activation()
 
     if not activation:
         messages.error(request, "No active paper found.")
@@ -718,13 +306,7 @@ def create_exam_slots_for_all_candidates(modeladmin, request, queryset):
             is_primary_completed=True
         )
 
-    count = 0
-    for candidate in candidates_without_slots:
-        try:
-            candidate.assign_exam_slot(assigned_by_user=request.user)
-            count += 1
-        except ValidationError:
-            continue
+    count = sum(assign_slots(candidates_without_slots, assigned_by=request.user).values())
 
     if count == 0:
         messages.info(request, "All eligible candidates already have exam slots.")
@@ -736,38 +318,20 @@ def create_exam_slots_by_trade(modeladmin, request, queryset):
     """Create exam slots for candidates by trade (based on selected candidates' trades)"""
     from django.contrib import messages
     
-    # Get unique trades from selected candidates
-    selected_trades = set()
-    for candidate in queryset:
-        if candidate.trade:
-            selected_trades.add(candidate.trade)
+    # Unique trades of the selected candidates
+    selected_trade_ids = set(queryset.exclude(trade__isnull=True).values_list("trade_id", flat=True))
     
-    if not selected_trades:
+    if not selected_trade_ids:
         messages.warning(request, "No trades found in selected candidates.")
         return
     
-    total_count = 0
-    trade_summary = []
-    
-    for trade in selected_trades:
-        # Get all candidates of this trade without slots
-        trade_candidates = CandidateProfile.objects.filter(
-            trade=trade,
-            has_exam_slot=False
-        )
-        
-        count = 0
-        for candidate in trade_candidates:
-            try:
-                candidate.assign_exam_slot(assigned_by_user=request.user)
-                count += 1
-            except ValidationError:
-                continue
-
-        
-        total_count += count
-        if count > 0:
-            trade_summary.append(f"{trade.name}: {count} slots")
+    # All candidates of these trades without slots
+    assigned = assign_slots(
+        CandidateProfile.objects.filter(trade_id__in=selected_trade_ids, has_exam_slot=False),
+        assigned_by=request.user,
+    )
+    total_count = sum(assigned.values())
+    trade_summary = [f"{trade.name}: {count} slots" for trade, count in assigned.items()]
     
     if total_count == 0:
         messages.info(request, "All candidates in selected trades already have exam slots.")
@@ -779,33 +343,18 @@ create_exam_slots_by_trade.short_description = "🎯 Create Exam Slots by Trade
 
 
 def reset_exam_slots(modeladmin, request, queryset):
-    from questions.models import ExamSession
-    
-    count = 0
-    sessions_cleared = 0
-    
-    for candidate in queryset:
-        # Clear incomplete sessions first
-        incomplete_sessions = ExamSession.objects.filter(
-            user=candidate.user,
-            completed_at__isnull=True
+    # Clear incomplete sessions first (also of candidates whose reset is refused)
+    sessions_cleared = sum(clear_incomplete_exam_sessions(queryset).values())
+
+    reset = reset_slots(queryset)
+    for army_no, reason in reset.blocked:
+        # ✅ DO NOT CRASH ADMIN
+        modeladmin.message_user(
+            request,
+            f"{army_no} – {reason}",
+            level=messages.WARNING
         )
-        cleared_count = incomplete_sessions.count()
-        if cleared_count > 0:
-            incomplete_sessions.delete()
-            sessions_cleared += cleared_count
-        
-        try:
-            if candidate.reset_exam_slot():
-                count += 1
-        except ValidationError as e:
-            # ✅ DO NOT CRASH ADMIN
-            modeladmin.message_user(
-                request,
-                f"{candidate.army_no} – {e.messages[0]}",
-                level=messages.WARNING
-            )
-            continue
+    count = len(reset.candidate_ids)
     
     if count:
         msg = f"{count} exam slot(s) were reset."
@@ -819,42 +368,20 @@ def reset_exam_slots(modeladmin, request, queryset):
 
 def reassign_exam_slots(modeladmin, request, queryset):
     """Reassign exam slots to selected candidates (reset + assign) with session cleanup"""
-    from questions.models import ExamSession
-    
-    count = 0
-    sessions_cleared = 0
-    
-    for candidate in queryset:
-                # ❌ Skip permanently consumed slots
-        
-
-        # Clear incomplete sessions before reassigning
-        incomplete_sessions = ExamSession.objects.filter(
-            user=candidate.user,
-            completed_at__isnull=True
+    # Clear incomplete sessions before reassigning
+    sessions_cleared = sum(clear_incomplete_exam_sessions(queryset).values())
+
+    # ❌ Skip permanently consumed slots
+    reset = reset_slots(queryset)
+    for army_no, reason in reset.blocked:
+        modeladmin.message_user(
+            request,
+            f"{army_no} – {reason}",
+            level=messages.WARNING
         )
-        cleared_count = incomplete_sessions.count()
-        if cleared_count > 0:
-            incomplete_sessions.delete()
-            sessions_cleared += cleared_count
-        
-        try:
-            candidate.reset_exam_slot()
-        except ValidationError as e:
-            modeladmin.message_user(
-                request,
-                f"{candidate.army_no} – {e.messages[0]}",
-                level=messages.WARNING
-            )
-            continue
-
-
-        try:
-            candidate.assign_exam_slot(assigned_by_user=request.user)
-            count += 1
-        except ValidationError:
-            continue
 
+    assigned = assign_slots(CandidateProfile.objects.filter(id__in=reset.candidate_ids), assigned_by=request.user)
+    count = sum(assigned.values())
     
     if count == 1:
         message = "1 exam slot was reassigned."
@@ -871,21 +398,9 @@ reassign_exam_slots.short_description = "🔄 Reassign Exam Slots (with cleanup)
 
 def clear_incomplete_sessions(modeladmin, request, queryset):
     """Clear incomplete exam sessions for selected candidates"""
-    from questions.models import ExamSession
-    
-    total_cleared = 0
-    candidates_affected = 0
-    
-    for candidate in queryset:
-        incomplete_sessions = ExamSession.objects.filter(
-            user=candidate.user,
-            completed_at__isnull=True
-        )
-        cleared_count = incomplete_sessions.count()
-        if cleared_count > 0:
-            incomplete_sessions.delete()
-            total_cleared += cleared_count
-            candidates_affected += 1
+    cleared = clear_incomplete_exam_sessions(queryset)
+    total_cleared = sum(cleared.values())
+    candidates_affected = len(cleared)
     
     if total_cleared > 0:
         message = f"Cleared {total_cleared} incomplete sessions for {candidates_affected} candidates. They will get fresh question sets on next exam attempt."
@@ -897,6 +412,41 @@ def clear_incomplete_sessions(modeladmin, request, queryset):
 clear_incomplete_sessions.short_description = "🧹 Clear Incomplete Exam Sessions"
 
 
+def pregenerate_exam_papers(modeladmin, request, queryset):
+    """Build exam papers ahead of the shift for selected candidates with a slot"""
+    from questions.paper_pool import pregenerate_papers
+
+    candidate_ids = list(queryset.filter(has_exam_slot=True).values_list("id", flat=True))
+    if not candidate_ids:
+        modeladmin.message_user(request, "No selected candidates have an exam slot.", level=messages.WARNING)
+        return
+
+    # Runs inside the admin request, next to live exam traffic: one process, bounded selection
+    limit = getattr(settings, "PREGENERATE_ADMIN_MAX_CANDIDATES", 200)
+    if len(candidate_ids) > limit:
+        modeladmin.message_user(
+            request,
+            f"{len(candidate_ids)} selected candidates have a slot; pre-generate at most {limit} at a time here, "
+            f"or run 'python manage.py pregenerate_papers' for the whole shift.",
+            level=messages.WARNING,
+        )
+        return
+
+    summary = pregenerate_papers(candidate_ids, workers=1)
+    message = (
+        f"Pre-generated {summary['generated'] + summary['regenerated']} papers "
+        f"({summary['regenerated']} rebuilt for a changed question set). "
+        f"{summary['fresh']} already up to date, {summary['started']} already started, "
+        f"{summary['ineligible']} not eligible for the active paper."
+    )
+    if summary["failed"]:
+        modeladmin.message_user(request, f"{message} {summary['failed']} failed - see logs.", level=messages.WARNING)
+    else:
+        modeladmin.message_user(request, message)
+
+pregenerate_exam_papers.short_description = "⚡ Pre-generate Exam Papers"
+
+
 # -------------------------
 # Clear Data Actions
 # -------------------------
@@ -935,6 +485,122 @@ class PrimaryBypassFilter(admin.SimpleListFilter):
         if self.value() == "no":
             return queryset.filter(primary_bypass_allowed=False)
         return queryset
+
+
+# -------------------------
+# Trade & exam question counts for the changelist
+# -------------------------
+class TradeQuestionSummary(NamedTuple):
+    paper_type: str
+    active_set: str
+    total_exam_questions: int
+    available_count: int
+    # (part, required, available) for every part the exam draws from
+    parts: List[Tuple[str, int, int]]
+
+
+# Stands in for a summary that could not be built (shown as "❌ Error")
+TRADE_SUMMARY_ERROR = object()
+
+
+def _exam_distribution(trade, paper_type):
+    """(part distribution, total exam questions) of the trade's active paper."""
+    from questions.models import HARD_CODED_COMMON_DISTRIBUTION, HARD_CODED_TRADE_CONFIG
+
+    trade_code = trade.code.upper()
+    if paper_type == "PRIMARY" and trade_code in HARD_CODED_TRADE_CONFIG:
+        config = HARD_CODED_TRADE_CONFIG[trade_code]
+        return config["part_distribution"], config["total_questions"]
+    dist = HARD_CODED_COMMON_DISTRIBUTION.copy()
+    return dist, sum(int(count) for count in dist.values())
+
+
+def trade_question_summaries(trades) -> Dict[int, object]:
+    """
+    trade id -> TradeQuestionSummary (None without an active paper) for
+    ``trades``. Two queries however many trades: the active question sets,
+    and one count of active questions grouped by trade, paper type, set
+    and part, joined here against the activation snapshot.
+    """
+    from questions.models import Question, QuestionSetActivation
+
+    snapshot = get_activation_snapshot()
+    paper_types = {}
+    for trade in trades:
+        activation = snapshot.trade_activation(trade.id)
+        if activation is not None:
+            paper_types[trade.id] = activation.paper_type
+    summaries = {trade.id: None for trade in trades}
+    if not paper_types:
+        return summaries
+
+    active_sets: Dict[int, List[str]] = {}
+    for trade_id, paper_type, question_set in QuestionSetActivation.objects.filter(
+        trade_id__in=paper_types, is_active=True
+    ).values_list("trade_id", "paper_type", "question_set"):
+        if paper_types[trade_id] == paper_type:
+            active_sets.setdefault(trade_id, []).append(question_set)
+
+    # PRIMARY questions belong to a trade; SECONDARY ones are common to all trades (owner None)
+    wanted = Q(pk__in=[])
+    primary_trades = [trade_id for trade_id, paper_type in paper_types.items() if paper_type == "PRIMARY"]
+    if primary_trades:
+        wanted |= Q(paper_type="PRIMARY", trade_id__in=primary_trades)
+    if "SECONDARY" in paper_types.values():
+        wanted |= Q(paper_type="SECONDARY", is_common=True)
+    counts: Dict[tuple, int] = defaultdict(int)
+    for trade_id, paper_type, question_set, part, count in (
+        Question.objects.filter(wanted, is_active=True)
+        .values_list("trade_id", "paper_type", "question_set", "part")
+        .annotate(count=Count("id"))
+        .order_by()
+    ):
+        owner = trade_id if paper_type == "PRIMARY" else None
+        counts[(owner, paper_type, question_set, part)] += count
+        counts[(owner, paper_type, question_set, None)] += count
+
+    for trade in trades:
+        paper_type = paper_types.get(trade.id)
+        if paper_type is None:
+            continue
+        sets = active_sets.get(trade.id, ["A"])
+        if len(sets) > 1:
+            # More than one active set for the paper
+            summaries[trade.id] = TRADE_SUMMARY_ERROR
+            continue
+        try:
+            dist, total_exam_questions = _exam_distribution(trade, paper_type)
+        except Exception:
+            summaries[trade.id] = TRADE_SUMMARY_ERROR
+            continue
+        owner = trade.id if paper_type == "PRIMARY" else None
+        summaries[trade.id] = TradeQuestionSummary(
+            paper_type=paper_type,
+            active_set=sets[0],
+            total_exam_questions=total_exam_questions,
+            available_count=counts[(owner, paper_type, sets[0], None)],
+            parts=[
+                (part, required, counts[(owner, paper_type, sets[0], part)])
+                for part, required in dist.items()
+                if required > 0
+            ],
+        )
+    return summaries
+
+
+class CandidateChangeList(ChangeList):
+    """Builds the trade & question counts once for the whole page instead of per row."""
+
+    def get_results(self, request):
+        super().get_results(request)
+        if "trade_questions_display" not in self.list_display:
+            return
+        trades = {c.trade_id: c.trade for c in self.result_list if c.trade_id}
+        summaries = trade_question_summaries(list(trades.values()))
+        for candidate in self.result_list:
+            candidate._trade_questions = summaries.get(candidate.trade_id)
+
+
 # -------------------------
 # Admin Registration
 # -------------------------
@@ -946,6 +612,8 @@ class CandidateProfileAdmin(admin.ModelAdmin):
     list_display = ("army_no", "name", "user", "rank", "trade", "shift", "slot_status_display", "created_at")
     # base declaration; we will set this per-request in changelist_view
     list_editable = ()
+    # trade_questions_display reads obj.trade on every row
+    list_select_related = ("trade",)
     list_filter = (
     "trade",
     "training_center",
@@ -969,6 +637,7 @@ class CandidateProfileAdmin(admin.ModelAdmin):
         reset_exam_slots,
         reassign_exam_slots,
         clear_incomplete_sessions,  # New session cleanup action
+        pregenerate_exam_papers,
          # New delete action
     ]
     def primary_bypass_display(self, obj):
@@ -1122,12 +791,7 @@ class CandidateProfileAdmin(admin.ModelAdmin):
                 status_html = format_html('<span style="color: #6c757d;">{}</span>', status)
             
             # Add reset button if slot exists (only for CENTER_ADMIN)
-            from questions.models import TradePaperActivation
-
-            activation = TradePaperActivation.objects.filter(
-                trade=obj.trade,
-                is_active=True
-            ).first()
+            activation = get_activation_snapshot().trade_activation(obj.trade_id)
 
             if obj.has_exam_slot and activation:
                 if activation.paper_type == "PRIMARY" and obj.primary_slot_consumed_at:
@@ -1161,126 +825,16 @@ class CandidateProfileAdmin(admin.ModelAdmin):
         """Display trade, active question set, and exam question counts"""
         if not obj.trade:
             return format_html('<span style="color: #6c757d; font-style: italic;">No Trade</span>')
-        
-        from questions.models import Question, QuestionSetActivation, TradePaperActivation, HARD_CODED_TRADE_CONFIG, HARD_CODED_COMMON_DISTRIBUTION
-        
+
         trade_name = obj.trade.name
-        
-        try:
-            # Get active paper type for this trade
-            trade_activation = TradePaperActivation.objects.get(
-                trade=obj.trade,
-                is_active=True
-            )
-            paper_type = trade_activation.paper_type
-            
-            # Get active question set
-            try:
-                qs_activation = QuestionSetActivation.objects.get(
-                    trade=obj.trade,
-                    paper_type=paper_type,
-                    is_active=True
-                )
-                active_set = qs_activation.question_set
-            except QuestionSetActivation.DoesNotExist:
-                active_set = 'A'  # Default
-            
-            # Get expected question distribution for exam
-            if paper_type == "SECONDARY":
-                dist = HARD_CODED_COMMON_DISTRIBUTION.copy()
-                total_exam_questions = sum(int(count) for count in dist.values())
-            else:
-                # Get trade-specific distribution
-                trade_code = obj.trade.code.upper()
-                if trade_code in HARD_CODED_TRADE_CONFIG:
-                    dist = HARD_CODED_TRADE_CONFIG[trade_code]["part_distribution"]
-                    total_exam_questions = HARD_CODED_TRADE_CONFIG[trade_code]["total_questions"]
-                else:
-                    dist = HARD_CODED_COMMON_DISTRIBUTION.copy()
-                    total_exam_questions = sum(int(count) for count in dist.values())
-            
-            # Count available questions in the active set
-            if paper_type == "SECONDARY":
-                available_count = Question.objects.filter(
-                    paper_type="SECONDARY",
-                    is_common=True,
-                    question_set=active_set,
-                    is_active=True
-                ).count()
-            else:
-                available_count = Question.objects.filter(
-                    trade=obj.trade,
-                    paper_type="PRIMARY",
-                    question_set=active_set,
-                    is_active=True
-                ).count()
-            
-            # Determine colors and icons based on paper type
-            if paper_type == "PRIMARY":
-                paper_color = "#1565c0"
-                paper_bg = "#e3f2fd"
-                paper_border = "#bbdefb"
-                paper_icon = "🔵"
-            else:
-                paper_color = "#7b1fa2"
-                paper_bg = "#f3e5f5"
-                paper_border = "#ce93d8"
-                paper_icon = "🟣"
-            
-            # Check if there are enough questions
-            status_icon = "✅" if available_count >= total_exam_questions else "⚠️"
-            status_color = "#28a745" if available_count >= total_exam_questions else "#dc3545"
-            
-            # Get part-wise breakdown for detailed display
-            part_breakdown = []
-            for part, required_count in dist.items():
-                if required_count > 0:
-                    if paper_type == "SECONDARY":
-                        part_available = Question.objects.filter(
-                            paper_type="SECONDARY",
-                            is_common=True,
-                            question_set=active_set,
-                            part=part,
-                            is_active=True
-                        ).count()
-                    else:
-                        part_available = Question.objects.filter(
-                            trade=obj.trade,
-                            paper_type="PRIMARY",
-                            question_set=active_set,
-                            part=part,
-                            is_active=True
-                        ).count()
-                    
-                    part_status = "✅" if part_available >= required_count else "❌"
-                    part_breakdown.append(f"{part}:{required_count}/{part_available}{part_status}")
-            
-            breakdown_text = " | ".join(part_breakdown) if part_breakdown else "No breakdown"
-            
-            return format_html(
-                '<div style="text-align: center; min-width: 180px;">'
-                '<strong style="color: #ffffff; font-size: 13px; display: block; margin-bottom: 6px;">{}</strong>'
-                '<div style="margin-bottom: 4px;">'
-                '<span style="background: {}; color: {}; padding: 3px 8px; border-radius: 4px; border: 1px solid {}; font-size: 11px; font-weight: bold;">'
-                '{} {} Set {}'
-                '</span>'
-                '</div>'
-                '<div style="font-size: 10px; color: {}; font-weight: bold; margin-bottom: 4px;">'
-                '{} Exam: {}/{} questions'
-                '</div>'
-                '<div style="font-size: 9px; color: #666; background: #f8f9fa; padding: 2px 4px; border-radius: 3px; border: 1px solid #dee2e6;">'
-                'Parts: {}'
-                '</div>'
-                '</div>',
-                trade_name,
-                paper_bg, paper_color, paper_border,
-                paper_icon, paper_type, active_set,
-                status_color,
-                status_icon, total_exam_questions, available_count,
-                breakdown_text
-            )
-            
-        except TradePaperActivation.DoesNotExist:
+
+        # Precomputed for the whole page by CandidateChangeList
+        if hasattr(obj, "_trade_questions"):
+            summary = obj._trade_questions
+        else:
+            summary = trade_question_summaries([obj.trade])[obj.trade_id]
+
+        if summary is None:
             # No activation found
             return format_html(
                 '<div style="text-align: center;">'
@@ -1289,8 +843,8 @@ class CandidateProfileAdmin(admin.ModelAdmin):
                 '</div>',
                 trade_name
             )
-        
-        except Exception as e:
+
+        if summary is TRADE_SUMMARY_ERROR:
             # Error occurred
             return format_html(
                 '<div style="text-align: center;">'
@@ -1299,10 +853,63 @@ class CandidateProfileAdmin(admin.ModelAdmin):
                 '</div>',
                 trade_name
             )
-    
+
+        paper_type = summary.paper_type
+        total_exam_questions = summary.total_exam_questions
+        available_count = summary.available_count
+
+        # Determine colors and icons based on paper type
+        if paper_type == "PRIMARY":
+            paper_color = "#1565c0"
+            paper_bg = "#e3f2fd"
+            paper_border = "#bbdefb"
+            paper_icon = "🔵"
+        else:
+            paper_color = "#7b1fa2"
+            paper_bg = "#f3e5f5"
+            paper_border = "#ce93d8"
+            paper_icon = "🟣"
+
+        # Check if there are enough questions
+        status_icon = "✅" if available_count >= total_exam_questions else "⚠️"
+        status_color = "#28a745" if available_count >= total_exam_questions else "#dc3545"
+
+        # Part-wise breakdown for detailed display
+        part_breakdown = [
+            f"{part}:{required_count}/{part_available}{'✅' if part_available >= required_count else '❌'}"
+            for part, required_count, part_available in summary.parts
+        ]
+        breakdown_text = " | ".join(part_breakdown) if part_breakdown else "No breakdown"
+
+        return format_html(
+            '<div style="text-align: center; min-width: 180px;">'
+            '<strong style="color: #ffffff; font-size: 13px; display: block; margin-bottom: 6px;">{}</strong>'
+            '<div style="margin-bottom: 4px;">'
+            '<span style="background: {}; color: {}; padding: 3px 8px; border-radius: 4px; border: 1px solid {}; font-size: 11px; font-weight: bold;">'
+            '{} {} Set {}'
+            '</span>'
+            '</div>'
+            '<div style="font-size: 10px; color: {}; font-weight: bold; margin-bottom: 4px;">'
+            '{} Exam: {}/{} questions'
+            '</div>'
+            '<div style="font-size: 9px; color: #666; background: #f8f9fa; padding: 2px 4px; border-radius: 3px; border: 1px solid #dee2e6;">'
+            'Parts: {}'
+            '</div>'
+            '</div>',
+            trade_name,
+            paper_bg, paper_color, paper_border,
+            paper_icon, paper_type, summary.active_set,
+            status_color,
+            status_icon, total_exam_questions, available_count,
+            breakdown_text
+        )
+
     trade_questions_display.short_description = "Trade & Exam Questions"
     trade_questions_display.allow_tags = True
 
+    def get_changelist(self, request, **kwargs):
+        return CandidateChangeList
+
     # ---------- changelist (top buttons/links area) ----------
     def changelist_view(self, request, extra_context=None):
         # Enable inline editing for PO_ADMIN users on marks fields
@@ -1372,6 +979,7 @@ class CandidateProfileAdmin(admin.ModelAdmin):
                     "reset_exam_slots",
                     "reassign_exam_slots",
                     "clear_incomplete_sessions",
+                    "pregenerate_exam_papers",
                     "delete_selected",   # ✅ USE DJANGO DEFAULT
                 ]
             }
@@ -1526,6 +1134,12 @@ class CandidateProfileAdmin(admin.ModelAdmin):
                 self.admin_site.admin_view(self.export_all_images_view),
                 name="registration_candidateprofile_export_all_images",
             ),
+            # Changes since the last exam-data export (PO only)
+            path(
+                "Export-Delta-dat/",
+                self.admin_site.admin_view(self.export_delta_dat_view),
+                name="registration_candidateprofile_export_delta_dat",
+            ),
             # NEW: Export-All-Marks (admin-bound method)
             path(
                 "Export-All-Marks/",
@@ -1538,6 +1152,16 @@ class CandidateProfileAdmin(admin.ModelAdmin):
                 self.admin_site.admin_view(self.export_all_evaluation_results_view),
                 name="registration_candidateprofile_export_all_evaluation_results",
             ),
+            path(
+                "export-jobs/<int:job_id>/",
+                self.admin_site.admin_view(self.export_job_view),
+                name="registration_candidateprofile_export_job",
+            ),
+            path(
+                "export-jobs/<int:job_id>/download/",
+                self.admin_site.admin_view(self.export_job_download_view),
+                name="registration_candidateprofile_export_job_download",
+            ),
             # JS endpoint that injects the sidebar buttons (served via admin view to allow permission check)
             path(
                 "candidate-export-links.js",
@@ -1559,32 +1183,80 @@ class CandidateProfileAdmin(admin.ModelAdmin):
         ]
         return custom_urls + urls
 
+    # "Export All ..." buttons queue a background ExportJob (registration.export_jobs)
     def export_all_dat_view(self, request):
         # Only PO_ADMIN can export DAT
         if not self._is_po_admin(request):
             return HttpResponseForbidden("Not allowed.")
-        qs = self.get_queryset(request)
-        return export_candidates_dat(self, request, qs)
+        return self._start_export_job(request, ExportJob.KIND_EXAM_DATA)
+
+    def export_delta_dat_view(self, request):
+        # Only PO_ADMIN can export DAT
+        if not self._is_po_admin(request):
+            return HttpResponseForbidden("Not allowed.")
+        return self._start_export_job(request, ExportJob.KIND_EXAM_DATA_DELTA)
 
     def export_all_images_view(self, request):
         # Only PO_ADMIN can export photos ZIP
         if not self._is_po_admin(request):
             return HttpResponseForbidden("Not allowed.")
-        return export_all_candidate_images(self, request)
+        return self._start_export_job(request, ExportJob.KIND_PHOTOS)
 
     def export_all_marks_view(self, request):
         # Only PO_ADMIN can export Marks
         if not self._is_po_admin(request):
             return HttpResponseForbidden("Not allowed.")
-        qs = self.get_queryset(request)
-        return export_marks_excel(self, request, qs)
+        return self._start_export_job(request, ExportJob.KIND_MARKS)
 
     def export_all_evaluation_results_view(self, request):
         # Only PO_ADMIN can export Evaluation Results
         if not self._is_po_admin(request):
             return HttpResponseForbidden("Not allowed.")
-        qs = self.get_queryset(request)
-        return export_evaluation_results_dat(self, request, qs)
+        return self._start_export_job(request, ExportJob.KIND_EVALUATION)
+
+    def _start_export_job(self, request, kind):
+        job, created = start_export(kind, user=request.user)
+        if created:
+            messages.success(request, f"📤 {job.get_kind_display()} export started.")
+        else:
+            messages.info(request, f"⏳ {job.get_kind_display()} export is already running - showing its progress.")
+        return redirect("admin:registration_candidateprofile_export_job", job_id=job.pk)
+
+    def export_job_view(self, request, job_id):
+        if not self._is_po_admin(request):
+            return HttpResponseForbidden("Not allowed.")
+        job = get_object_or_404(ExportJob, pk=job_id)
+
+        if request.GET.get("format") == "json":
+            return JsonResponse({
+                "id": job.pk,
+                "kind": job.kind,
+                "status": job.status,
+                "rows_processed": job.rows_processed,
+                "bytes_written": job.bytes_written,
+                "error": job.error,
+                "download_url": (
+                    reverse("admin:registration_candidateprofile_export_job_download", args=[job.pk])
+                    if job.status == ExportJob.STATUS_DONE and job.artifact else ""
+                ),
+            })
+
+        context = {
+            **self.admin_site.each_context(request),
+            "title": f"{job.get_kind_display()} Export",
+            "job": job,
+            "opts": self.model._meta,
+            "recent_jobs": ExportJob.objects.filter(kind=job.kind).exclude(pk=job.pk)[:5],
+        }
+        return render(request, "admin/registration/export_job.html", context)
+
+    def export_job_download_view(self, request, job_id):
+        if not self._is_po_admin(request):
+            return HttpResponseForbidden("Not allowed.")
+        job = get_object_or_404(ExportJob, pk=job_id, status=ExportJob.STATUS_DONE)
+        if not job.artifact or not job.artifact.storage.exists(job.artifact.name):
+            return HttpResponseBadRequest("Export file is no longer available; start a new export.")
+        return FileResponse(job.artifact.open("rb"), as_attachment=True, filename=job.filename)
 
     def export_links_js(self, request):
         """
@@ -1599,6 +1271,7 @@ class CandidateProfileAdmin(admin.ModelAdmin):
 
         # Export URLs (for PO_ADMIN users)
         dat_url = reverse("admin:registration_candidateprofile_export_all_dat")
+        delta_url = reverse("admin:registration_candidateprofile_export_delta_dat")
         img_url = reverse("admin:registration_candidateprofile_export_all_images")
         marks_url = reverse("admin:registration_candidateprofile_export_all_marks")
         eval_url = reverse("admin:registration_candidateprofile_export_all_evaluation_results")
@@ -1718,8 +1391,10 @@ try {
                     var eb2 = createExportButton("{IMG_URL}", "{IMG_LABEL}", '#17a2b8');
                     var eb3 = createExportButton("{MARKS_URL}", "{MARKS_LABEL}", '#28a745');
                     var eb4 = createExportButton("{EVAL_URL}", "{EVAL_LABEL}", '#6f42c1');
+                    var eb5 = createExportButton("{DELTA_URL}", "Export Changes Since Last Export", '#fd7e14');
 
                     exportWrapper.appendChild(eb1);
+                    exportWrapper.appendChild(eb5);
                     exportWrapper.appendChild(eb2);
                     exportWrapper.appendChild(eb3);
                     exportWrapper.appendChild(eb4);
@@ -1804,6 +1479,7 @@ try {
         js = js_template.replace("{IS_PO_ADMIN}", "true" if is_po_admin else "false")
         js = js.replace("{IS_CENTER_ADMIN}", "true" if is_center_admin else "false")
         js = js.replace("{DAT_URL}", dat_url)
+        js = js.replace("{DELTA_URL}", delta_url)
         js = js.replace("{IMG_URL}", img_url)
         js = js.replace("{MARKS_URL}", marks_url)
         js = js.replace("{EVAL_URL}", eval_url)
@@ -1824,12 +1500,7 @@ try {
             return redirect('admin:registration_candidateprofile_changelist')
 
         # ❌ Hard lock: never reset after submission
-        from questions.models import TradePaperActivation
-
-        activation = TradePaperActivation.objects.filter(
-            trade=candidate.trade,
-            is_active=True
-        ).first()
+        activation = get_activation_snapshot().trade_activation(candidate.trade_id)
 
         if activation:
             if activation.paper_type == "PRIMARY" and candidate.primary_slot_consumed_at:
@@ -1890,9 +1561,7 @@ try {
                 trade_name = "All Trades"
             
             if action == 'create_slots':
-                from questions.models import TradePaperActivation
-
-                activation = TradePaperActivation.objects.filter(is_active=True).first()
+                activation = get_activation_snapshot().first_active_activation()
                 if not activation:
                     messages.error(request, "No active paper found.")
                     return redirect(request.path)
@@ -1909,14 +1578,7 @@ try {
                         is_primary_completed=True
                     )
 
-                count = 0
-                for candidate in candidates_without_slots:
-                    try:
-                        candidate.assign_exam_slot(assigned_by_user=request.user)
-                        count += 1
-                    except ValidationError:
-                        continue
-
+                count = sum(assign_slots(candidates_without_slots, assigned_by=request.user).values())
 
                 if count == 0:
                     messages.info(request, f'All candidates in {trade_name} already have exam slots.')
@@ -1928,26 +1590,18 @@ try {
 
             
             elif action == 'reset_all_slots':
-                from questions.models import TradePaperActivation
+                snapshot = get_activation_snapshot()
 
                 candidates_with_slots = candidates.filter(has_exam_slot=True)
-                count = 0
 
-                for candidate in candidates_with_slots:
-                    activation = TradePaperActivation.objects.filter(
-                        trade=candidate.trade,
-                        is_active=True
-                    ).first()
-
-                    # 🔒 Respect paper-specific consumption lock
+                # 🔒 Respect paper-specific consumption lock
+                locked = Q(pk__in=[])
+                for trade_id in set(candidates_with_slots.values_list('trade_id', flat=True)):
+                    activation = snapshot.trade_activation(trade_id)
                     if activation:
-                        if activation.paper_type == "PRIMARY" and candidate.primary_slot_consumed_at:
-                            continue
-                        if activation.paper_type == "SECONDARY" and candidate.secondary_slot_consumed_at:
-                            continue
+                        locked |= Q(trade_id=trade_id, **{f'{activation.paper_type.lower()}_slot_consumed_at__isnull': False})
 
-                    if candidate.reset_exam_slot():
-                        count += 1
+                count = len(reset_slots(candidates_with_slots.exclude(locked)).candidate_ids)
 
                 if count == 0:
                     messages.info(request, f'No exam slots eligible for reset for {trade_name}.')
@@ -1959,95 +1613,23 @@ try {
 
             elif action == 'reassign_all_slots':
                 # Reset and reassign all slots
-                count = 0
-                for candidate in candidates:
-                    
-                    try:
-                        candidate.reset_exam_slot()
-                    except ValidationError:
-                        continue
-
-                    try:
-                        candidate.assign_exam_slot(assigned_by_user=request.user)
-                        count += 1
-                    except ValidationError:
-                        continue
-
+                reset = reset_slots(candidates)
+                assigned = assign_slots(CandidateProfile.objects.filter(id__in=reset.candidate_ids), assigned_by=request.user)
+                count = sum(assigned.values())
                 
                 messages.success(request, f'🔄 Reassigned {count} exam slots for {trade_name}.')
             
             return redirect(request.path)
         
         # GET request - show the management interface
-        trades = Trade.objects.all().order_by('name')
-        
-        # Get statistics
-        total_candidates = CandidateProfile.objects.count()
-        candidates_with_slots = CandidateProfile.objects.filter(has_exam_slot=True).count()
-        candidates_without_slots = total_candidates - candidates_with_slots
-        consumed_primary = CandidateProfile.objects.filter(
-            primary_slot_consumed_at__isnull=False
-        ).count()
-
-        consumed_secondary = CandidateProfile.objects.filter(
-            secondary_slot_consumed_at__isnull=False
-        ).count()
-
-
-        active_slots = CandidateProfile.objects.filter(
-            has_exam_slot=True
-        ).count()
-
-        available_slots = active_slots
-
-
-        
-        # Trade-wise statistics
-        trade_stats = []
-        for trade in trades:
-            trade_total = CandidateProfile.objects.filter(trade=trade).count()
-            trade_with_slots = CandidateProfile.objects.filter(trade=trade, has_exam_slot=True).count()
-            trade_without_slots = trade_total - trade_with_slots
-            trade_primary_consumed = CandidateProfile.objects.filter(
-                trade=trade,
-                primary_slot_consumed_at__isnull=False
-            ).count()
-
-            trade_secondary_consumed = CandidateProfile.objects.filter(
-                trade=trade,
-                secondary_slot_consumed_at__isnull=False
-            ).count()
-
-
-            trade_available = CandidateProfile.objects.filter(
-                trade=trade,
-                has_exam_slot=True
-            ).count()
+        stats = slot_stats()
 
-            
-            trade_stats.append({
-                'trade': trade,
-                'total': trade_total,
-                'with_slots': trade_with_slots,
-                'without_slots': trade_without_slots,
-                'consumed_primary': trade_primary_consumed,
-                'consumed_secondary': trade_secondary_consumed,
-                'available': trade_available,
-            })
-        
         context = {
             'title': 'Bulk Exam Slot Management',
-            'trades': trades,
-            'trade_stats': trade_stats,
-            'total_candidates': total_candidates,
-            'candidates_with_slots': candidates_with_slots,
-            'candidates_without_slots': candidates_without_slots,
-            'available_slots': available_slots,
+            'trades': [stat['trade'] for stat in stats['trade_stats']],
+            **stats,
             'opts': self.model._meta,
             'has_view_permission': True,
-            'consumed_primary': consumed_primary,
-            'consumed_secondary': consumed_secondary,
-
         }
         
         return render(request, 'admin/registration/bulk_slot_management.html', context)
@@ -2061,3 +1643,29 @@ try {
         except Exception:
             # If reverse fails for any reason, return empty Media to avoid breaking admin
             return forms.Media()
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "rows_processed", "bytes_written", "requested_by", "created_at", "finished_at", "job_link")
+    list_filter = ("kind", "status")
+    ordering = ("-created_at",)
+
+    def job_link(self, obj):
+        url = reverse("admin:registration_candidateprofile_export_job", args=[obj.pk])
+        label = "⬇️ Download" if obj.status == ExportJob.STATUS_DONE and obj.artifact else "📊 Progress"
+        return format_html('<a href="{}">{}</a>', url, label)
+
+    job_link.short_description = "Job"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ExportWatermark)
+class ExportWatermarkAdmin(admin.ModelAdmin):
+    # Editable so a PO can move the point back and re-export changes
+    list_display = ("center", "exported_until", "updated_at")
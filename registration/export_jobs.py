@@ -0,0 +1,411 @@
+# registration/export_jobs.py
+"""
+Background admin exports.
+
+The "Export All ..." buttons used to build and encrypt the whole export
+inside the admin request. start_export records an ExportJob and hands it
+to a local process pool; the worker streams the export into a file under
+MEDIA_ROOT/exports/ and writes its progress (rows processed, bytes written)
+to the job row, which the admin status page polls. While a job is queued
+or building, the process that submitted it also refreshes the row every
+EXPORT_JOB_STALE_SECONDS / 4, so only jobs whose server went away look
+stale. Asking for an export that is already pending or running returns
+that job instead of starting a second build.
+
+Exam-data exports (full or delta) advance the center's ExportWatermark
+when they succeed; a delta export covers sessions completed and marks
+changed between the watermark and now, less EXPORT_DELTA_SETTLE_SECONDS
+so that work still being committed is left for the next delta.
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .exports import (
+    DELTA_CANDIDATE_HEADERS,
+    DELTA_CANDIDATES_SHEET,
+    DELTA_INFO_HEADERS,
+    DELTA_INFO_SHEET,
+    EVALUATION_HEADERS,
+    EXPORT_HEADERS,
+    MARKS_HEADERS,
+    RESULTS_SHEET,
+    ExportSheet,
+    center_export_filename,
+    delta_candidate_rows,
+    delta_candidates,
+    delta_info_rows,
+    evaluation_rows,
+    iter_dat_export,
+    iter_exam_export_rows,
+    iter_zip,
+    marks_rows,
+    photo_entries,
+    write_xlsx,
+)
+from .models import CandidateProfile, ExportJob, ExportWatermark
+from .parallel_export import iter_partitioned_export
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_DIR = "exports"
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+# job id -> future of the jobs this process submitted (kept alive by _heartbeat_loop)
+_submitted: Dict[int, Future] = {}
+_heartbeat: Optional[threading.Thread] = None
+
+
+def params_key(params: dict) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+
+# ============================================================
+# Request side
+# ============================================================
+def start_export(kind: str, user=None, params: Optional[dict] = None) -> Tuple[ExportJob, bool]:
+    """
+    Queue an export of ``kind``; returns (job, created).
+
+    An identical export (same kind and params) that is still pending or
+    running is returned as is, with created=False.
+    """
+    params = params or {}
+    key = params_key(params)
+    active_key = f"{kind}:{key}"
+
+    _expire_stale_jobs()
+    existing = ExportJob.objects.filter(active_key=active_key).first()
+    if existing is not None:
+        return existing, False
+
+    try:
+        with transaction.atomic():
+            job = ExportJob.objects.create(
+                kind=kind,
+                params=params,
+                params_key=key,
+                active_key=active_key,
+                requested_by=user if user is not None and user.is_authenticated else None,
+            )
+    except IntegrityError:
+        # Lost the race against an identical request
+        return ExportJob.objects.get(active_key=active_key), False
+
+    transaction.on_commit(lambda: _submit(job.pk))
+    return job, True
+
+
+def _expire_stale_jobs():
+    """
+    Fail active jobs that have not reported for EXPORT_JOB_STALE_SECONDS.
+    Queued and building jobs are refreshed by their submitting process
+    (_heartbeat_loop), so this only catches jobs whose server restarted or
+    died; such a job is skipped if a worker still picks it up.
+    """
+    stale_after = getattr(settings, "EXPORT_JOB_STALE_SECONDS", 600)
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    ExportJob.objects.filter(active_key__isnull=False, updated_at__lt=cutoff).update(
+        status=ExportJob.STATUS_FAILED,
+        active_key=None,
+        error="Interrupted: the export worker stopped responding.",
+        finished_at=timezone.now(),
+    )
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            from questions.paper_pool import _init_worker
+
+            # spawn: forked children would share the parent's DB socket
+            _executor = ProcessPoolExecutor(
+                max_workers=getattr(settings, "EXPORT_JOB_WORKERS", 2),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        _executor = None
+
+
+def _submit(job_id: int):
+    global _heartbeat
+    try:
+        future = _get_executor().submit(run_export_job, job_id)
+    except BrokenProcessPool:
+        _reset_executor()
+        future = _get_executor().submit(run_export_job, job_id)
+
+    with _executor_lock:
+        _submitted[job_id] = future
+        if _heartbeat is None:
+            _heartbeat = threading.Thread(target=_heartbeat_loop, name="export-job-heartbeat", daemon=True)
+            _heartbeat.start()
+    future.add_done_callback(lambda f: _submitted.pop(job_id, None))
+    future.add_done_callback(lambda f: _log_worker_failure(job_id, f))
+
+
+def _heartbeat_loop():
+    """
+    Refresh updated_at of this process's queued and building jobs. Jobs wait
+    behind EXPORT_JOB_WORKERS other builds, or on one large partitioned part,
+    without reporting progress; without this they would be expired as stale
+    and started again.
+    """
+    global _heartbeat
+    interval = max(1.0, getattr(settings, "EXPORT_JOB_STALE_SECONDS", 600) / 4)
+    while True:
+        time.sleep(interval)
+        with _executor_lock:
+            job_ids = [job_id for job_id, future in _submitted.items() if not future.done()]
+            if not job_ids:
+                _heartbeat = None
+                return
+        try:
+            ExportJob.objects.filter(pk__in=job_ids, active_key__isnull=False).update(updated_at=timezone.now())
+        except Exception as e:
+            logger.error("Export job heartbeat failed: %s", e)
+        finally:
+            connection.close()
+
+
+def _log_worker_failure(job_id: int, future):
+    error = future.exception()
+    if error is None:
+        return
+    logger.error("Export job %s worker failed: %s", job_id, error)
+    if isinstance(error, BrokenProcessPool):
+        _reset_executor()
+    _finish(job_id, ExportJob.STATUS_FAILED, error=str(error) or error.__class__.__name__)
+    # Runs on the executor's management thread: don't leave its connection open
+    connection.close()
+
+
+# ============================================================
+# Worker side
+# ============================================================
+class _Progress:
+    """Counts rows and flushes rows/bytes to the job row at most once per interval."""
+
+    def __init__(self, job_id: int, out, interval: float = 1.0):
+        self.job_id = job_id
+        self.out = out
+        self.interval = interval
+        self.rows_processed = 0
+        self._flushed_at = 0.0
+
+    def rows(self, rows: Iterable) -> Iterator:
+        for row in rows:
+            self.rows_processed += 1
+            yield row
+            self.maybe_flush()
+
+    def add(self, count: int):
+        self.rows_processed += count
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        if time.monotonic() - self._flushed_at >= self.interval:
+            self.flush()
+
+    def flush(self):
+        self._flushed_at = time.monotonic()
+        # File size rather than tell(): writers may seek back (zip headers, rewind)
+        self.out.flush()
+        ExportJob.objects.filter(pk=self.job_id).update(
+            rows_processed=self.rows_processed,
+            bytes_written=os.fstat(self.out.fileno()).st_size,
+            updated_at=timezone.now(),
+        )
+
+
+def _candidates():
+    return CandidateProfile.objects.all()
+
+
+def _passphrase() -> str:
+    passphrase = getattr(settings, "CONVERTER_PASSPHRASE", None)
+    if not passphrase:
+        raise ValueError("Server missing CONVERTER_PASSPHRASE; set it in settings or env.")
+    return passphrase
+
+
+def _write_dat(xlsx_file, out, progress: _Progress, passphrase: str):
+    for chunk in iter_dat_export(xlsx_file, passphrase):
+        out.write(chunk)
+        progress.maybe_flush()
+
+
+def _export_center():
+    from centers.models import Center
+
+    return Center.objects.first()
+
+
+def _settled_until() -> datetime:
+    return timezone.now() - timedelta(seconds=getattr(settings, "EXPORT_DELTA_SETTLE_SECONDS", 60))
+
+
+def _build_exam_data(job, out, progress) -> str:
+    passphrase = _passphrase()
+    job.params["until"] = _settled_until().isoformat()
+    partition_by = getattr(settings, "EXPORT_PARTITION_BY", "")
+    if partition_by:
+        # One workbook per trade/shift, built in parallel, zipped (see parallel_export)
+        archive = tempfile.TemporaryFile()
+        for chunk in iter_partitioned_export(_candidates(), partition_by, on_part=lambda name, rows: progress.add(rows)):
+            archive.write(chunk)
+        archive.seek(0)
+        _write_dat(archive, out, progress, passphrase)
+        return center_export_filename(f"_by_{partition_by}", "candidates_export")
+
+    rows = progress.rows(iter_exam_export_rows(_candidates()))
+    _write_dat(write_xlsx([ExportSheet(RESULTS_SHEET, EXPORT_HEADERS, rows)]), out, progress, passphrase)
+    return center_export_filename("", "candidates_export")
+
+
+def _build_exam_data_delta(job, out, progress) -> str:
+    passphrase = _passphrase()
+    center = _export_center()
+    watermark = ExportWatermark.objects.filter(center=center).first()
+    since = watermark.exported_until if watermark else None
+    until = _settled_until()
+    if since is not None and until < since:
+        until = since
+    window = (since, until)
+    job.params["since"] = since.isoformat() if since else None
+    job.params["until"] = until.isoformat()
+
+    candidates = delta_candidates(_candidates(), window)
+    sheets = [
+        ExportSheet(RESULTS_SHEET, EXPORT_HEADERS, progress.rows(iter_exam_export_rows(candidates, window=window))),
+        ExportSheet(DELTA_CANDIDATES_SHEET, DELTA_CANDIDATE_HEADERS, delta_candidate_rows(candidates)),
+        ExportSheet(DELTA_INFO_SHEET, DELTA_INFO_HEADERS, delta_info_rows(window, str(center or "")), column_width=30),
+    ]
+    _write_dat(write_xlsx(sheets), out, progress, passphrase)
+
+    stamp = since.strftime("%Y%m%d%H%M%S") if since else "start"
+    return center_export_filename(f"_delta_{stamp}_{until:%Y%m%d%H%M%S}", "exam_data_delta")
+
+
+def _build_evaluation(job, out, progress) -> str:
+    passphrase = _passphrase()
+    rows = progress.rows(evaluation_rows(_candidates()))
+    sheet = ExportSheet("Evaluation Results", EVALUATION_HEADERS, rows, column_width=15)
+    _write_dat(write_xlsx([sheet]), out, progress, passphrase)
+    return center_export_filename("_evaluation_results", "evaluation_results")
+
+
+def _build_marks(job, out, progress) -> str:
+    rows = progress.rows(marks_rows(_candidates()))
+    write_xlsx([ExportSheet("Marks", MARKS_HEADERS, rows, column_width=20)], fileobj=out)
+    return "candidate_marks.xlsx"
+
+
+def _build_photos(job, out, progress) -> str:
+    for chunk in iter_zip(progress.rows(photo_entries(_candidates()))):
+        out.write(chunk)
+    return "all_candidate_images.zip"
+
+
+BUILDERS = {
+    ExportJob.KIND_EXAM_DATA: _build_exam_data,
+    ExportJob.KIND_EXAM_DATA_DELTA: _build_exam_data_delta,
+    ExportJob.KIND_EVALUATION: _build_evaluation,
+    ExportJob.KIND_MARKS: _build_marks,
+    ExportJob.KIND_PHOTOS: _build_photos,
+}
+
+
+def run_export_job(job_id: int):
+    """Build one export job's artifact (runs inside a pool worker process)."""
+    close_old_connections()
+    claimed = ExportJob.objects.filter(pk=job_id, active_key__isnull=False).update(
+        status=ExportJob.STATUS_RUNNING, started_at=timezone.now()
+    )
+    if not claimed:
+        # Expired while queued (see _expire_stale_jobs); a new request starts a fresh job
+        return
+    job = ExportJob.objects.get(pk=job_id)
+
+    name = f"{ARTIFACT_DIR}/{uuid.uuid4().hex}"
+    path = default_storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        with open(path + ".part", "wb") as out:
+            progress = _Progress(job_id, out)
+            filename = BUILDERS[job.kind](job, out, progress)
+            progress.flush()
+        artifact = f"{name}_{filename}"
+        os.replace(path + ".part", default_storage.path(artifact))
+    except Exception as e:
+        logger.exception("Export job %s failed", job_id)
+        if os.path.exists(path + ".part"):
+            os.remove(path + ".part")
+        _finish(job_id, ExportJob.STATUS_FAILED, error=str(e) or e.__class__.__name__)
+        return
+
+    finished = _finish(job_id, ExportJob.STATUS_DONE, artifact=artifact, filename=filename, params=job.params)
+    if not finished:
+        # Expired meanwhile (see _expire_stale_jobs): no job points at the file
+        logger.warning("Export job %s expired before it finished; discarding its artifact", job_id)
+        default_storage.delete(artifact)
+        close_old_connections()
+        return
+    if job.params.get("until"):
+        _advance_watermark(datetime.fromisoformat(job.params["until"]))
+    if job.kind != ExportJob.KIND_EXAM_DATA_DELTA:
+        # Each delta is one link of a merge chain: keep them all
+        _prune_artifacts(job.kind, job.params_key)
+    close_old_connections()
+
+
+def _finish(job_id: int, status: str, **fields) -> int:
+    return ExportJob.objects.filter(pk=job_id, active_key__isnull=False).update(
+        status=status, active_key=None, finished_at=timezone.now(), **fields
+    )
+
+
+def _advance_watermark(until: datetime):
+    """Move this center's watermark forward to ``until`` (never back)."""
+    center = _export_center()
+    moved = ExportWatermark.objects.filter(center=center, exported_until__lt=until).update(
+        exported_until=until, updated_at=timezone.now()
+    )
+    if not moved:
+        ExportWatermark.objects.get_or_create(center=center, defaults={"exported_until": until})
+
+
+def _prune_artifacts(kind: str, key: str):
+    """Keep the newest EXPORT_JOB_KEEP artifacts per export; older files are deleted."""
+    keep = getattr(settings, "EXPORT_JOB_KEEP", 3)
+    old = (
+        ExportJob.objects.filter(kind=kind, params_key=key, status=ExportJob.STATUS_DONE)
+        .exclude(artifact="")
+        .order_by("-created_at")[keep:]
+    )
+    for job in old:
+        job.artifact.delete(save=False)
+        ExportJob.objects.filter(pk=job.pk).update(artifact="")
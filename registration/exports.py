@@ -0,0 +1,575 @@
+# registration/exports.py
+"""
+Admin exports: row generators and the shared XLSX writer.
+
+The export used to walk candidates one by one: a session query per
+candidate, a question query per session and a CandidateAnswer lookup per
+question (~60 queries per candidate). iter_exam_export_rows fetches
+candidates, sessions, exam questions and answers for a whole batch of
+candidates in a few set-based queries and joins them in memory, so the
+query count depends on the number of batches, not on the number of
+candidates or questions.
+
+Delta exports reuse the same rows restricted to sessions completed in a
+window, plus a Candidates sheet for marks changed in it (see
+export_jobs and the merge_exam_exports command).
+
+iter_zip streams photo archives: entries are written through an unseekable
+buffer and yielded as they are produced, already-compressed images are
+stored rather than deflated.
+
+write_xlsx writes any number of sheets from row generators with
+xlsxwriter's constant_memory mode into a temporary file: rows go to disk as
+they are produced, so memory stays flat however large the export is.
+"""
+import os
+import tempfile
+import zipfile
+from datetime import datetime
+from typing import IO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import xlsxwriter
+from django.conf import settings
+from django.utils import timezone
+
+from questions.dat_format import DAT_VERSION_V1, DAT_VERSION_V2, encrypt_dat, iter_encrypt, iter_file_chunks
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Spooled in memory up to this size, then spilled to disk
+EXPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
+EXPORT_HEADERS = [
+    "S.No",
+    "Name",
+    "Center",
+    "Photo",
+    "Fathers_Name",
+    "dob",
+    "Rank",
+    "Trade",
+    "Army_No",
+    "Adhaar_No",
+    "Mobile Number (Linked to Aadhaar Card)",
+    "APAAR_ID",
+    "Primary Qualification",
+    "Primary Duration",
+    "Primary Credits",
+    "Secondary Qualification",
+    "Secondary Duration",
+    "Secondary Credits",
+    "NSQF Level",
+    "Training_Center",
+    "District",
+    "State",
+    "Viva_1",
+    "Viva_2",
+    "Practical_1",
+    "Practical_2",
+    "Army_No",
+    "Exam_Type",
+    "Part",
+    "Question",
+    "Answer",
+    "Correct_Answer",
+    "Max_Marks",
+]
+
+# (part, text, correct_answer, marks)
+QuestionColumns = Tuple[str, str, object, object]
+
+
+def candidate_columns(candidate) -> list:
+    """Candidate part of an export row (Name .. second Army_No)."""
+    return [
+        candidate.name,
+        candidate.exam_center,
+        candidate.photograph.url if candidate.photograph else "",
+        candidate.father_name,
+        candidate.dob,
+        candidate.rank,
+        candidate.trade.name if candidate.trade else "",
+        candidate.army_no,
+        candidate.aadhar_number,
+        candidate.mobile_no,
+        candidate.apaar_id,
+        candidate.primary_qualification,
+        candidate.primary_duration,
+        candidate.primary_credits,
+        candidate.secondary_qualification,
+        candidate.secondary_duration,
+        candidate.secondary_credits,
+        candidate.nsqf_level,
+        candidate.training_center,
+        candidate.district,
+        candidate.state,
+        candidate.primary_viva_marks,
+        candidate.secondary_viva_marks,
+        candidate.primary_practical_marks,
+        candidate.secondary_practical_marks,
+        candidate.army_no,
+    ]
+
+
+def _completed_between(queryset, window: Optional[Tuple[Optional[datetime], datetime]], prefix: str = ""):
+    """Restrict ``queryset`` to sessions completed in (since, until]; since None means from the start."""
+    if window is None:
+        return queryset
+    since, until = window
+    queryset = queryset.filter(**{f"{prefix}completed_at__lte": until})
+    if since is not None:
+        queryset = queryset.filter(**{f"{prefix}completed_at__gt": since})
+    return queryset
+
+
+def _export_batch(candidates: list, window=None) -> Iterator[list]:
+    """
+    Export rows (without S.No) for one batch of candidates: three queries
+    (sessions, their ExamQuestion rows, the candidates' answers), five when
+    some candidates have no sessions left (their papers and questions).
+
+    Such orphan candidates are exported from their stored answers, so only
+    the questions they answered appear - not every question of the paper.
+    """
+    from questions.models import ExamQuestion, ExamSession, Question, QuestionPaper
+    from results.models import CandidateAnswer
+
+    candidate_ids = [c.id for c in candidates]
+
+    # Sessions per user, newest first
+    sessions_by_user: Dict[int, List[tuple]] = {}
+    sessions = _completed_between(ExamSession.objects.filter(user_id__in=[c.user_id for c in candidates]), window)
+    for session_id, user_id, exam_type, paper_id, paper_type in (
+        sessions.order_by("-started_at", "id")
+        .values_list("id", "user_id", "exam_type", "paper_id", "paper__question_paper")
+    ):
+        sessions_by_user.setdefault(user_id, []).append((session_id, exam_type, paper_id, paper_type))
+
+    # Assigned questions per session, in paper order
+    questions_by_session: Dict[int, List[Tuple[int, QuestionColumns]]] = {}
+    session_ids = [s[0] for sessions in sessions_by_user.values() for s in sessions]
+    if session_ids:
+        for session_id, question_id, *columns in (
+            ExamQuestion.objects.filter(session_id__in=session_ids)
+            .order_by("session_id", "order", "id")
+            .values_list(
+                "session_id", "question_id",
+                "question__part", "question__text", "question__correct_answer", "question__marks",
+            )
+        ):
+            questions_by_session.setdefault(session_id, []).append((question_id, tuple(columns)))
+
+    # Every answer of the batch, keyed like the unique constraint
+    answers: Dict[Tuple[int, int, int, str], object] = {}
+    for candidate_id, paper_id, question_id, exam_type, answer in (
+        CandidateAnswer.objects.filter(candidate_id__in=candidate_ids)
+        .values_list("candidate_id", "paper_id", "question_id", "exam_type", "answer")
+    ):
+        answers[(candidate_id, paper_id, question_id, exam_type)] = answer
+
+    # Candidates without sessions (deleted after the exam) are exported from their answers;
+    # a delta only covers sessions, so it has no orphans
+    orphan_ids = set() if window else {c.id for c in candidates if c.user_id not in sessions_by_user}
+    orphan_answers: Dict[int, list] = {}
+    orphan_papers: Dict[int, object] = {}
+    orphan_questions: Dict[int, QuestionColumns] = {}
+    if orphan_ids:
+        orphan_keys = [key for key in answers if key[0] in orphan_ids and key[1] is not None]
+        for key in orphan_keys:
+            orphan_answers.setdefault(key[0], []).append(key)
+        orphan_papers = QuestionPaper.objects.in_bulk({key[1] for key in orphan_keys})
+        orphan_questions = {
+            question_id: tuple(columns)
+            for question_id, *columns in Question.objects.filter(id__in={key[2] for key in orphan_keys})
+            .values_list("id", "part", "text", "correct_answer", "marks")
+        }
+
+    for candidate in candidates:
+        base = candidate_columns(candidate)
+        sessions = sessions_by_user.get(candidate.user_id)
+
+        if sessions is None:
+            if window:
+                continue
+            # Papers newest first (QuestionPaper ordering), then questions by id
+            for key in sorted(orphan_answers.get(candidate.id, ()), key=lambda key: (-key[1], key[2])):
+                _, paper_id, question_id, exam_type = key
+                paper_type = orphan_papers[paper_id].question_paper
+                if exam_type == paper_type:
+                    yield _row(base, paper_type, orphan_questions[question_id], answers[key])
+            continue
+
+        for session_id, exam_type, paper_id, paper_type in sessions:
+            for question_id, columns in questions_by_session.get(session_id, ()):
+                yield _row(base, paper_type, columns, answers.get((candidate.id, paper_id, question_id, exam_type)))
+
+
+def _row(base: list, paper_type: str, columns: QuestionColumns, answer) -> list:
+    part, text, correct_answer, marks = columns
+    return base + [
+        paper_type,
+        part,
+        text,
+        answer if answer is not None else "N/A",
+        correct_answer,
+        marks,
+    ]
+
+
+def iter_exam_export_rows(queryset, batch_size: int = None, window=None) -> Iterator[list]:
+    """
+    Export rows (S.No first, matching EXPORT_HEADERS) for the candidates in
+    ``queryset``, in queryset order.
+
+    One query loads the candidates; each batch of ``batch_size`` of them
+    (default EXPORT_BATCH_SIZE) then costs at most five more. With
+    ``window=(since, until)`` only sessions completed in (since, until] are
+    exported.
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, "EXPORT_BATCH_SIZE", 1000)
+    batch_size = max(1, batch_size)
+
+    candidates = list(queryset.select_related("trade"))
+    serial = 1
+    for start in range(0, len(candidates), batch_size):
+        for row in _export_batch(candidates[start:start + batch_size], window):
+            yield [serial] + row
+            serial += 1
+
+
+def iter_dat_export(xlsx_file: IO[bytes], passphrase: str) -> Iterator[bytes]:
+    """
+    Encrypted .dat bytes of an export workbook file, closing the file at the
+    end. DAT_EXPORT_VERSION=1 (default) keeps the converter layout, a single
+    chunk; 2 yields the chunked v2 container segment by segment.
+    """
+    with xlsx_file:
+        if getattr(settings, "DAT_EXPORT_VERSION", DAT_VERSION_V1) == DAT_VERSION_V2:
+            yield from iter_encrypt(iter_file_chunks(xlsx_file), passphrase)
+        else:
+            yield encrypt_dat(xlsx_file.read(), passphrase, version=DAT_VERSION_V1)
+
+
+def center_export_filename(suffix: str, fallback: str) -> str:
+    """``<comd>_<exam center><suffix>.dat`` for this center, else ``<fallback>_<timestamp>.dat``."""
+    from centers.models import Center
+
+    center = Center.objects.first()
+    if center:
+        safe_exam_center = "".join(c if c.isalnum() else "_" for c in center.exam_Center)
+        safe_comd = "".join(c if c.isalnum() else "_" for c in center.comd)
+        return f"{safe_comd}_{safe_exam_center}{suffix}.dat"
+    ts = timezone.now().strftime("%Y%m%d%H%M%S")
+    return f"{fallback}_{ts}.dat"
+
+
+# ============================================================
+# Delta exports
+# ============================================================
+# A delta workbook has the usual "Results" sheet (sessions completed in the
+# window), the current candidate columns of everyone with a new session or
+# changed marks, and the window itself so merges can check the chain.
+RESULTS_SHEET = "Results"
+DELTA_CANDIDATES_SHEET = "Candidates"
+DELTA_INFO_SHEET = "Delta Info"
+DELTA_CANDIDATE_HEADERS = EXPORT_HEADERS[1:27]
+DELTA_INFO_HEADERS = ["Key", "Value"]
+
+
+def delta_candidates(queryset, window: Tuple[Optional[datetime], datetime]):
+    """Candidates in ``queryset`` with a session completed, or marks changed, in (since, until]."""
+    from django.db.models import Q
+
+    from questions.models import ExamSession
+
+    since, until = window
+    users = _completed_between(ExamSession.objects.all(), window).values("user_id")
+    marks_changed = Q(marks_updated_at__lte=until)
+    if since is not None:
+        marks_changed &= Q(marks_updated_at__gt=since)
+    return queryset.filter(Q(user_id__in=users) | marks_changed)
+
+
+def delta_candidate_rows(queryset) -> Iterator[list]:
+    for candidate in _iter_candidates(queryset, "trade"):
+        yield candidate_columns(candidate)
+
+
+def delta_info_rows(window: Tuple[Optional[datetime], datetime], center: str) -> List[list]:
+    since, until = window
+    return [
+        ["Center", center],
+        ["Since", since.isoformat() if since else ""],
+        ["Until", until.isoformat()],
+    ]
+
+
+# ============================================================
+# Candidate sheets
+# ============================================================
+CANDIDATE_HEADERS = [
+    "Army No",
+    "Rank",
+    "Name",
+    "Photo",
+    "Trade",
+    "DOB",
+    "Father Name",
+    "Date of Enrolment",
+    "Aadhar Number",
+    "Mobile Number (Linked to Aadhaar Card)",
+    "APAAR ID",
+    "Training Center",
+    "District",
+    "State",
+    "Primary Qualification",
+    "Primary Duration",
+    "Primary Credits",
+    "Secondary Qualification",
+    "Secondary Duration",
+    "Secondary Credits",
+    "NSQF Level",
+    "Exam Center",
+    "Shift",
+    "Created At",
+]
+
+MARKS_HEADERS = [
+    "Army No",
+    "Name",
+    "Trade",
+    "Mobile Number (Linked to Aadhaar Card)",
+    "APAAR ID",
+    "Primary Viva Marks",
+    "Primary Practical Marks",
+    "Secondary Viva Marks",
+    "Secondary Practical Marks",
+    "Training Center",
+    "Exam Center",
+    "Created At",
+]
+
+EVALUATION_HEADERS = [
+    "Army No",
+    "Name",
+    "Rank",
+    "Trade",
+    "Mobile Number (Linked to Aadhaar Card)",
+    "APAAR ID",
+    "Exam Center",
+    "Training Center",
+    "Primary Practical Marks",
+    "Primary Viva Marks",
+    "Secondary Practical Marks",
+    "Secondary Viva Marks",
+    "Total Primary Marks",
+    "Total Secondary Marks",
+    "Created At",
+]
+
+
+def _iter_candidates(queryset, *related):
+    return queryset.select_related(*related).iterator(chunk_size=2000)
+
+
+def _created_at(candidate) -> str:
+    return candidate.created_at.strftime("%Y-%m-%d %H:%M") if candidate.created_at else ""
+
+
+def candidate_rows(queryset) -> Iterator[list]:
+    """Rows for the "Candidates" sheet (CANDIDATE_HEADERS)."""
+    for candidate in _iter_candidates(queryset, "trade", "shift"):
+        yield [
+            candidate.army_no,
+            candidate.rank,
+            candidate.name,
+            candidate.photograph.url if candidate.photograph else "",
+            getattr(candidate.trade, "name", str(candidate.trade)) if candidate.trade else "",
+            candidate.dob,
+            candidate.father_name,
+            candidate.doe.strftime("%Y-%m-%d") if candidate.doe else "",
+            candidate.aadhar_number,
+            candidate.mobile_no,
+            candidate.apaar_id,
+            candidate.training_center,
+            candidate.district,
+            candidate.state,
+            candidate.primary_qualification,
+            candidate.primary_duration,
+            candidate.primary_credits,
+            candidate.secondary_qualification,
+            candidate.secondary_duration,
+            candidate.secondary_credits,
+            candidate.nsqf_level,
+            candidate.exam_center,
+            str(candidate.shift) if candidate.shift else "",
+            _created_at(candidate),
+        ]
+
+
+def marks_rows(queryset) -> Iterator[list]:
+    """Rows for the "Marks" sheet (MARKS_HEADERS)."""
+    for candidate in _iter_candidates(queryset, "trade"):
+        yield [
+            candidate.army_no,
+            candidate.name,
+            candidate.trade.name if candidate.trade else "",
+            candidate.mobile_no,
+            candidate.apaar_id,
+            candidate.primary_viva_marks,
+            candidate.primary_practical_marks,
+            candidate.secondary_viva_marks,
+            candidate.secondary_practical_marks,
+            candidate.training_center,
+            candidate.exam_center,
+            _created_at(candidate),
+        ]
+
+
+def evaluation_rows(queryset) -> Iterator[list]:
+    """Rows for the "Evaluation Results" sheet (EVALUATION_HEADERS)."""
+    for candidate in _iter_candidates(queryset, "trade"):
+        primary_total = (candidate.primary_practical_marks or 0) + (candidate.primary_viva_marks or 0)
+        secondary_total = (candidate.secondary_practical_marks or 0) + (candidate.secondary_viva_marks or 0)
+        yield [
+            candidate.army_no,
+            candidate.name,
+            candidate.rank,
+            candidate.trade.name if candidate.trade else "",
+            candidate.mobile_no,
+            candidate.apaar_id,
+            candidate.exam_center,
+            candidate.training_center,
+            candidate.primary_practical_marks,
+            candidate.primary_viva_marks,
+            candidate.secondary_practical_marks,
+            candidate.secondary_viva_marks,
+            primary_total,
+            secondary_total,
+            _created_at(candidate),
+        ]
+
+
+# ============================================================
+# Streaming XLSX writer
+# ============================================================
+class ExportSheet(NamedTuple):
+    title: str
+    headers: Sequence[str]
+    rows: Iterable[Sequence]
+    # Width applied to every column, None keeps openpyxl's default
+    column_width: Optional[float] = None
+
+
+def write_xlsx(sheets: Iterable[ExportSheet], fileobj: Optional[IO[bytes]] = None) -> IO[bytes]:
+    """
+    Write ``sheets`` into an .xlsx and return the file, rewound.
+
+    Rows are consumed one at a time and flushed to disk as each row is
+    finished (xlsxwriter constant_memory), so ``rows`` can be a generator over
+    a queryset. Without ``fileobj`` the workbook goes to a temporary file that
+    spills to disk past EXPORT_SPOOL_BYTES.
+    """
+    if fileobj is None:
+        fileobj = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+
+    wb = xlsxwriter.Workbook(fileobj, {
+        "constant_memory": True,
+        "default_date_format": "yyyy-mm-dd",
+        "remove_timezone": True,
+        # Exported text is data: "=..." stays a string
+        "strings_to_formulas": False,
+    })
+    for sheet in sheets:
+        ws = wb.add_worksheet(sheet.title)
+        if sheet.column_width is not None:
+            ws.set_column(0, len(sheet.headers) - 1, sheet.column_width)
+        ws.write_row(0, 0, sheet.headers)
+        for row_num, row in enumerate(sheet.rows, 1):
+            ws.write_row(row_num, 0, row)
+
+    wb.close()
+    fileobj.seek(0)
+    return fileobj
+
+
+# ============================================================
+# Streaming ZIP (candidate photos)
+# ============================================================
+# Already compressed: deflating them again costs CPU and saves nothing
+STORED_EXTENSIONS = frozenset({".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".zip", ".gz", ".xlsx"})
+
+ZIP_COPY_CHUNK = 256 * 1024
+
+
+class _ZipStream:
+    """Write-only, unseekable sink for ZipFile; drain() hands over what was written."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def photo_entries(queryset) -> Iterator[Tuple[str, str]]:
+    """(file path, archive name) of every candidate photograph in ``queryset``."""
+    # Admin actions pass the changelist queryset, which select_related()s trade: drop it before only()
+    for candidate in queryset.select_related(None).only("army_no", "name", "photograph").iterator(chunk_size=2000):
+        if candidate.photograph:
+            try:
+                file_path = candidate.photograph.path
+            except Exception:
+                continue
+            ext = file_path[file_path.rfind("."):] if "." in file_path else ""
+            yield file_path, f"{candidate.army_no}_{candidate.name}{ext}"
+
+
+def iter_zip(entries: Iterable[Tuple[str, str]]) -> Iterator[bytes]:
+    """
+    ZIP archive of ``entries`` ((path, arcname) pairs) as a stream of bytes.
+
+    Each file is copied in ZIP_COPY_CHUNK pieces and yielded as it goes, so
+    neither the archive nor a whole file is held in memory. Files that can't
+    be opened are skipped.
+    """
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as archive:
+        for path, arcname in entries:
+            try:
+                src = open(path, "rb")
+            except OSError:
+                continue
+            with src:
+                info = zipfile.ZipInfo.from_file(path, arcname)
+                ext = os.path.splitext(path)[1].lower()
+                info.compress_type = zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+                with archive.open(info, "w") as dest:
+                    while True:
+                        chunk = src.read(ZIP_COPY_CHUNK)
+                        if not chunk:
+                            break
+                        dest.write(chunk)
+                        data = stream.drain()
+                        if data:
+                            yield data
+            data = stream.drain()
+            if data:
+                yield data
+    # Central directory, written on close
+    yield stream.drain()
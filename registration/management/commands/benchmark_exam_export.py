@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+"""
+Management command to benchmark the "Export All Exam Data" row builder.
+
+Seeds synthetic candidates with a finished, mostly answered paper,
+then counts the queries and time of registration.exports.iter_exam_export_rows
+at growing candidate counts. The query count must stay the same at every
+size up to EXPORT_BATCH_SIZE; the previous per-candidate loop is run on the
+smaller sizes for comparison and must produce identical rows. Everything
+runs inside a transaction that is rolled back.
+
+Usage:
+    python manage.py benchmark_exam_export
+    python manage.py benchmark_exam_export --candidates 2000 --questions 60
+    python manage.py benchmark_exam_export --legacy-limit 0
+"""
+
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from questions.models import ExamQuestion, ExamSession, Question, QuestionPaper
+from reference.models import Trade
+from registration.exports import candidate_columns, iter_exam_export_rows
+from registration.models import CandidateProfile
+from results.models import CandidateAnswer
+
+BENCH_PREFIX = "XBENCH"
+
+
+class Command(BaseCommand):
+    help = 'Benchmark exam-data export query count and time against candidate count'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--candidates', type=int, default=500, help='Largest candidate count (default: 500)')
+        parser.add_argument('--questions', type=int, default=50, help='Questions per paper (default: 50)')
+        parser.add_argument(
+            '--legacy-limit',
+            type=int,
+            default=100,
+            help='Run the per-candidate loop up to this many candidates (default: 100, 0 = skip)',
+        )
+
+    def handle(self, *args, **options):
+        total = options['candidates']
+        if total < 1:
+            raise CommandError('--candidates must be at least 1')
+
+        question_ids = list(Question.objects.order_by('id').values_list('id', flat=True)[:options['questions']])
+        if not question_ids:
+            raise CommandError('No questions found - upload a question file first')
+        trade = Trade.objects.first()
+        if not trade:
+            raise CommandError('No trades found')
+
+        self.stdout.write(self.style.SUCCESS('📤 EXAM DATA EXPORT BENCHMARK'))
+        self.stdout.write('=' * 60)
+
+        with transaction.atomic():
+            candidate_ids = self._seed(total, trade, question_ids)
+            self.stdout.write(f'Seeded {total} candidates x {len(question_ids)} questions')
+            self.stdout.write(f"{'candidates':>10} {'rows':>8} {'queries':>8} {'ms':>9} {'legacy q':>9} {'legacy ms':>10}")
+
+            sizes = sorted({s for s in (1, 10, 100, total) if s <= total})
+            query_counts = set()
+            for size in sizes:
+                queryset = CandidateProfile.objects.filter(id__in=candidate_ids[:size]).order_by('id')
+
+                rows, queries, ms = self._measure(lambda: list(iter_exam_export_rows(queryset)))
+                query_counts.add(queries)
+
+                legacy = ''
+                if size <= options['legacy_limit']:
+                    legacy_rows, legacy_queries, legacy_ms = self._measure(lambda: self._legacy_rows(queryset))
+                    if legacy_rows != rows:
+                        raise CommandError(f'Rows differ from the per-candidate export at {size} candidates')
+                    legacy = f'{legacy_queries:>9} {legacy_ms:>10.0f}'
+
+                self.stdout.write(f'{size:>10} {len(rows):>8} {queries:>8} {ms:>9.0f} {legacy}')
+
+            transaction.set_rollback(True)
+
+        if len(query_counts) > 1 and total <= self._batch_size():
+            raise CommandError(f'Query count varies with candidate count: {sorted(query_counts)}')
+        self.stdout.write(self.style.SUCCESS('✅ Query count is independent of candidate count (benchmark data rolled back)'))
+
+    @staticmethod
+    def _batch_size():
+        return getattr(settings, 'EXPORT_BATCH_SIZE', 1000)
+
+    @staticmethod
+    def _measure(fn):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            result = fn()
+            elapsed = (time.perf_counter() - started) * 1000
+        return result, len(ctx.captured_queries), elapsed
+
+    def _seed(self, total, trade, question_ids):
+        User = get_user_model()
+        paper, _ = QuestionPaper.objects.get_or_create(question_paper='PRIMARY')
+        now = timezone.now()
+
+        User.objects.bulk_create([
+            User(username=f'{BENCH_PREFIX.lower()}_{i}') for i in range(total)
+        ])
+        # bulk_create only returns primary keys on some backends
+        users = list(User.objects.filter(username__startswith=f'{BENCH_PREFIX.lower()}_').order_by('id'))
+
+        CandidateProfile.objects.bulk_create([
+            CandidateProfile(
+                user=user,
+                army_no=f'{BENCH_PREFIX}{i:06d}',
+                rank='Sepoy',
+                trade=trade,
+                name=f'Bench Candidate {i}',
+                dob='01-01-2000',
+                doe=now.date(),
+                aadhar_number=f'{100000000000 + i}',
+                mobile_no=f'{9000000000 + i}',
+                father_name='Bench Father',
+                state='State',
+                district='District',
+                exam_center='Bench Center',
+            )
+            for i, user in enumerate(users)
+        ])
+        candidates = list(
+            CandidateProfile.objects.filter(army_no__startswith=BENCH_PREFIX).order_by('id').values_list('id', 'user_id')
+        )
+
+        ExamSession.objects.bulk_create([
+            ExamSession(
+                paper=paper, user_id=user_id, trade=trade, exam_type='PRIMARY',
+                started_at=now, completed_at=now, total_questions=len(question_ids),
+            )
+            for _, user_id in candidates
+        ])
+        sessions = dict(
+            ExamSession.objects.filter(user_id__in=[u for _, u in candidates]).values_list('user_id', 'id')
+        )
+
+        ExamQuestion.objects.bulk_create([
+            ExamQuestion(session_id=sessions[user_id], question_id=question_id, order=order)
+            for _, user_id in candidates
+            for order, question_id in enumerate(question_ids, start=1)
+        ], batch_size=5000)
+        # Leave every fifth question unanswered so the "N/A" path is covered
+        CandidateAnswer.objects.bulk_create([
+            CandidateAnswer(candidate_id=candidate_id, paper=paper, question_id=question_id, exam_type='PRIMARY', answer='A')
+            for candidate_id, _ in candidates
+            for order, question_id in enumerate(question_ids)
+            if order % 5
+        ], batch_size=5000)
+
+        return [candidate_id for candidate_id, _ in candidates]
+
+    @staticmethod
+    def _legacy_rows(queryset):
+        """The previous per-candidate export loop (sessions path), for comparison."""
+        rows = []
+        serial = 1
+        for candidate in queryset:
+            sessions = (
+                ExamSession.objects
+                .filter(user=candidate.user)
+                .select_related("paper")
+                .prefetch_related("examquestion_set__question")
+                .order_by("-started_at")
+            )
+            if not sessions.exists():
+                continue
+            for session in sessions:
+                paper = session.paper
+                for eq in session.questions:
+                    q = eq.question
+                    ans = CandidateAnswer.objects.filter(
+                        candidate=candidate,
+                        paper=paper,
+                        question=q,
+                        exam_type=session.exam_type,
+                    ).first()
+                    rows.append([serial] + candidate_columns(candidate) + [
+                        paper.question_paper,
+                        q.part,
+                        q.text,
+                        ans.answer if ans and ans.answer is not None else "N/A",
+                        getattr(q, "correct_answer", None),
+                        q.marks if hasattr(q, "marks") else None,
+                    ])
+                    serial += 1
+        return rows
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+Management command to load-test exam submission: N candidates submitting
+within the same second (the timer expiring for a whole shift).
+
+Each candidate gets a fresh paper, every worker thread waits on a barrier and
+then submits its full answer sheet through results.services.submit_exam.
+Benchmark sessions, answers and slot state are restored afterwards - run it
+against a staging database all the same.
+"""
+
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from questions.models import ExamSession, QuestionPaper, TradePaperActivation
+from registration.models import CandidateProfile
+from results.models import CandidateAnswer
+from results.services import submit_exam
+
+SLOT_FIELDS = [
+    "has_exam_slot", "slot_attempting_at",
+    "is_primary_completed", "primary_slot_consumed_at",
+    "is_secondary_completed", "secondary_slot_consumed_at",
+]
+
+
+class Command(BaseCommand):
+    help = 'Load-test batched exam submission with N simultaneous submits (default: 200)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--candidates',
+            type=int,
+            default=200,
+            help='Number of candidates submitting at once (default: 200)'
+        )
+        parser.add_argument(
+            '--paper-type',
+            type=str,
+            default='PRIMARY',
+            choices=['PRIMARY', 'SECONDARY'],
+            help='Question paper to submit (default: PRIMARY)'
+        )
+
+    def handle(self, *args, **options):
+        paper_type = options['paper_type']
+        paper = QuestionPaper.objects.filter(question_paper=paper_type).first()
+        if not paper:
+            raise CommandError(f"No {paper_type} QuestionPaper found")
+
+        activations = {
+            a.trade_id: a
+            for a in TradePaperActivation.objects.filter(paper_type=paper_type)
+        }
+        candidates = list(
+            CandidateProfile.objects.filter(trade_id__in=list(activations))
+            .select_related('user', 'trade')[:options['candidates']]
+        )
+        if not candidates:
+            raise CommandError(f"No candidates with a {paper_type} trade activation found")
+
+        self.stdout.write(self.style.SUCCESS("⏱️ EXAM SUBMISSION LOAD TEST"))
+        self.stdout.write("=" * 60)
+
+        snapshot = {
+            c.pk: {field: getattr(c, field) for field in SLOT_FIELDS}
+            for c in candidates
+        }
+        existing_answers = set(
+            CandidateAnswer.objects.filter(candidate__in=candidates, exam_type=paper_type)
+            .values_list('id', flat=True)
+        )
+
+        session_ids = []
+        try:
+            jobs = []
+            for candidate in candidates:
+                session = paper.generate_for_candidate(user=candidate.user, trade=candidate.trade)
+                session_ids.append(session.id)
+                answers = {
+                    f"question_{qid}": "A"
+                    for qid in session.examquestion_set.values_list('question_id', flat=True)
+                }
+                # Slot held for the duration of the test
+                candidate.has_exam_slot = True
+                jobs.append((candidate, paper, session, paper_type, answers, activations[candidate.trade_id]))
+            CandidateProfile.objects.bulk_update(candidates, ['has_exam_slot'])
+
+            barrier = threading.Barrier(len(jobs))
+            wall_start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+                results = list(pool.map(lambda job: self._submit_one(barrier, job), jobs))
+            wall = time.perf_counter() - wall_start
+        finally:
+            ExamSession.objects.filter(id__in=session_ids).delete()
+            CandidateAnswer.objects.filter(candidate__in=candidates, exam_type=paper_type).exclude(
+                id__in=existing_answers
+            ).delete()
+            for candidate in candidates:
+                for field, value in snapshot[candidate.pk].items():
+                    setattr(candidate, field, value)
+            CandidateProfile.objects.bulk_update(candidates, SLOT_FIELDS)
+
+        latencies = sorted(ms for ms, error in results if error is None)
+        errors = [error for _, error in results if error is not None]
+        if not latencies:
+            raise CommandError(f"All {len(errors)} submissions failed: {errors[0]}")
+
+        def pct(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+        self.stdout.write(f"Candidates: {len(jobs)} | Answers per submit: {statistics.mean(len(j[4]) for j in jobs):.0f}")
+        self.stdout.write(f"{'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10} {'wall s':>10}")
+        self.stdout.write(
+            f"{statistics.median(latencies):>10.1f} {pct(0.95):>10.1f} {pct(0.99):>10.1f} "
+            f"{latencies[-1]:>10.1f} {wall:>10.2f}"
+        )
+        if errors:
+            self.stdout.write(self.style.ERROR(f"❌ {len(errors)} submissions failed, first error: {errors[0]}"))
+
+        self.stdout.write(self.style.SUCCESS("✓ Load test complete (benchmark data removed)"))
+
+    @staticmethod
+    def _submit_one(barrier, job):
+        candidate, paper, session, paper_type, answers, activation = job
+        try:
+            barrier.wait()
+            start = time.perf_counter()
+            submit_exam(candidate, paper, session, paper_type, answers, activation=activation)
+            return (time.perf_counter() - start) * 1000, None
+        except Exception as e:
+            return 0.0, e
+        finally:
+            # Each worker thread owns its own DB connection
+            connection.close()
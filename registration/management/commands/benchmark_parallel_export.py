@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+Management command to benchmark the partitioned (parallel) exam-data export.
+
+Seeds synthetic candidates spread over the existing trades, then times the
+single-workbook export against registration.parallel_export at each worker
+count and checks that every run exports the same number of rows. Pool
+workers are separate processes and only see committed data, so the seed is
+committed and deleted again at the end (also on failure or Ctrl+C).
+
+Usage:
+    python manage.py benchmark_parallel_export
+    python manage.py benchmark_parallel_export --candidates 5000 --workers 1,2,4,8
+    python manage.py benchmark_parallel_export --partition-by shift --part-size 500
+"""
+
+import os
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import CommandError
+
+from questions.models import Question
+from reference.models import Trade
+from registration.exports import EXPORT_HEADERS, RESULTS_SHEET, ExportSheet, iter_exam_export_rows, write_xlsx
+from registration.management.commands.benchmark_exam_export import BENCH_PREFIX
+from registration.management.commands.benchmark_exam_export import Command as ExamExportBenchmark
+from registration.models import CandidateProfile
+from registration.parallel_export import PARTITIONS, export_parts, iter_partitioned_export
+
+
+class Command(ExamExportBenchmark):
+    help = 'Benchmark the partitioned exam-data export across worker counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--candidates', type=int, default=2000, help='Candidates to seed (default: 2000)')
+        parser.add_argument('--questions', type=int, default=50, help='Questions per paper (default: 50)')
+        parser.add_argument('--workers', default='1,2,4,8', help='Comma-separated worker counts (default: 1,2,4,8)')
+        parser.add_argument('--partition-by', choices=sorted(PARTITIONS), default='trade', help='Partition (default: trade)')
+        parser.add_argument('--part-size', type=int, help='Candidates per part (default: EXPORT_PART_CANDIDATES)')
+
+    def handle(self, *args, **options):
+        total = options['candidates']
+        if total < 1:
+            raise CommandError('--candidates must be at least 1')
+        try:
+            worker_counts = [int(w) for w in options['workers'].split(',')]
+        except ValueError:
+            raise CommandError('--workers must be comma-separated integers')
+
+        question_ids = list(Question.objects.order_by('id').values_list('id', flat=True)[:options['questions']])
+        if not question_ids:
+            raise CommandError('No questions found - upload a question file first')
+        trades = list(Trade.objects.order_by('id'))
+        if not trades:
+            raise CommandError('No trades found')
+
+        self.stdout.write(self.style.SUCCESS('⚡ PARALLEL EXAM DATA EXPORT BENCHMARK'))
+        self.stdout.write('=' * 60)
+
+        try:
+            candidate_ids = self._seed(total, trades[0], question_ids)
+            # Spread the candidates over the trades so there is more than one partition
+            for index, trade in enumerate(trades):
+                CandidateProfile.objects.filter(id__in=candidate_ids[index::len(trades)]).update(trade=trade)
+            queryset = CandidateProfile.objects.filter(id__in=candidate_ids)
+
+            parts = export_parts(queryset, options['partition_by'], options['part_size'])
+            self.stdout.write(
+                f'Seeded {total} candidates x {len(question_ids)} questions, '
+                f'{len(parts)} parts by {options["partition_by"]}, {os.cpu_count()} CPU cores'
+            )
+            self.stdout.write(f"{'workers':>8} {'rows':>9} {'wall s':>8} {'speedup':>8}")
+
+            started = time.perf_counter()
+            rows = 0
+            with tempfile.TemporaryFile() as out:
+                def counted(iterable):
+                    nonlocal rows
+                    for row in iterable:
+                        rows += 1
+                        yield row
+
+                write_xlsx([ExportSheet(RESULTS_SHEET, EXPORT_HEADERS, counted(iter_exam_export_rows(queryset.order_by('id'))))], fileobj=out)
+            serial = time.perf_counter() - started
+            self.stdout.write(f"{'single':>8} {rows:>9} {serial:>8.2f} {'1.00x':>8}")
+
+            for workers in worker_counts:
+                part_rows = []
+                started = time.perf_counter()
+                with tempfile.TemporaryFile() as out:
+                    for chunk in iter_partitioned_export(
+                        queryset,
+                        options['partition_by'],
+                        workers=workers,
+                        part_size=options['part_size'],
+                        on_part=lambda name, count: part_rows.append(count),
+                    ):
+                        out.write(chunk)
+                elapsed = time.perf_counter() - started
+                if sum(part_rows) != rows:
+                    raise CommandError(f'{workers} workers exported {sum(part_rows)} rows, expected {rows}')
+                self.stdout.write(f'{workers:>8} {sum(part_rows):>9} {elapsed:>8.2f} {serial / elapsed:>7.2f}x')
+        finally:
+            get_user_model().objects.filter(username__startswith=f'{BENCH_PREFIX.lower()}_').delete()
+
+        self.stdout.write(self.style.SUCCESS('✅ Every worker count exported the same rows (benchmark data deleted)'))
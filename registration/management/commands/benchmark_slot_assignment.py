@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+Management command to benchmark bulk exam slot assignment.
+
+Seeds synthetic candidates spread over the existing trades with a mix of
+completion flags, PRIMARY bypasses and existing slots, then:
+
+- assigns slots to a sample with the per-candidate assign_exam_slot loop
+  and with registration.slots.assign_slots, and checks both pick the same
+  candidates;
+- times assign_slots and counts its queries on every seeded candidate.
+
+Everything runs inside a transaction that is rolled back.
+
+Usage:
+    python manage.py benchmark_slot_assignment
+    python manage.py benchmark_slot_assignment --candidates 20000 --legacy-limit 1000
+"""
+
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from reference.models import Trade
+from registration.models import CandidateProfile
+from registration.slots import assign_slots
+
+BENCH_PREFIX = "XSLOT"
+
+
+class Command(BaseCommand):
+    help = 'Benchmark set-based slot assignment against the per-candidate loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--candidates', type=int, default=5000, help='Candidates to seed (default: 5000)')
+        parser.add_argument(
+            '--legacy-limit',
+            type=int,
+            default=500,
+            help='Sample size for the per-candidate comparison (default: 500, 0 = skip)',
+        )
+
+    def handle(self, *args, **options):
+        total = options['candidates']
+        if total < 1:
+            raise CommandError('--candidates must be at least 1')
+        trades = list(Trade.objects.order_by('id'))
+        if not trades:
+            raise CommandError('No trades found')
+
+        self.stdout.write(self.style.SUCCESS('🎫 BULK SLOT ASSIGNMENT BENCHMARK'))
+        self.stdout.write('=' * 60)
+
+        with transaction.atomic():
+            candidate_ids = self._seed(total, trades)
+            self.stdout.write(f'Seeded {total} candidates over {len(trades)} trades')
+            admin_user = get_user_model().objects.filter(is_superuser=True).first()
+
+            sample = min(options['legacy_limit'], total)
+            if sample:
+                queryset = CandidateProfile.objects.filter(id__in=candidate_ids[:sample])
+
+                sid = transaction.savepoint()
+                started = time.perf_counter()
+                with CaptureQueriesContext(connection) as ctx:
+                    legacy_count = 0
+                    for candidate in queryset:
+                        try:
+                            candidate.assign_exam_slot(assigned_by_user=admin_user)
+                            legacy_count += 1
+                        except ValidationError:
+                            continue
+                legacy_s = time.perf_counter() - started
+                legacy_ids = set(queryset.filter(has_exam_slot=True).values_list('id', flat=True))
+                transaction.savepoint_rollback(sid)
+
+                bulk_count = sum(assign_slots(queryset, assigned_by=admin_user).values())
+                bulk_ids = set(queryset.filter(has_exam_slot=True).values_list('id', flat=True))
+                if bulk_ids != legacy_ids or bulk_count != legacy_count:
+                    raise CommandError(
+                        f'Bulk assignment differs from assign_exam_slot: {bulk_count} vs {legacy_count} slots, '
+                        f'{len(bulk_ids ^ legacy_ids)} candidates differ'
+                    )
+                self.stdout.write(
+                    f'Per-candidate loop: {sample} candidates, {legacy_count} slots, '
+                    f'{len(ctx.captured_queries)} queries, {legacy_s * 1000:.0f} ms (same candidates as bulk ✅)'
+                )
+                transaction.savepoint_rollback(sid)
+
+            queryset = CandidateProfile.objects.filter(id__in=candidate_ids)
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as ctx:
+                assigned = assign_slots(queryset, assigned_by=admin_user)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'assign_slots:       {total} candidates, {sum(assigned.values())} slots, '
+                f'{len(ctx.captured_queries)} queries, {elapsed * 1000:.0f} ms'
+            )
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark data rolled back'))
+
+    def _seed(self, total, trades):
+        User = get_user_model()
+        now = timezone.now()
+        User.objects.bulk_create([User(username=f'{BENCH_PREFIX.lower()}_{i}') for i in range(total)], batch_size=2000)
+        users = list(User.objects.filter(username__startswith=f'{BENCH_PREFIX.lower()}_').order_by('id'))
+
+        # Every fifth candidate in each state: fresh, PRIMARY done, bypassed, both done, already holding a slot
+        CandidateProfile.objects.bulk_create([
+            CandidateProfile(
+                user=user,
+                army_no=f'{BENCH_PREFIX}{i:06d}',
+                rank='Sepoy',
+                trade=trades[i % len(trades)],
+                name=f'Slot Candidate {i}',
+                dob='01-01-2000',
+                doe=now.date(),
+                aadhar_number=f'{200000000000 + i}',
+                mobile_no=f'{8000000000 + i}',
+                father_name='Bench Father',
+                state='State',
+                district='District',
+                exam_center='Bench Center',
+                is_primary_completed=i % 5 in (1, 3),
+                primary_bypass_allowed=i % 5 == 2,
+                is_secondary_completed=i % 5 == 3,
+                has_exam_slot=i % 5 == 4,
+            )
+            for i, user in enumerate(users)
+        ], batch_size=2000)
+        return list(
+            CandidateProfile.objects.filter(army_no__startswith=BENCH_PREFIX).order_by('id').values_list('id', flat=True)
+        )
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+Management command to benchmark the streaming XLSX export writer.
+
+Writes a synthetic exam-data sheet (default 100,000 rows, the "Export All
+Exam Data" columns) once with the previous in-memory openpyxl.Workbook and
+per-cell ws.cell() writes, and once with registration.exports.write_xlsx.
+Each run happens in a fresh process so its peak RSS is its own.
+
+Usage:
+    python manage.py benchmark_xlsx_export
+    python manage.py benchmark_xlsx_export --rows 200000
+    python manage.py benchmark_xlsx_export --mode streaming
+"""
+
+import multiprocessing
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+
+from registration.exports import EXPORT_HEADERS, ExportSheet, write_xlsx
+
+MODES = ("in-memory", "streaming")
+
+
+def _synthetic_rows(count):
+    for i in range(count):
+        yield [
+            i + 1, f"Candidate {i // 50}", "Center", "", "Father", "01-01-2000", "Sepoy", "OCC",
+            f"ARMY{i // 50:06d}", "123456789012", "9876543210", "", "10th", "2 Years", "20",
+            "12th", "2 Years", "30", "NSQF-4", "Training Center", "District", "State",
+            10, 12, 30, 28, f"ARMY{i // 50:06d}", "PRIMARY",
+            "A", f"Question text number {i % 500} with a realistic length for an exam item?",
+            "B", "B", Decimal("1.00"),
+        ]
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run(mode, rows):
+    """Write one export in this (fresh) process: (seconds, peak RSS MB, RSS MB before writing, file bytes)."""
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+
+    if mode == "in-memory":
+        import openpyxl
+
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = "Results"
+        for col_num, title in enumerate(EXPORT_HEADERS, 1):
+            ws.cell(row=1, column=col_num).value = title
+        for row_num, row in enumerate(_synthetic_rows(rows), 2):
+            for col_num, value in enumerate(row, 1):
+                ws.cell(row=row_num, column=col_num, value=value)
+        stream = BytesIO()
+        wb.save(stream)
+        size = stream.tell()
+    else:
+        with write_xlsx([ExportSheet("Results", EXPORT_HEADERS, _synthetic_rows(rows))]) as xlsx_file:
+            xlsx_file.seek(0, 2)
+            size = xlsx_file.tell()
+
+    elapsed = time.perf_counter() - started
+    return elapsed, _peak_rss_mb(), baseline, size
+
+
+class Command(BaseCommand):
+    help = 'Benchmark peak RSS and wall time of the streaming XLSX writer against the in-memory Workbook'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Rows to write (default: 100000)')
+        parser.add_argument('--mode', choices=MODES, help='Run a single mode (default: both)')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        modes = [options['mode']] if options['mode'] else list(MODES)
+
+        self.stdout.write(self.style.SUCCESS('📊 XLSX EXPORT WRITER BENCHMARK'))
+        self.stdout.write('=' * 60)
+        self.stdout.write(f'Rows: {rows:,} x {len(EXPORT_HEADERS)} columns')
+        self.stdout.write(f"{'mode':<12} {'wall s':>8} {'peak RSS MB':>12} {'growth MB':>10} {'file MB':>9}")
+
+        results = {}
+        for mode in modes:
+            # One spawned process per mode: ru_maxrss never goes down within a process
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                elapsed, peak, baseline, size = executor.submit(_run, mode, rows).result()
+            results[mode] = (elapsed, peak - baseline)
+            self.stdout.write(
+                f'{mode:<12} {elapsed:>8.2f} {peak:>12.1f} {peak - baseline:>10.1f} {size / (1024 * 1024):>9.1f}'
+            )
+
+        if len(results) == len(MODES):
+            (old_s, old_mb), (new_s, new_mb) = results["in-memory"], results["streaming"]
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'✅ Streaming: {old_s / new_s:.1f}x faster, '
+                    f'{old_mb - new_mb:,.0f} MB less peak memory growth'
+                )
+            )
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""
+Management command to check the candidate admin changelist against a fixed
+query budget.
+
+Renders /admin/registration/candidateprofile/ for each admin role (each
+role has its own columns) with one row per page and with a full page, and
+fails if a page issues more queries than the budget or if the count grows
+with the number of rows. The export actions each role can see are then run
+on the selected rows, with the changelist queryset Django hands to actions,
+and must answer HTTP 200. Runs inside a transaction that is rolled back, so
+the temporary admin users are not kept.
+
+Usage:
+    python manage.py check_admin_query_budget
+    python manage.py check_admin_query_budget --rows 200 --budget 15
+    python manage.py check_admin_query_budget --verbose-sql
+"""
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from registration.management.commands.check_exam_query_budget import Command as ExamQueryBudget
+from registration.models import CandidateProfile
+
+ROLES = ("PO_ADMIN", "CENTER_ADMIN", "OIC_ADMIN")
+# Changelist actions that need nothing beyond the selected rows
+EXPORT_ACTIONS = ("export_candidate_images", "export_candidates_excel", "export_marks_excel")
+
+
+class Command(BaseCommand):
+    help = 'Fail if the candidate admin changelist query count exceeds its budget or grows with the page size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Rows on the full page (default: 100)')
+        parser.add_argument('--budget', type=int, default=15, help='Queries allowed per page (default: 15)')
+        parser.add_argument('--verbose-sql', action='store_true', help='Print the captured queries')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🔍 Candidate Changelist Query Budget Check'))
+        self.stdout.write('=' * 50)
+
+        total = CandidateProfile.objects.count()
+        if not total:
+            raise CommandError('No candidates found')
+        rows = min(options['rows'], total)
+        self.stdout.write(f'Candidates: {total}, full page: {rows} rows')
+
+        model_admin = admin.site._registry[CandidateProfile]
+        url = reverse('admin:registration_candidateprofile_changelist')
+        client = Client(HTTP_HOST=ExamQueryBudget._host())
+        per_page = model_admin.list_per_page
+        failures = []
+
+        try:
+            # Counters re-read on a timer would make the counts depend on timing
+            with override_settings(CACHE_GENERATION_CHECK_SECONDS=3600), transaction.atomic():
+                for role in ROLES:
+                    user = get_user_model().objects.create(
+                        username=f'query_budget_{role.lower()}', role=role, is_staff=True, is_superuser=True
+                    )
+                    client.force_login(user)
+                    # Warm-up: activation snapshot, content types
+                    client.get(url)
+
+                    counts = {}
+                    for page_size in (1, rows):
+                        model_admin.list_per_page = page_size
+                        with CaptureQueriesContext(connection) as ctx:
+                            response = client.get(url)
+                        if response.status_code != 200:
+                            raise CommandError(f'{role}: expected HTTP 200, got {response.status_code}')
+                        counts[page_size] = ctx.captured_queries
+
+                    single, full = len(counts[1]), len(counts[rows])
+                    ok = full <= options['budget'] and full == single
+                    line = f'  {role:<13} 1 row: {single:>3} queries, {rows} rows: {full:>3} queries (budget {options["budget"]})'
+                    self.stdout.write(self.style.SUCCESS(f'✅{line}') if ok else self.style.ERROR(f'❌{line}'))
+                    if options['verbose_sql'] or not ok:
+                        for query in counts[rows]:
+                            self.stdout.write(f'      {query["sql"][:160]}')
+                    if not ok:
+                        failures.append(role)
+
+                    failures.extend(self._check_actions(client, model_admin, url, user, role, rows))
+
+                transaction.set_rollback(True)
+        finally:
+            model_admin.list_per_page = per_page
+
+        if failures:
+            raise CommandError(f'Changelist checks failed for: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('✅ Changelist query count is independent of page size (changes rolled back)'))
+
+    def _check_actions(self, client, model_admin, url, user, role, rows):
+        """Run the role's export actions on the first ``rows`` candidates; returns the failed ones."""
+        request = RequestFactory().get(url)
+        request.user = user
+        available = [name for name in EXPORT_ACTIONS if name in model_admin.get_actions(request)]
+        selected = list(CandidateProfile.objects.order_by('-id').values_list('id', flat=True)[:rows])
+
+        failures = []
+        for name in available:
+            response = client.post(url, {'action': name, '_selected_action': selected, 'index': 0})
+            # Streamed exports fail while they are being read, not when the response is built
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+            if response.status_code == 200:
+                self.stdout.write(self.style.SUCCESS(f'✅  {role:<13} action {name}: {len(body)} bytes'))
+            else:
+                self.stdout.write(self.style.ERROR(f'❌  {role:<13} action {name}: HTTP {response.status_code}'))
+                failures.append(f'{role} {name}')
+        return failures
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+Management command to check the exam entry path against a fixed query budget.
+
+Runs the candidate flow through the real view stack - first open (paper
+generation), resume, and submit - and fails if any step issues more queries
+than its budget. Everything runs inside a transaction that is rolled back,
+so the candidate and exam data are left untouched.
+
+Usage:
+    python manage.py check_exam_query_budget
+    python manage.py check_exam_query_budget --army-no "12345678"
+    python manage.py check_exam_query_budget --entry-budget 25 --resume-budget 10
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from questions.models import ExamSession
+from registration.models import CandidateProfile
+
+
+class Command(BaseCommand):
+    help = 'Fail if the exam entry / resume / submit path exceeds its query budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--army-no',
+            type=str,
+            help='Candidate to run the flow as (default: first candidate with an active exam)',
+        )
+        parser.add_argument('--entry-budget', type=int, default=20, help='First open incl. paper generation (default: 20)')
+        parser.add_argument('--resume-budget', type=int, default=8, help='Reload of an open paper (default: 8)')
+        parser.add_argument('--submit-budget', type=int, default=16, help='Final submit (default: 16)')
+        parser.add_argument('--verbose-sql', action='store_true', help='Print the captured queries')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🔍 Exam Entry Query Budget Check'))
+        self.stdout.write('=' * 50)
+
+        candidate = self._pick_candidate(options.get('army_no'))
+        self.stdout.write(f'Candidate: {candidate.army_no} ({candidate.trade})')
+
+        url = reverse('exam_interface')
+        client = Client(HTTP_HOST=self._host())
+        results = []
+
+        # Counters re-read on a timer would make the counts depend on timing
+        with override_settings(CACHE_GENERATION_CHECK_SECONDS=3600), transaction.atomic():
+            # Clean starting point for the flow; rolled back below
+            ExamSession.objects.filter(user=candidate.user, completed_at__isnull=True).delete()
+            CandidateProfile.objects.filter(pk=candidate.pk).update(has_exam_slot=True, slot_attempting_at=None)
+            client.force_login(candidate.user)
+
+            response, queries = self._measure(client.get, url)
+            self._expect(response, 200, 'entry')
+            results.append(('entry', queries, options['entry_budget']))
+
+            response, queries = self._measure(client.get, url)
+            self._expect(response, 200, 'resume')
+            results.append(('resume', queries, options['resume_budget']))
+
+            session = ExamSession.objects.filter(user=candidate.user, completed_at__isnull=True).first()
+            answers = {
+                f'question_{qid}': 'A'
+                for qid in session.examquestion_set.values_list('question_id', flat=True)
+            }
+            response, queries = self._measure(client.post, url, answers)
+            self._expect(response, 302, 'submit')
+            results.append(('submit', queries, options['submit_budget']))
+
+            transaction.set_rollback(True)
+
+        failures = []
+        for step, queries, budget in results:
+            ok = len(queries) <= budget
+            line = f'  {step:<8} {len(queries):>4} queries (budget {budget})'
+            self.stdout.write(self.style.SUCCESS(f'✅{line}') if ok else self.style.ERROR(f'❌{line}'))
+            if options['verbose_sql'] or not ok:
+                for query in queries:
+                    self.stdout.write(f'      {query["sql"][:160]}')
+            if not ok:
+                failures.append(step)
+
+        if failures:
+            raise CommandError(f'Query budget exceeded for: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('✅ Exam entry path is within budget (changes rolled back)'))
+
+    def _pick_candidate(self, army_no):
+        candidates = CandidateProfile.objects.filter(trade__isnull=False).select_related('user', 'trade')
+        if army_no:
+            candidate = candidates.filter(army_no=army_no).first()
+            if not candidate:
+                raise CommandError(f'Candidate "{army_no}" not found')
+            return candidate
+
+        for candidate in candidates.order_by('id'):
+            state = candidate.exam_state()
+            completed = candidate.is_primary_completed if state.exam_type == 'PRIMARY' else candidate.is_secondary_completed
+            if state.activation and state.paper and not completed:
+                return candidate
+        raise CommandError('No candidate with an active, unfinished exam found')
+
+    @staticmethod
+    def _host():
+        for host in settings.ALLOWED_HOSTS:
+            if host and host != '*':
+                return host.lstrip('.')
+        return 'localhost'
+
+    @staticmethod
+    def _measure(method, *args):
+        with CaptureQueriesContext(connection) as ctx:
+            response = method(*args)
+        return response, ctx.captured_queries
+
+    @staticmethod
+    def _expect(response, status, step):
+        if response.status_code != status:
+            raise CommandError(
+                f'{step}: expected HTTP {status}, got {response.status_code} '
+                f'({response.get("Location", "")})'
+            )
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+"""
+Management command to rebuild a full exam-data export from a base export
+and the delta exports taken after it.
+
+Every candidate's answers for one exam type (Army_No, Exam_Type) travel
+together: a delta's Results sheet replaces that group in the base, and its
+Candidates sheet refreshes the candidate columns (marks included) of every
+row of that candidate. Deltas are applied oldest first (by their "Until"),
+and a gap between one delta's "Until" and the next one's "Since" is
+reported. Base rows keep their order; groups that are new or replaced come
+after them, and S.No is renumbered.
+
+The base is streamed; only the deltas are held in memory. A base built
+with EXPORT_PARTITION_BY (a ZIP of part workbooks) is read part by part,
+in archive order.
+
+Usage:
+    python manage.py merge_exam_exports base.dat delta1.dat delta2.dat -o merged.dat
+    python manage.py merge_exam_exports base.xlsx delta1.dat -o merged.xlsx --password secret
+    python manage.py merge_exam_exports base.dat delta1.dat -o merged.dat --format-version 2
+"""
+
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import datetime
+
+import openpyxl
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from questions.dat_format import DAT_VERSION_V1, DAT_VERSION_V2, encrypt_dat, iter_decrypt, iter_encrypt, iter_file_chunks
+from registration.exports import (
+    DELTA_CANDIDATES_SHEET,
+    DELTA_INFO_SHEET,
+    EXPORT_HEADERS,
+    RESULTS_SHEET,
+    ExportSheet,
+    write_xlsx,
+)
+
+# Positions in an export row without its S.No
+CANDIDATE_COLUMNS = slice(0, 26)
+ARMY_NO = 7
+EXAM_TYPE = 26
+
+
+def _group_key(row):
+    return (row[ARMY_NO], row[EXAM_TYPE])
+
+
+class Command(BaseCommand):
+    help = 'Merge a base exam-data export with delta exports into a full export'
+
+    def add_arguments(self, parser):
+        parser.add_argument('base', help='Full export (.dat or .xlsx)')
+        parser.add_argument('deltas', nargs='+', help='Delta exports (.dat or .xlsx)')
+        parser.add_argument('-o', '--output', required=True, help='Merged export (.dat or .xlsx)')
+        parser.add_argument('--password', help='Passphrase (default: CONVERTER_PASSPHRASE setting)')
+        parser.add_argument(
+            '--format-version',
+            type=int,
+            choices=[DAT_VERSION_V1, DAT_VERSION_V2],
+            dest='dat_version',
+            help='Container version of a .dat output (default: DAT_EXPORT_VERSION setting)',
+        )
+
+    def handle(self, *args, **options):
+        for path in [options['base'], *options['deltas']]:
+            if not os.path.isfile(path):
+                raise CommandError(f'File not found: {path}')
+        self.password = options['password'] or getattr(settings, 'CONVERTER_PASSPHRASE', '')
+
+        self.stdout.write('=' * 60)
+        self.stdout.write('🔀 MERGE EXAM DATA EXPORTS')
+        self.stdout.write('=' * 60)
+
+        deltas = sorted((self._read_delta(path) for path in options['deltas']), key=lambda d: d['until'])
+        groups, candidates = self._apply_deltas(deltas)
+
+        output = options['output']
+        try:
+            with self._open_workbook(options['base']) as base_file:
+                counts = {'base': 0, 'replaced': 0}
+                rows = self._merged_rows(self._base_rows(base_file), groups, candidates, counts)
+                with write_xlsx([ExportSheet(RESULTS_SHEET, EXPORT_HEADERS, rows)]) as xlsx_file:
+                    written = self._write_output(xlsx_file, output, options['dat_version'])
+        except ValidationError as e:
+            raise CommandError('; '.join(e.messages))
+
+        self.stdout.write(f"Base rows kept:      {counts['base']:,}")
+        self.stdout.write(f"Base rows replaced:  {counts['replaced']:,}")
+        self.stdout.write(f"Delta rows added:    {sum(len(g) for g in groups.values()):,}")
+        self.stdout.write(f"Candidates updated:  {len(candidates):,}")
+        self.stdout.write(self.style.SUCCESS(f'✅ Wrote {output} ({written:,} bytes)'))
+
+    # ------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------
+    def _open_workbook(self, path):
+        """Workbook file object for ``path``: .xlsx as is, .dat decrypted to a temporary file."""
+        if path.lower().endswith('.xlsx'):
+            return open(path, 'rb')
+        if not self.password:
+            raise CommandError('No password given and CONVERTER_PASSPHRASE is not set')
+        plain = tempfile.TemporaryFile()
+        try:
+            with open(path, 'rb') as f:
+                for chunk in iter_decrypt(f, self.password):
+                    plain.write(chunk)
+        except ValidationError as e:
+            plain.close()
+            raise CommandError(f'{path}: ' + '; '.join(e.messages))
+        plain.seek(0)
+        return plain
+
+    @staticmethod
+    def _workbook_rows(f):
+        workbook = openpyxl.load_workbook(f, read_only=True)
+        try:
+            sheet = workbook[RESULTS_SHEET] if RESULTS_SHEET in workbook.sheetnames else workbook.worksheets[0]
+            yield from sheet.iter_rows(min_row=2, values_only=True)
+        finally:
+            workbook.close()
+
+    def _base_rows(self, base_file):
+        """Result rows of the base: one workbook, or every part workbook of a partitioned export."""
+        try:
+            with zipfile.ZipFile(base_file) as archive:
+                names = archive.namelist()
+                # An .xlsx is a ZIP too: a partitioned export holds .xlsx members instead
+                parts = [] if '[Content_Types].xml' in names else [n for n in names if n.lower().endswith('.xlsx')]
+                if parts:
+                    self.stdout.write(f'📦 Partitioned base: {len(parts)} part workbooks')
+                for name in parts:
+                    with archive.open(name) as member, tempfile.TemporaryFile() as part:
+                        shutil.copyfileobj(member, part)
+                        part.seek(0)
+                        yield from self._workbook_rows(part)
+        except zipfile.BadZipFile:
+            parts = []
+        if not parts:
+            base_file.seek(0)
+            yield from self._workbook_rows(base_file)
+
+    def _read_delta(self, path):
+        with self._open_workbook(path) as f:
+            workbook = openpyxl.load_workbook(f, read_only=True)
+            if DELTA_INFO_SHEET not in workbook.sheetnames:
+                raise CommandError(f'{path} is not a delta export (no "{DELTA_INFO_SHEET}" sheet)')
+            info = {key: value for key, value in workbook[DELTA_INFO_SHEET].iter_rows(min_row=2, values_only=True)}
+            delta = {
+                'path': path,
+                'since': datetime.fromisoformat(info['Since']) if info.get('Since') else None,
+                'until': datetime.fromisoformat(info['Until']),
+                'results': [list(row[1:]) for row in workbook[RESULTS_SHEET].iter_rows(min_row=2, values_only=True)],
+                'candidates': [list(row) for row in workbook[DELTA_CANDIDATES_SHEET].iter_rows(min_row=2, values_only=True)],
+            }
+            workbook.close()
+        return delta
+
+    def _apply_deltas(self, deltas):
+        """Result groups and candidate columns of the deltas, later deltas winning."""
+        groups = {}
+        candidates = {}
+        previous_until = None
+        for delta in deltas:
+            since, until = delta['since'], delta['until']
+            if previous_until is not None and since is not None and since > previous_until:
+                self.stdout.write(self.style.WARNING(
+                    f'⚠️ Gap: {delta["path"]} starts at {since}, previous delta ends at '
+                    f'{previous_until} - changes in between are missing'
+                ))
+            previous_until = until
+
+            replaced = {}
+            for row in delta['results']:
+                replaced.setdefault(_group_key(row), []).append(row)
+            groups.update(replaced)
+            for columns in delta['candidates']:
+                candidates[columns[ARMY_NO]] = columns
+
+            self.stdout.write(
+                f'📄 {delta["path"]}: {since or "start"} → {until}, '
+                f'{len(delta["results"]):,} rows, {len(delta["candidates"]):,} candidates'
+            )
+        return groups, candidates
+
+    # ------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------
+    @staticmethod
+    def _merged_rows(base_rows, groups, candidates, counts):
+        def patched(row):
+            columns = candidates.get(row[ARMY_NO])
+            if columns is not None:
+                row[CANDIDATE_COLUMNS] = columns
+            return row
+
+        serial = 1
+        for values in base_rows:
+            row = list(values[1:])
+            if _group_key(row) in groups:
+                counts['replaced'] += 1
+                continue
+            counts['base'] += 1
+            yield [serial] + patched(row)
+            serial += 1
+
+        for rows in groups.values():
+            for row in rows:
+                yield [serial] + patched(row)
+                serial += 1
+
+    def _write_output(self, xlsx_file, output, version):
+        if version is None:
+            version = getattr(settings, 'DAT_EXPORT_VERSION', DAT_VERSION_V1)
+        if output.lower().endswith('.xlsx'):
+            chunks = iter_file_chunks(xlsx_file)
+        elif not self.password:
+            raise CommandError('No password given and CONVERTER_PASSPHRASE is not set')
+        elif version == DAT_VERSION_V2:
+            chunks = iter_encrypt(iter_file_chunks(xlsx_file), self.password)
+        else:
+            chunks = [encrypt_dat(xlsx_file.read(), self.password, version=DAT_VERSION_V1)]
+
+        written = 0
+        with open(output, 'wb') as out:
+            for chunk in chunks:
+                out.write(chunk)
+                written += len(chunk)
+        return written
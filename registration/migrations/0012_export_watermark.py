@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('centers', '0001_initial'),
+        ('registration', '0011_export_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidateprofile',
+            name='marks_updated_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='exportjob',
+            name='kind',
+            field=models.CharField(choices=[('EXAM_DATA', 'Exam Data (.dat)'), ('EXAM_DATA_DELTA', 'Exam Data Delta (.dat)'), ('PHOTOS', 'Photos (.zip)'), ('MARKS', 'Viva-Prac Marks (.xlsx)'), ('EVALUATION', 'Evaluation Results (.dat)')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='ExportWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('exported_until', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('center', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='export_watermark', to='centers.center')),
+            ],
+            options={
+                'verbose_name': 'Export Watermark',
+                'verbose_name_plural': 'Export Watermarks',
+            },
+        ),
+    ]
@@ -5,7 +5,7 @@ from django.utils import timezone
 from datetime import datetime
 from exams.models import Shift
 from django.core.validators import RegexValidator
-from questions.models import TradePaperActivation
+from questions.exam_state import resolve_exam_state
 from django.core.exceptions import ValidationError
 
 class CandidateProfile(models.Model):
@@ -91,6 +91,8 @@ class CandidateProfile(models.Model):
     primary_practical_marks = models.IntegerField(null=True, blank=True)
     secondary_viva_marks = models.IntegerField(null=True, blank=True)
     secondary_practical_marks = models.IntegerField(null=True, blank=True)
+    # Set whenever a viva/practical mark changes; delta exports pick these candidates up
+    marks_updated_at = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
     shift = models.ForeignKey(Shift, on_delete=models.PROTECT, null=True, blank=True)
     
     # Exam slot management
@@ -138,15 +140,17 @@ class CandidateProfile(models.Model):
         "HAIR DRESSER",
         "MUSICIAN",
     }
+    # Why reset_exam_slot refuses a candidate, by the paper type of their next exam
+    RESET_BLOCKED_MESSAGES = {
+        "PRIMARY": "Primary exam already submitted. Reset not allowed.",
+        "SECONDARY": "Secondary exam already submitted. Reset not allowed.",
+    }
 
     
-    def _normalized_trade(self):
+    @staticmethod
+    def normalize_trade_name(name):
         """Normalize trade name for consistent comparison"""
-        if not self.trade:
-            return ""
-        
-        # Use the Trade name (or code if you prefer)
-        trade = self.trade.name.strip().upper()
+        trade = name.strip().upper()
         
         # Handle variations
         if "WASHERMAN" in trade:
@@ -165,6 +169,19 @@ class CandidateProfile(models.Model):
             # For exact matches like TTC, OCC, DMV, etc.
             return trade
 
+    def _normalized_trade(self):
+        """Normalize trade name for consistent comparison"""
+        if not self.trade:
+            return ""
+        
+        # Use the Trade name (or code if you prefer)
+        return self.normalize_trade_name(self.trade.name)
+
+    @classmethod
+    def trade_has_primary_exam(cls, trade):
+        """Returns False for trades that do not have a PRIMARY exam."""
+        return cls.normalize_trade_name(trade.name) not in cls.TRADES_WITHOUT_PRIMARY
+
     def has_primary_exam(self):
         """
         Returns False for trades that do not have a PRIMARY exam.
@@ -279,6 +296,19 @@ class CandidateProfile(models.Model):
             self.is_secondary_completed = False
 
     
+    def exam_state(self, refresh=False):
+        """
+        Activation / paper / duration for the next exam, resolved once and
+        reused by every exam method on this instance (read from the
+        activation snapshot, see questions.exam_state).
+        """
+        exam_type = self.get_next_exam_type()
+        state = getattr(self, "_exam_state", None)
+        if refresh or state is None or state.key != (self.trade_id, exam_type):
+            state = resolve_exam_state(self.trade_id, exam_type)
+            self._exam_state = state
+        return state
+
     @property
     def can_start_exam(self):
         if not self.has_exam_slot:
@@ -287,15 +317,7 @@ class CandidateProfile(models.Model):
         if not self.trade:
             return False
 
-        exam_type = self.get_next_exam_type()
-
-
-        activation = TradePaperActivation.objects.filter(
-            trade=self.trade,
-            paper_type=exam_type,
-            is_active=True
-        ).first()
-
+        activation = self.exam_state().activation
 
         if not activation:
             return False
@@ -321,15 +343,7 @@ class CandidateProfile(models.Model):
     
     def start_exam_attempt(self):
         # ❌ Prevent any attempt if already submitted
-        exam_type = self.get_next_exam_type()
-
-
-        activation = TradePaperActivation.objects.filter(
-            trade=self.trade,
-            paper_type=exam_type,
-            is_active=True
-        ).first()
-
+        activation = self.exam_state().activation
 
         if activation:
             if activation.paper_type == "PRIMARY" and self.is_primary_completed:
@@ -337,18 +351,6 @@ class CandidateProfile(models.Model):
             if activation.paper_type == "SECONDARY" and self.is_secondary_completed:
                 raise ValidationError("Secondary exam already completed.")
 
-    
-
-        exam_type = self.get_next_exam_type()
-
-
-        activation = TradePaperActivation.objects.filter(
-            trade=self.trade,
-            paper_type=exam_type,
-            is_active=True
-        ).first()
-
-
         if activation and activation.paper_type == "SECONDARY":
             if (
                 self.has_primary_exam()
@@ -368,19 +370,16 @@ class CandidateProfile(models.Model):
         return False
 
     
-    def consume_exam_slot(self):
+    def consume_exam_slot(self, activation=None):
+        """
+        Mark the current exam as completed and release the slot.
+        ``activation`` may be passed by callers that already resolved it.
+        """
         if not self.has_exam_slot:
             return False
 
-        exam_type = self.get_next_exam_type()
-
-
-        activation = TradePaperActivation.objects.filter(
-            trade=self.trade,
-            paper_type=exam_type,
-            is_active=True
-        ).first()
-
+        if activation is None:
+            activation = self.exam_state().activation
 
         if not activation:
             return False
@@ -397,7 +396,11 @@ class CandidateProfile(models.Model):
 
         self.has_exam_slot = False
         self.slot_attempting_at = None
-        self.save()
+        self.save(update_fields=[
+            "is_primary_completed", "primary_slot_consumed_at",
+            "is_secondary_completed", "secondary_slot_consumed_at",
+            "has_exam_slot", "slot_attempting_at",
+        ])
         return True
 
 
@@ -407,15 +410,7 @@ class CandidateProfile(models.Model):
         if self.has_exam_slot:
             raise ValidationError("Candidate already has an active exam slot.")
 
-        exam_type = self.get_next_exam_type()
-
-
-        activation = TradePaperActivation.objects.filter(
-            trade=self.trade,
-            paper_type=exam_type,
-            is_active=True
-        ).first()
-
+        activation = self.exam_state().activation
 
         if not activation:
             raise ValidationError("No active exam available for this trade.")
@@ -450,28 +445,17 @@ class CandidateProfile(models.Model):
 
     
     def reset_exam_slot(self):
-        exam_type = self.get_next_exam_type()
-
-
-        activation = TradePaperActivation.objects.filter(
-            trade=self.trade,
-            paper_type=exam_type,
-            is_active=True
-        ).first()
-
+        activation = self.exam_state().activation
 
         if activation:
             if activation.paper_type == "PRIMARY" and self.primary_slot_consumed_at:
-                raise ValidationError("Primary exam already submitted. Reset not allowed.")
+                raise ValidationError(self.RESET_BLOCKED_MESSAGES["PRIMARY"])
 
             if activation.paper_type == "SECONDARY" and self.secondary_slot_consumed_at:
-                raise ValidationError("Secondary exam already submitted. Reset not allowed.")
+                raise ValidationError(self.RESET_BLOCKED_MESSAGES["SECONDARY"])
 
-        from questions.models import ExamSession
-        ExamSession.objects.filter(
-            user=self.user,
-            completed_at__isnull=True
-        ).delete()
+        from .slots import delete_incomplete_sessions
+        delete_incomplete_sessions([self.user_id])
 
         self.has_exam_slot = False
         self.slot_assigned_at = None
@@ -500,5 +484,124 @@ class CandidateProfile(models.Model):
         return "Available"
 
 
+    MARKS_FIELDS = (
+        "primary_viva_marks",
+        "primary_practical_marks",
+        "secondary_viva_marks",
+        "secondary_practical_marks",
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_marks = instance._marks_snapshot()
+        return instance
+
+    def _marks_snapshot(self):
+        # __dict__ only: reading a deferred field here would cost a query
+        return {f: self.__dict__[f] for f in self.MARKS_FIELDS if f in self.__dict__}
+
+    def save(self, *args, **kwargs):
+        current = self._marks_snapshot()
+        if self._state.adding:
+            changed = any(value is not None for value in current.values())
+        else:
+            loaded = getattr(self, "_loaded_marks", {})
+            changed = any(value != loaded[f] for f, value in current.items() if f in loaded)
+        if changed:
+            self.marks_updated_at = timezone.now()
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None and set(update_fields) & set(self.MARKS_FIELDS):
+                kwargs["update_fields"] = {*update_fields, "marks_updated_at"}
+        super().save(*args, **kwargs)
+        self._loaded_marks = current
+
+    def __str__(self):
+        return f"{self.army_no} - {self.name}"
+
+
+class ExportWatermark(models.Model):
+    """
+    Point up to which a center's exam data has been exported. Delta
+    exports cover sessions completed and marks changed after it.
+    """
+    center = models.OneToOneField(
+        "centers.Center", on_delete=models.CASCADE, null=True, blank=True, related_name="export_watermark"
+    )
+    exported_until = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Export Watermark"
+        verbose_name_plural = "Export Watermarks"
+
+    def __str__(self):
+        return f"{self.center or 'No center'} exported until {self.exported_until:%Y-%m-%d %H:%M}"
+
+
+class ExportJob(models.Model):
+    """
+    One admin export ("Export All ...") built in the background.
+
+    active_key is "<kind>:<params_key>" while the job is pending or running and
+    NULL afterwards; its unique index makes a repeated request attach to the
+    running job instead of starting a second build.
+    """
+    KIND_EXAM_DATA = "EXAM_DATA"
+    KIND_EXAM_DATA_DELTA = "EXAM_DATA_DELTA"
+    KIND_PHOTOS = "PHOTOS"
+    KIND_MARKS = "MARKS"
+    KIND_EVALUATION = "EVALUATION"
+    KIND_CHOICES = [
+        (KIND_EXAM_DATA, "Exam Data (.dat)"),
+        (KIND_EXAM_DATA_DELTA, "Exam Data Delta (.dat)"),
+        (KIND_PHOTOS, "Photos (.zip)"),
+        (KIND_MARKS, "Viva-Prac Marks (.xlsx)"),
+        (KIND_EVALUATION, "Evaluation Results (.dat)"),
+    ]
+
+    STATUS_PENDING = "PENDING"
+    STATUS_RUNNING = "RUNNING"
+    STATUS_DONE = "DONE"
+    STATUS_FAILED = "FAILED"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+    ACTIVE_STATUSES = (STATUS_PENDING, STATUS_RUNNING)
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+    # sha256 of the canonical params: identical requests share a key
+    params_key = models.CharField(max_length=64, blank=True, default="")
+    active_key = models.CharField(max_length=100, unique=True, null=True, blank=True, editable=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+
+    rows_processed = models.PositiveIntegerField(default=0)
+    bytes_written = models.PositiveBigIntegerField(default=0)
+    artifact = models.FileField(upload_to="exports/", blank=True)
+    filename = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="export_jobs"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Bumped with every progress write; a stale active job was lost with its worker
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "Export Job"
+        verbose_name_plural = "Export Jobs"
+
     def __str__(self):
-        return f"{self.army_no} - {self.name}"
\ No newline at end of file
+        return f"{self.get_kind_display()} #{self.pk} ({self.status})"
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
@@ -0,0 +1,120 @@
+# registration/parallel_export.py
+"""
+Partitioned exam-data export.
+
+The single "Results" workbook is written by one process, one row at a
+time, so a large export uses one core however many the center server has.
+Here candidates are split by trade (or shift) into parts of at most
+EXPORT_PART_CANDIDATES; each part is written as its own workbook, in the
+usual Results layout, by a process pool, and the parts are zipped in
+partition order as they finish. Each part file is a complete export for
+its candidates (S.No restarts at 1).
+"""
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+from .exports import EXPORT_HEADERS, RESULTS_SHEET, ExportSheet, iter_exam_export_rows, iter_zip, write_xlsx
+
+# partition -> (CandidateProfile fields, label from their values)
+PARTITIONS = {
+    "trade": (("trade__name",), lambda name: name or "No Trade"),
+    "shift": (
+        ("shift__date", "shift__start_time"),
+        lambda date, start: f"{date:%Y-%m-%d}_{start:%H%M}" if date else "No Shift",
+    ),
+}
+
+
+def export_parts(queryset, partition_by: str = "trade", part_size: Optional[int] = None) -> List[Tuple[str, List[int]]]:
+    """(part name, candidate ids) for ``queryset``, one query; partitions above ``part_size`` are split."""
+    fields, label = PARTITIONS[partition_by]
+    if part_size is None:
+        part_size = getattr(settings, "EXPORT_PART_CANDIDATES", 2000)
+    part_size = max(1, part_size)
+
+    partitions = {}
+    for candidate_id, *values in queryset.order_by(*fields, "id").values_list("id", *fields):
+        partitions.setdefault(label(*values), []).append(candidate_id)
+
+    parts = []
+    used = set()
+    for name, ids in partitions.items():
+        safe_name = "".join(c if c.isalnum() else "_" for c in name)
+        while safe_name in used:
+            safe_name += "_"
+        used.add(safe_name)
+        chunks = [ids[i:i + part_size] for i in range(0, len(ids), part_size)]
+        for number, chunk in enumerate(chunks, 1):
+            parts.append((safe_name if len(chunks) == 1 else f"{safe_name}_{number}", chunk))
+    return parts
+
+
+def _build_part(name: str, candidate_ids: List[int], directory: str) -> Tuple[str, str, int]:
+    """Write one part workbook (runs inside a worker process): (path, archive name, rows)."""
+    from .models import CandidateProfile
+
+    rows = 0
+
+    def counted(iterable):
+        nonlocal rows
+        for row in iterable:
+            rows += 1
+            yield row
+
+    path = os.path.join(directory, f"{name}.xlsx")
+    queryset = CandidateProfile.objects.filter(id__in=candidate_ids).order_by("id")
+    with open(path, "wb") as out:
+        write_xlsx([ExportSheet(RESULTS_SHEET, EXPORT_HEADERS, counted(iter_exam_export_rows(queryset)))], fileobj=out)
+    return path, f"{name}.xlsx", rows
+
+
+def iter_partitioned_export(
+    queryset,
+    partition_by: str = "trade",
+    workers: Optional[int] = None,
+    part_size: Optional[int] = None,
+    on_part: Optional[Callable[[str, int], None]] = None,
+) -> Iterator[bytes]:
+    """
+    ZIP of one exam-data workbook per part of ``queryset``, as a stream of
+    bytes. Parts are built by ``workers`` processes (default
+    EXPORT_PARALLEL_WORKERS, 0 = one per core); ``on_part(name, rows)`` is
+    called as each part is added to the archive.
+    """
+    from questions.paper_pool import _init_worker
+
+    parts = export_parts(queryset, partition_by, part_size)
+    if workers is None:
+        workers = getattr(settings, "EXPORT_PARALLEL_WORKERS", 0)
+    workers = min(workers or os.cpu_count() or 1, max(1, len(parts)))
+
+    with tempfile.TemporaryDirectory(prefix="export_parts_") as directory:
+        names = [name for name, _ in parts]
+        id_lists = [ids for _, ids in parts]
+        directories = [directory] * len(parts)
+
+        def entries(built):
+            for path, arcname, rows in built:
+                if on_part is not None:
+                    on_part(arcname, rows)
+                yield path, arcname
+                # Zipped by the time the next entry is asked for
+                os.remove(path)
+
+        if workers <= 1:
+            yield from iter_zip(entries(map(_build_part, names, id_lists, directories)))
+            return
+
+        # spawn: forked children would share the parent's DB socket
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        ) as executor:
+            # map() returns parts in order, so zipping overlaps with the parts still building
+            yield from iter_zip(entries(executor.map(_build_part, names, id_lists, directories)))
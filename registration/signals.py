@@ -0,0 +1,13 @@
+# registration/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import slot_stats
+from .models import CandidateProfile
+
+
+@receiver(post_save, sender=CandidateProfile, dispatch_uid="registration_slot_stats_candidate_save")
+@receiver(post_delete, sender=CandidateProfile, dispatch_uid="registration_slot_stats_candidate_delete")
+def invalidate_slot_stats(sender, **kwargs):
+    """Candidates or their slots changed: drop the cached slot dashboard figures after commit (registration.slot_stats)."""
+    slot_stats.invalidate_on_commit()
@@ -0,0 +1,93 @@
+# registration/slot_stats.py
+"""
+Exam slot dashboard statistics.
+
+The bulk slot management page used to run five global counts plus six
+counts per trade on every refresh. Here every figure comes from one
+grouped query over CandidateProfile, with conditional counts per trade,
+and the result is kept in Django's cache for SLOT_STATS_CACHE_SECONDS so
+proctors refreshing the page during a shift share it.
+
+That cache is per process (no CACHES backend is configured), so the key
+carries a DB generation counter (questions/generations.py). Any candidate
+save or delete (see registration/signals.py), and any bulk slot UPDATE,
+bumps it once the transaction commits; every gunicorn worker stops serving
+its copy within CACHE_GENERATION_CHECK_SECONDS.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from questions.generations import Generation
+
+logger = logging.getLogger(__name__)
+
+SLOT_STATS_KEY = "registration:slot_stats"
+
+_generation = Generation("slot_stats")
+
+COUNTS = {
+    "total": Count("id"),
+    "with_slots": Count("id", filter=Q(has_exam_slot=True)),
+    "consumed_primary": Count("id", filter=Q(primary_slot_consumed_at__isnull=False)),
+    "consumed_secondary": Count("id", filter=Q(secondary_slot_consumed_at__isnull=False)),
+}
+
+
+def _build_stats() -> dict:
+    from reference.models import Trade
+
+    from .models import CandidateProfile
+
+    by_trade = {row.pop("trade"): row for row in CandidateProfile.objects.values("trade").order_by().annotate(**COUNTS)}
+
+    totals = {name: sum(row[name] for row in by_trade.values()) for name in COUNTS}
+    trade_stats = []
+    for trade in Trade.objects.all().order_by("name"):
+        row = by_trade.get(trade.id, dict.fromkeys(COUNTS, 0))
+        trade_stats.append({
+            "trade": trade,
+            "total": row["total"],
+            "with_slots": row["with_slots"],
+            "without_slots": row["total"] - row["with_slots"],
+            "consumed_primary": row["consumed_primary"],
+            "consumed_secondary": row["consumed_secondary"],
+            "available": row["with_slots"],
+        })
+
+    return {
+        "trade_stats": trade_stats,
+        "total_candidates": totals["total"],
+        "candidates_with_slots": totals["with_slots"],
+        "candidates_without_slots": totals["total"] - totals["with_slots"],
+        "available_slots": totals["with_slots"],
+        "consumed_primary": totals["consumed_primary"],
+        "consumed_secondary": totals["consumed_secondary"],
+    }
+
+
+def slot_stats() -> dict:
+    """Dashboard figures: overall totals and ``trade_stats`` (one row per trade, by name)."""
+    timeout = getattr(settings, "SLOT_STATS_CACHE_SECONDS", 5)
+    if timeout <= 0:
+        return _build_stats()
+    key = f"{SLOT_STATS_KEY}:{_generation.current()}"
+    stats = cache.get(key)
+    if stats is None:
+        stats = _build_stats()
+        cache.set(key, stats, timeout)
+    return stats
+
+
+def invalidate() -> None:
+    """Drop the cached figures: in this process now, in the others once they re-read the DB counter."""
+    _generation.bump()
+    logger.debug("Slot statistics invalidated")
+
+
+def invalidate_on_commit() -> None:
+    """Drop the cached figures once the surrounding transaction commits (.update() sends no post_save)."""
+    transaction.on_commit(invalidate)
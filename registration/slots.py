@@ -0,0 +1,189 @@
+# registration/slots.py
+"""
+Set-based exam slot assignment and reset.
+
+CandidateProfile.assign_exam_slot and reset_exam_slot check one candidate
+and save the whole row. The bulk admin actions used to call them in a
+loop, two or three queries per candidate. Here the same rules (next exam
+type, completion flags, PRIMARY bypass, active TradePaperActivation,
+consumed slots) become queryset filters per trade and paper type, read
+against the activation snapshot, and each group is updated with a single
+UPDATE.
+"""
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Tuple
+
+from django.db import transaction
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from questions.activation_snapshot import get_snapshot
+
+from . import slot_stats
+from .models import CandidateProfile
+
+# Session ids per pair of DELETE statements
+DELETE_BATCH_SIZE = 1000
+
+
+class SlotReset(NamedTuple):
+    candidate_ids: List[int]
+    # (army_no, reason) of candidates reset_exam_slot would refuse
+    blocked: List[Tuple[str, str]]
+
+
+def _next_exam_groups(trade) -> List[Tuple[str, Q]]:
+    """(paper type, filter) for the candidates of ``trade`` whose next exam is that type (get_next_exam_type)."""
+    if not CandidateProfile.trade_has_primary_exam(trade):
+        return [("SECONDARY", Q())]
+    return [
+        # Next exam is PRIMARY until it is completed or bypassed
+        ("PRIMARY", Q(is_primary_completed=False, primary_bypass_allowed=False)),
+        ("SECONDARY", Q(is_primary_completed=True) | Q(primary_bypass_allowed=True)),
+    ]
+
+
+def _trades(queryset):
+    from reference.models import Trade
+
+    return Trade.objects.filter(id__in=queryset.values("trade_id")).order_by("name")
+
+
+def slot_eligible_groups(queryset) -> Iterator[Tuple[object, str, object]]:
+    """
+    (trade, paper type, candidates) for the candidates in ``queryset`` that
+    assign_exam_slot would accept: no slot yet, and an active paper for
+    their next exam type that they have not completed. Trades by name.
+    """
+    snapshot = get_snapshot()
+    for trade in _trades(queryset):
+        candidates = queryset.filter(trade=trade, has_exam_slot=False)
+        for paper_type, next_exam in _next_exam_groups(trade):
+            if snapshot.activation(trade.id, paper_type) is None:
+                continue
+            if paper_type == "SECONDARY":
+                next_exam &= Q(is_secondary_completed=False)
+            yield trade, paper_type, candidates.filter(next_exam)
+
+
+def assign_slots(queryset, assigned_by=None) -> Dict[object, int]:
+    """
+    Give every eligible candidate in ``queryset`` an exam slot, one UPDATE
+    per trade and paper type. Returns slots assigned per trade, by trade
+    name (trades with no eligible candidate are left out).
+    """
+    now = timezone.now()
+    assigned: Dict[object, int] = {}
+    with transaction.atomic():
+        for trade, _, candidates in slot_eligible_groups(queryset):
+            count = candidates.update(
+                has_exam_slot=True,
+                slot_assigned_at=now,
+                slot_attempting_at=None,
+                slot_assigned_by=assigned_by,
+            )
+            if count:
+                assigned[trade] = assigned.get(trade, 0) + count
+        if assigned:
+            slot_stats.invalidate_on_commit()  # .update() sends no post_save
+    return assigned
+
+
+def delete_incomplete_sessions(user_ids: Iterable[int]) -> Counter:
+    """
+    Delete the unfinished exam sessions of ``user_ids``, their ExamQuestion
+    rows and the answers autosaved during them: raw DELETEs per batch of
+    sessions, ExamQuestion first, instead of the collector walking the
+    cascade. ``user_ids`` may be a ``values("user_id")`` queryset, used as a
+    subquery. Returns sessions deleted per user id.
+    """
+    from questions.models import ExamQuestion, ExamSession
+    from results.models import CandidateAnswer
+
+    # Raw deletes send no signals and skip cascades: ExamQuestion is the only
+    # model pointing at ExamSession and none of the three has delete receivers.
+    if not isinstance(user_ids, QuerySet):
+        user_ids = list(user_ids)
+    deleted = Counter()
+    with transaction.atomic():
+        # Locked so a session finished meanwhile is not deleted
+        sessions = list(
+            ExamSession.objects.select_for_update()
+            .filter(user_id__in=user_ids, completed_at__isnull=True)
+            .values_list("id", "user_id", "paper_id", "exam_type", "started_at")
+        )
+        candidate_ids = dict(
+            CandidateProfile.objects.filter(user_id__in={user_id for _, user_id, *_ in sessions})
+            .values_list("user_id", "id")
+        ) if sessions else {}
+        for start in range(0, len(sessions), DELETE_BATCH_SIZE):
+            batch = sessions[start:start + DELETE_BATCH_SIZE]
+            session_ids = [session_id for session_id, *_ in batch]
+            # Autosaved answers of the attempt; rows of an earlier, submitted
+            # attempt at the same paper predate started_at and are kept
+            autosaved = Q()
+            for _, user_id, paper_id, exam_type, started_at in batch:
+                if started_at is not None and user_id in candidate_ids:
+                    autosaved |= Q(
+                        candidate_id=candidate_ids[user_id],
+                        paper_id=paper_id,
+                        exam_type=exam_type,
+                        submitted_at__gte=started_at,
+                    )
+            if autosaved:
+                CandidateAnswer.objects.filter(autosaved)._raw_delete(CandidateAnswer.objects.db)
+            ExamQuestion.objects.filter(session_id__in=session_ids)._raw_delete(ExamQuestion.objects.db)
+            ExamSession.objects.filter(id__in=session_ids)._raw_delete(ExamSession.objects.db)
+        deleted.update(user_id for _, user_id, *_ in sessions)
+    return deleted
+
+
+def clear_incomplete_exam_sessions(queryset) -> Counter:
+    """Delete the unfinished exam sessions of the candidates in ``queryset``; returns how many per user id."""
+    return delete_incomplete_sessions(queryset.values_list("user_id", flat=True))
+
+
+def reset_blocked(queryset) -> List[Tuple[int, str, str]]:
+    """
+    (id, army_no, reason) of the candidates in ``queryset`` that
+    reset_exam_slot refuses: their next exam is active and its slot has
+    already been consumed.
+    """
+    snapshot = get_snapshot()
+    blocked = []
+    for trade in _trades(queryset):
+        for paper_type, next_exam in _next_exam_groups(trade):
+            if snapshot.activation(trade.id, paper_type) is None:
+                continue
+            consumed = queryset.filter(next_exam, trade=trade, **{f"{paper_type.lower()}_slot_consumed_at__isnull": False})
+            reason = CandidateProfile.RESET_BLOCKED_MESSAGES[paper_type]
+            blocked.extend((pk, army_no, reason) for pk, army_no in consumed.values_list("id", "army_no"))
+    return blocked
+
+
+def reset_slots(queryset) -> SlotReset:
+    """
+    reset_exam_slot for every candidate in ``queryset`` it would accept:
+    their incomplete sessions are deleted and the slot fields cleared with
+    one UPDATE. Refused candidates are returned, not raised.
+    """
+    with transaction.atomic():
+        blocked = reset_blocked(queryset)
+        blocked_ids = {pk for pk, _, _ in blocked}
+        candidates = [
+            (pk, user_id)
+            for pk, user_id in queryset.values_list("id", "user_id")
+            if pk not in blocked_ids
+        ]
+        candidate_ids = [pk for pk, _ in candidates]
+
+        delete_incomplete_sessions(user_id for _, user_id in candidates)
+        if candidate_ids:
+            CandidateProfile.objects.filter(id__in=candidate_ids).update(
+                has_exam_slot=False,
+                slot_assigned_at=None,
+                slot_attempting_at=None,
+                slot_assigned_by=None,
+            )
+            slot_stats.invalidate_on_commit()  # .update() sends no post_save
+    return SlotReset(candidate_ids, [(army_no, reason) for _, army_no, reason in blocked])
@@ -4,17 +4,20 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth import logout
 from django.core.exceptions import ValidationError
 from django.views.decorators.cache import never_cache
-from django.db.models import Count
+from django.db.models import Count, F
 from .models import CandidateProfile
 from reference.models import Trade
 from .forms import CandidateRegistrationForm
 from django.contrib import messages
-from django.db import transaction
-from questions.models import QuestionPaper, Question, ExamSession
+from questions.models import Question, ExamSession
 from results.models import CandidateAnswer
+from results.services import autosave_answers, saved_answers, submit_exam
 from django.db.models import Q
 # other imports you already had
-from django.http import FileResponse, Http404
+from django.http import FileResponse, Http404, JsonResponse
+from django.views.decorators.http import require_POST
+import json
+import secrets
 import os, tempfile
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
@@ -22,7 +25,8 @@ from reportlab.lib.units import inch
 from reportlab.lib.pdfencrypt import StandardEncryption
 from django.conf import settings
 from django.utils import timezone
-from questions.models import TradePaperActivation
+from questions.activation_snapshot import get_snapshot as get_activation_snapshot
+from questions.pool_cache import rendered_questions
 from django.contrib.auth.views import LoginView
 from django.urls import reverse
 
@@ -34,10 +38,11 @@ class CandidateLoginView(LoginView):
 
         unified_enabled = bool(getattr(settings, "EXAM_UNIFIED_DAT_ENABLED", False))
 
+        snapshot = get_activation_snapshot()
         if unified_enabled:
-            any_exam_active = TradePaperActivation.objects.filter(is_active=True).exists()
+            any_exam_active = snapshot.any_trade_active
         else:
-            any_exam_active = QuestionPaper.objects.filter(is_active=True).exists()
+            any_exam_active = snapshot.any_paper_active
 
         # Check for specific no-slot or slot-consumed messages
         no_slot_msg = self.request.GET.get("no_slot")
@@ -81,14 +86,14 @@ def register_candidate(request):
 
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, render, redirect
-from questions.models import QuestionPaper, Question
+from questions.models import Question
 from results.models import CandidateAnswer
 from registration.models import CandidateProfile
 
 # registration/views.py
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from questions.models import Question, QuestionPaper
+from questions.models import Question
 from results.models import CandidateAnswer
 from registration.models import CandidateProfile
 from django.views.decorators.cache import never_cache
@@ -97,7 +102,7 @@ from django.views.decorators.cache import never_cache
 @login_required
 def exam_interface(request):
     try:
-        candidate = get_object_or_404(CandidateProfile, user=request.user)
+        candidate = get_object_or_404(CandidateProfile.objects.select_related("trade"), user=request.user)
         trade = candidate.trade
 
         if not trade:
@@ -130,16 +135,10 @@ def exam_interface(request):
         # -----------------------------
         # STEP 1: Resolve activation
         # -----------------------------
-        # Decide exam type explicitly
-        exam_type = candidate.get_next_exam_type()
-
-
-        activation = TradePaperActivation.objects.filter(
-            trade=trade,
-            paper_type=exam_type,
-            is_active=True
-        ).first()
-
+        # Decide exam type explicitly; resolved once and shared with the
+        # candidate's exam methods (CandidateProfile.exam_state)
+        exam_state = candidate.exam_state()
+        activation = exam_state.activation
 
         if not activation:
             messages.error(request, f"No active exam found for trade {trade}. Contact admin.")
@@ -148,10 +147,7 @@ def exam_interface(request):
         # -----------------------------
         # STEP 2: Resolve paper
         # -----------------------------
-        paper = QuestionPaper.objects.filter(
-            question_paper=activation.paper_type,
-            is_active=True
-        ).first()
+        paper = exam_state.paper
 
         if not paper:
             messages.error(request, f"Exam paper configuration missing for {activation.paper_type}. Contact admin.")
@@ -190,7 +186,7 @@ def exam_interface(request):
             paper=paper,
             exam_type=activation.paper_type,
             completed_at__isnull=True
-        ).order_by("-started_at").first()
+        ).order_by(F("started_at").desc(nulls_last=True)).first()
 
         if not session:
             try:
@@ -213,6 +209,15 @@ def exam_interface(request):
                 messages.error(request, f"Error creating exam session: {str(e)}")
                 logout(request)
                 return redirect("login")
+        elif session.started_at is None:
+            # Paper was pre-generated (questions.paper_pool) - the attempt starts now
+            candidate.start_exam_attempt()
+            session.started_at = timezone.now()
+            update_fields = ["started_at"]
+            if activation.exam_duration:
+                session.duration = activation.exam_duration
+                update_fields.append("duration")
+            session.save(update_fields=update_fields)
 
         # -----------------------------
         # STEP 5: Prevent reattempt
@@ -231,39 +236,25 @@ def exam_interface(request):
         # STEP 6: SUBMISSION
         # -----------------------------
         if request.method == "POST":
-            with transaction.atomic():
-                # Check if exam was terminated
-                exam_terminated = request.POST.get('exam_terminated') == 'true'
-                termination_reason = request.POST.get('termination_reason', 'Normal submission')
-                
-                for key, value in request.POST.items():
-                    if key.startswith("question_"):
-                        qid = key.split("_")[1]
-                        try:
-                            question = Question.objects.get(id=qid)
-                            CandidateAnswer.objects.update_or_create(
-                            candidate=candidate,
-                            paper=paper,
-                            question=question,
-                            defaults={
-                                "answer": value,
-                                "exam_type": activation.paper_type,  # PRIMARY or SECONDARY
-                            },
-                        )
-
-                        except Question.DoesNotExist:
-                            continue
-
-                session.completed_at = timezone.now()
-                session.save(update_fields=["completed_at"])
-                
-                # CONSUME SLOT ONLY WHEN EXAM IS ACTUALLY SUBMITTED/COMPLETED
-                candidate.consume_exam_slot()
-                
-                # Log termination if applicable
-                if exam_terminated:
-                    # You can add additional logging here if needed
-                    messages.warning(request, f"Exam was terminated: {termination_reason}")
+            # Check if exam was terminated
+            exam_terminated = request.POST.get('exam_terminated') == 'true'
+            termination_reason = request.POST.get('termination_reason', 'Normal submission')
+
+            # Answers validated against the session and upserted in one batch;
+            # the slot is consumed in the same transaction
+            submit_exam(
+                candidate,
+                paper,
+                session,
+                activation.paper_type,  # PRIMARY or SECONDARY
+                request.POST,
+                activation=activation,
+            )
+
+            # Log termination if applicable
+            if exam_terminated:
+                # You can add additional logging here if needed
+                messages.warning(request, f"Exam was terminated: {termination_reason}")
 
             logout(request)
             # Show success message
@@ -273,19 +264,71 @@ def exam_interface(request):
         # -----------------------------
         # STEP 7: RENDER EXAM
         # -----------------------------
-        
+        # The paper snapshot frozen at generation is rendered as-is; the
+        # template reads it as question.question.* exactly like ExamQuestion rows.
+        payload = session.question_payload
+        if payload is None:
+            # Sessions generated before snapshots existed
+            question_ids = session.examquestion_set.order_by("order", "id").values_list("question_id", flat=True)
+            payload = rendered_questions(question_ids)
+        questions = [{"question": q} for q in payload]
+
         return render(request, "registration/exam_interface.html", {
             "candidate": candidate,
             "paper": paper,
             "session": session,
-            "questions": session.questions,
+            "questions": questions,
             "duration_seconds": duration_seconds,
+            # Autosaved answers restore the page after a crash / reload
+            "saved_answers": saved_answers(candidate, session),
+            # Fresh per page load: the reloaded page's autosave seq starts over
+            "autosave_epoch": secrets.token_hex(8),
         })
         
     except Exception as e:
         messages.error(request, f"An error occurred: {str(e)}")
         return redirect("login")
 
+
+@never_cache
+@login_required
+@require_POST
+def exam_autosave(request):
+    """
+    JSON autosave for the open exam session.
+
+    Body: {"session_id": .., "epoch": .., "seq": .., "answers": {question_id: answer}}
+    with only the answers changed since the last acknowledged batch. Writes
+    are coalesced server-side (results.services.autosave_answers). A delta at
+    or below the last seq accepted for its epoch is answered
+    {"ok": false, "stale": true, "seq": <last accepted>} and not stored.
+    """
+    try:
+        payload = json.loads(request.body)
+        session_id = int(payload["session_id"])
+        epoch = str(payload.get("epoch", ""))[:64]
+        seq = int(payload.get("seq", 0))
+        answers = payload.get("answers") or {}
+        if not isinstance(answers, dict):
+            raise ValueError("answers must be an object")
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"ok": False, "error": "Invalid autosave payload"}, status=400)
+
+    session = ExamSession.objects.filter(
+        pk=session_id,
+        user=request.user,
+        completed_at__isnull=True,
+    ).only("id", "paper_id", "exam_type").first()
+    candidate_id = CandidateProfile.objects.filter(user=request.user).values_list("id", flat=True).first()
+    if session is None or candidate_id is None:
+        return JsonResponse({"ok": False, "error": "No open exam session"}, status=409)
+
+    accepted = autosave_answers(session, candidate_id, epoch, seq, answers)
+    if accepted != seq:
+        return JsonResponse({"ok": False, "stale": True, "seq": accepted})
+    return JsonResponse({"ok": True, "seq": accepted})
+
+
 # @login_required
 # def exam_success(request):
 #     return render(request, "registration/exam_success.html")
@@ -382,15 +425,8 @@ def debug_exam(request):
             })
 
         # Get activation
-        exam_type = candidate.get_next_exam_type()
-
-
-        activation = TradePaperActivation.objects.filter(
-            trade=trade,
-            paper_type=exam_type,
-            is_active=True
-        ).first()
-
+        exam_state = candidate.exam_state()
+        activation = exam_state.activation
 
         if not activation:
             return render(request, "registration/debug_exam.html", {
@@ -398,10 +434,7 @@ def debug_exam(request):
             })
 
         # Get paper
-        paper = QuestionPaper.objects.filter(
-            question_paper=activation.paper_type,
-            is_active=True
-        ).first()
+        paper = exam_state.paper
 
         if not paper:
             return render(request, "registration/debug_exam.html", {
@@ -414,7 +447,7 @@ def debug_exam(request):
             paper=paper,
             exam_type=activation.paper_type,
             completed_at__isnull=True
-        ).order_by("-started_at").first()
+        ).order_by(F("started_at").desc(nulls_last=True)).first()
 
         if not session:
             session = paper.generate_for_candidate(
@@ -450,16 +483,8 @@ def simple_exam_test(request):
             })
 
         # Get activation
-        # Decide exam type explicitly
-        exam_type = candidate.get_next_exam_type()
-
-
-        activation = TradePaperActivation.objects.filter(
-            trade=trade,
-            paper_type=exam_type,
-            is_active=True
-        ).first()
-
+        exam_state = candidate.exam_state()
+        activation = exam_state.activation
 
         if not activation:
             return render(request, "registration/simple_exam_test.html", {
@@ -467,10 +492,7 @@ def simple_exam_test(request):
             })
 
         # Get paper
-        paper = QuestionPaper.objects.filter(
-            question_paper=activation.paper_type,
-            is_active=True
-        ).first()
+        paper = exam_state.paper
 
         if not paper:
             return render(request, "registration/simple_exam_test.html", {
@@ -483,7 +505,7 @@ def simple_exam_test(request):
             paper=paper,
             exam_type=activation.paper_type,
             completed_at__isnull=True
-        ).order_by("-started_at").first()
+        ).order_by(F("started_at").desc(nulls_last=True)).first()
 
         if not session:
             session = paper.generate_for_candidate(
@@ -0,0 +1,274 @@
+# results/services.py
+"""
+Exam answer persistence.
+
+- Autosave: the exam page posts batched deltas (changed answers only, tagged
+  with a sequence number that is per page load, under a fresh epoch). Deltas
+  are coalesced per session in a short in-process buffer and flushed with one
+  bulk upsert for all sessions still open.
+- Submit: validates the posted answers against the session's ExamQuestion set
+  in one query, writes only answers that differ from what autosave already
+  stored and consumes the slot in the same transaction - a constant number of
+  queries regardless of paper length.
+"""
+import logging
+import threading
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import CandidateAnswer
+
+logger = logging.getLogger(__name__)
+
+UNIQUE_FIELDS = ["candidate", "paper", "question", "exam_type"]
+
+
+def parse_posted_answers(data: Mapping[str, str]) -> Dict[int, str]:
+    """``{question_id: answer}`` from ``question_<id>`` form keys; malformed keys are ignored."""
+    answers = {}
+    for key, value in data.items():
+        if not key.startswith("question_"):
+            continue
+        try:
+            answers[int(key.split("_")[1])] = value
+        except (IndexError, ValueError):
+            continue
+    return answers
+
+
+def _session_question_ids(session, question_ids: Iterable[int]) -> set:
+    question_ids = list(question_ids)
+    if not question_ids:
+        return set()
+    return set(
+        session.examquestion_set.filter(question_id__in=question_ids)
+        .values_list("question_id", flat=True)
+    )
+
+
+def upsert_answers(rows: List[CandidateAnswer]) -> None:
+    """Insert or update CandidateAnswer rows in one statement (submitted_at = last write)."""
+    if not rows:
+        return
+    # MySQL upserts on any unique key and rejects an explicit target
+    unique_fields = UNIQUE_FIELDS if connection.features.supports_update_conflicts_with_target else None
+    CandidateAnswer.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=["answer", "submitted_at"],
+    )
+
+
+class AutosaveBuffer:
+    """
+    Per-process write buffer for autosaved answers.
+
+    Later deltas for the same question overwrite earlier ones in memory, so a
+    candidate changing an answer five times inside the window costs one row
+    write. A timer flushes everything pending ``flush_seconds`` after the first
+    buffered delta. Sequence numbers are tracked per (session, epoch): each
+    page load sends its own epoch, so a reloaded page counting from 1 again
+    is not mistaken for stale deltas.
+    """
+
+    def __init__(self, flush_seconds: float):
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[int, tuple] = {}  # session_id -> ((candidate_id, paper_id, exam_type), {qid: answer})
+        self._seq: Dict[Tuple[int, str], int] = {}  # (session_id, epoch) -> last accepted client sequence number
+        self._timer: Optional[threading.Timer] = None
+
+    def add(self, session, candidate_id: int, epoch: str, seq: int, answers: Dict[int, str]) -> int:
+        """
+        Buffer ``answers``; deltas older than the last seq accepted for
+        ``epoch`` are dropped. Returns the last accepted seq (``seq`` itself
+        unless the delta was stale).
+        """
+        with self._lock:
+            last = self._seq.get((session.pk, epoch), -1)
+            if seq <= last:
+                return last
+            self._seq[(session.pk, epoch)] = seq
+
+            _, pending = self._pending.setdefault(
+                session.pk, ((candidate_id, session.paper_id, session.exam_type), {})
+            )
+            pending.update(answers)
+
+            if self.flush_seconds <= 0:
+                flush_now = True
+            else:
+                flush_now = False
+                if self._timer is None:
+                    self._timer = threading.Timer(self.flush_seconds, self._flush_from_timer)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+        if flush_now:
+            self.flush([session.pk])
+        return seq
+
+    def flush(self, session_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Write pending answers (all sessions, or only ``session_ids``). Deltas
+        of sessions already submitted - here or in another process - are
+        dropped. Returns rows written.
+        """
+        from questions.models import ExamSession
+
+        with self._flush_lock:
+            with self._lock:
+                if session_ids is None:
+                    batch, self._pending = self._pending, {}
+                else:
+                    batch = {sid: self._pending.pop(sid) for sid in session_ids if sid in self._pending}
+            if not batch:
+                return 0
+
+            with transaction.atomic():
+                # Locked: a concurrent submit_exam closes the session either before
+                # this check (deltas dropped) or after the upsert (its form wins)
+                open_ids = set(
+                    ExamSession.objects.select_for_update()
+                    .filter(pk__in=list(batch), completed_at__isnull=True)
+                    .values_list("pk", flat=True)
+                )
+                rows = [
+                    CandidateAnswer(
+                        candidate_id=candidate_id,
+                        paper_id=paper_id,
+                        question_id=qid,
+                        answer=answer,
+                        exam_type=exam_type,
+                    )
+                    for session_id, ((candidate_id, paper_id, exam_type), answers) in batch.items()
+                    if session_id in open_ids
+                    for qid, answer in answers.items()
+                ]
+                upsert_answers(rows)
+
+            for session_id in batch.keys() - open_ids:
+                self.forget(session_id)
+            return len(rows)
+
+    def forget(self, session_id: int) -> None:
+        """Drop a closed session's sequence tracking and any unflushed delta."""
+        with self._lock:
+            self._pending.pop(session_id, None)
+            for key in [key for key in self._seq if key[0] == session_id]:
+                del self._seq[key]
+
+    def _flush_from_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            written = self.flush()
+            if written:
+                logger.debug("Autosave flushed %d answers", written)
+        except Exception as e:
+            logger.error("Autosave flush failed: %s", e)
+        finally:
+            # Timer threads own their DB connection
+            connection.close()
+
+
+autosave_buffer = AutosaveBuffer(getattr(settings, "EXAM_AUTOSAVE_FLUSH_SECONDS", 2))
+
+
+def autosave_answers(session, candidate_id: int, epoch: str, seq: int, answers: Mapping) -> int:
+    """
+    Accept one autosave delta (``{question_id: answer}``) for an open session.
+    Question ids outside the session are ignored. Returns the last accepted
+    seq of ``epoch``: anything but ``seq`` means the delta was stale.
+    """
+    delta = {}
+    for qid, answer in answers.items():
+        try:
+            delta[int(qid)] = "" if answer is None else str(answer)
+        except (TypeError, ValueError):
+            continue
+
+    allowed = _session_question_ids(session, delta)
+    delta = {qid: answer for qid, answer in delta.items() if qid in allowed}
+    return autosave_buffer.add(session, candidate_id, epoch, seq, delta)
+
+
+def saved_answers(candidate, session) -> Dict[int, str]:
+    """Answers already stored for ``session`` (used to restore the page after a crash)."""
+    autosave_buffer.flush([session.pk])
+    qs = CandidateAnswer.objects.filter(
+        candidate=candidate,
+        paper_id=session.paper_id,
+        exam_type=session.exam_type,
+    )
+    if session.started_at:
+        # Ignore rows left over from an earlier attempt at the same paper
+        qs = qs.filter(submitted_at__gte=session.started_at)
+    return dict(qs.values_list("question_id", "answer"))
+
+
+def submit_exam(candidate, paper, session, exam_type: str, data: Mapping[str, str], activation=None) -> Optional[int]:
+    """
+    Save the posted answers and close ``session``.
+
+    Only answers that differ from what autosave already stored are written.
+    Returns the number of answers written, or None when the session had
+    already been submitted (e.g. a double submit when the timer expires).
+    """
+    from questions.models import ExamSession
+
+    # The posted form is authoritative; make sure no buffered delta lands after it
+    autosave_buffer.flush([session.pk])
+
+    answers = parse_posted_answers(data)
+    allowed = _session_question_ids(session, answers)
+
+    rejected = len(answers) - len(allowed)
+    if rejected:
+        logger.warning(
+            "Ignoring %d answers for questions outside session %s (%s)",
+            rejected, session.pk, candidate.army_no,
+        )
+
+    with transaction.atomic():
+        # Conditional update doubles as the lock: only one submit closes the session
+        now = timezone.now()
+        closed = ExamSession.objects.filter(pk=session.pk, completed_at__isnull=True).update(completed_at=now)
+        if not closed:
+            return None
+        session.completed_at = now
+
+        # Read after closing: an autosave flush from another process is either
+        # already committed here or sees the session completed and drops its deltas
+        stored = dict(
+            CandidateAnswer.objects.filter(
+                candidate=candidate,
+                paper=paper,
+                exam_type=exam_type,
+                question_id__in=list(allowed),
+            ).values_list("question_id", "answer")
+        ) if allowed else {}
+
+        rows = [
+            CandidateAnswer(
+                candidate=candidate,
+                paper=paper,
+                question_id=qid,
+                answer=answer,
+                exam_type=exam_type,
+            )
+            for qid, answer in answers.items()
+            if qid in allowed and stored.get(qid) != answer
+        ]
+        upsert_answers(rows)
+
+        # CONSUME SLOT ONLY WHEN EXAM IS ACTUALLY SUBMITTED/COMPLETED
+        candidate.consume_exam_slot(activation=activation)
+
+    autosave_buffer.forget(session.pk)
+    return len(rows)